@@ -0,0 +1,93 @@
+import argparse
+import glob
+import os
+import time
+from The_Validator import The_Validator
+from TransitionParser import TransitionSyntaxError
+
+
+def read_models(directory):
+    """
+    Reads the lines of the txt models of a directory and its subdirectories.
+
+    :param directory: Directory of the models.
+    :type directory: str
+    :return: The lines of each model, by path.
+    :rtype: dict[str, list[str]]
+    """
+    models = {}
+    for path in sorted(glob.glob(os.path.join(directory, "**", "*.txt"), recursive=True)):
+        with open(path, 'r') as file:
+            models[path] = file.readlines()
+    return models
+
+def benchmark(models, parser, repeat):
+    """
+    Parses the models with a parser and measures its throughput.
+
+    :param models: The lines of each model, by path.
+    :type models: dict[str, list[str]]
+    :param parser: Parser of The_Validator, "descent" or "regex".
+    :type parser: str
+    :param repeat: Number of times the models are parsed, the fastest run is kept.
+    :type repeat: int
+    :return: The lines parsed per second and the parsed models.
+    :rtype: tuple[float, dict[str, dict]]
+    """
+    best = None
+    for _ in range(repeat):
+        fsms = {}
+        start = time.perf_counter()
+        for path, lines in models.items():
+            fsms[path] = The_Validator(parser).lines_to_fsm(lines, path)
+        ellapsed = time.perf_counter() - start
+        best = ellapsed if best is None else min(best, ellapsed)
+    return sum(len(lines) for lines in models.values()) / best, fsms
+
+def benchmark_long_line(size):
+    """
+    Times both parsers on a line of ``size`` repeated groups of unbalanced brackets that is not a transition,
+    where the greedy groups of the regular expressions backtrack.
+
+    :param size: Number of repeated groups.
+    :type size: int
+    :return: The time of each parser in milliseconds.
+    :rtype: dict[str, float]
+    """
+    line = "S0 {" + "} x:X > c.f( " * size + "} x:X > c.f() {" + "} " * size + "{"
+    times = {}
+    for parser in ("regex", "descent"):
+        validator = The_Validator(parser)
+        start = time.perf_counter()
+        if parser == "regex":
+            validator.parse_transition(line)
+        else:
+            try:
+                validator.transition_parser.parse(line)
+            except TransitionSyntaxError:
+                # the line is not a transition, any other error is a bug of the parser
+                pass
+        times[parser] = (time.perf_counter() - start) * 1000
+    return len(line), times
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the parsers of the txt DSL')
+    parser.add_argument('directory', type=str, nargs='?', default='../ExperimentalData/tests_dafsm_1', help='Dir where the txt models are located')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of runs per parser, the fastest one is reported')
+    parser.add_argument('--long_line', type=int, default=0, help='Also time a line of this number of unbalanced groups (0 for none)')
+    args = parser.parse_args()
+
+    models = read_models(args.directory)
+    print(f"{len(models)} models, {sum(len(lines) for lines in models.values())} lines in {args.directory}")
+    results = {}
+    for name in ("regex", "descent"):
+        throughput, results[name] = benchmark(models, name, args.repeat)
+        print(f"{name:>8}: {throughput:,.0f} lines/s")
+    different = [path for path in models if results["regex"][path] != results["descent"][path]]
+    print(f"Same DAFSMs: {len(models) - len(different)}/{len(models)}")
+    for path in different:
+        print(f"  differs: {path}")
+
+    if args.long_line > 0:
+        length, times = benchmark_long_line(args.long_line)
+        print(f"Line of {length} characters: " + ", ".join(f"{name} {ms:.2f} ms" for name, ms in times.items()))
@@ -0,0 +1,55 @@
+import hashlib
+import json
+from KeyedStore import KeyedStore
+from Settings import s_caller_cache_path, s_caller_cache_max_entries
+
+class CallerCheckCache(KeyedStore):
+    """
+    A persistent cache of caller check verdicts, stored in a SQLite file (see ``KeyedStore``).
+
+    The verdict of a caller check only depends on the transitions of the paths leading to the checked state,
+    so a check is identified by the strategy used, a fingerprint of the subgraph of the ancestors of the state
+    (see ``FSMGraph.get_fingerprint``), the caller and its roles. Repeated runs over a model, and models
+    sharing the part of their graph in front of a state, reuse the verdicts across ``FSMGraph`` instances and
+    processes. Above ``max_entries`` the least recently used entries are evicted.
+
+    :param path: Path of the SQLite file.
+    :type path: str
+    :param max_entries: Number of entries kept in the cache.
+    :type max_entries: int
+    """
+
+    table = "caller_checks"
+    columns = ("passed INTEGER",)
+    default_path = s_caller_cache_path
+    default_max_entries = s_caller_cache_max_entries
+
+    @staticmethod
+    def key(caller_check, fingerprint, caller, callerRoles) -> str:
+        """
+        Computes the hash identifying a caller check.
+
+        :param caller_check: Strategy of the caller check.
+        :type caller_check: str
+        :param fingerprint: Fingerprint of the ancestor subgraph of the checked state.
+        :type fingerprint: str
+        :param caller: Caller to be verified.
+        :type caller: str
+        :param callerRoles: Roles associated with the caller.
+        :type callerRoles: list
+        :return: The hexadecimal digest identifying the check.
+        :rtype: str
+        """
+        content = json.dumps([caller_check, fingerprint, caller, sorted(callerRoles)])
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def decode(self, row) -> bool:
+        """
+        Gives the verdict of a caller check, True if the caller is introduced in every path.
+
+        :param row: The stored verdict.
+        :type row: tuple
+        :return: The verdict.
+        :rtype: bool
+        """
+        return bool(row[0])
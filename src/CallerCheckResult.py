@@ -0,0 +1,57 @@
+class CallerCheckResult:
+    """
+    The verdict of the caller check of a transition.
+
+    When the check fails, a shortest path of the DAFSM leading to the transition without introducing its caller
+    is computed on demand (see ``FSMGraph.get_counterexample``), so the checks never build nor print paths.
+
+    :param fsm_graph: The graph the check ran on.
+    :type fsm_graph: FSMGraph
+    :param passed: True if the caller is introduced in every path leading to the transition.
+    :type passed: bool
+    :param target_state: Source state of the checked transition.
+    :type target_state: str
+    :param caller: Caller of the transition.
+    :type caller: str
+    :param callerRoles: Roles of the caller.
+    :type callerRoles: list
+    :param reused: True if the verdict was found by an earlier check of the same caller and state, whose failure is reported already.
+    :type reused: bool
+    """
+
+    def __init__(self, fsm_graph, passed, target_state, caller, callerRoles, reused = False) -> None:
+        self.fsm_graph = fsm_graph
+        self.passed = passed
+        self.target_state = target_state
+        self.caller = caller
+        self.callerRoles = callerRoles
+        self.reused = reused
+        self._witness = None
+
+    def __bool__(self) -> bool:
+        return self.passed
+
+    @property
+    def witness(self):
+        """
+        A shortest path leading to the transition without introducing its caller, computed on first access.
+
+        :return: The path as transition ids, None if the check passed.
+        :rtype: list[int] or None
+        """
+        if self.passed:
+            return None
+        if self._witness is None:
+            self._witness = self.fsm_graph.get_counterexample(self.target_state, self.caller, self.callerRoles)
+        return self._witness
+
+    def message(self) -> str:
+        """
+        Describes the failure of the check with its witness path.
+
+        :return: The message, empty if the check passed.
+        :rtype: str
+        """
+        if self.passed:
+            return ""
+        return f"The Path : {self.fsm_graph.printPathTrace(self.witness)} does not contain the participant {self.caller} : {self.callerRoles[:]}"
@@ -0,0 +1,150 @@
+import time
+from Settings import s_step_budget, s_progress_interval
+
+class CancellationToken:
+    """
+    Budget shared by the graph analyses and the solver stage of a run.
+
+    The analyses count their steps on the token: the paths explored, the transitions walked and the Z3 queries.
+    Every ``interval`` steps the token compares the time spent since the last ``reset`` with its time budget,
+    on a monotonic clock, and reports the counters to the ``progress`` callback. Once a budget is spent, or
+    ``cancel`` is called, the token stays cancelled until the next ``reset`` and the analyses stop at their next step.
+
+    :param time_out: Time budget of a run in nanoseconds, 0 for no limit.
+    :type time_out: int
+    :param step_budget: Number of steps of a run, 0 for no limit.
+    :type step_budget: int
+    :param progress: Called with the token every ``interval`` steps, None for no report.
+    :type progress: Callable[[CancellationToken], None]
+    :param interval: Number of steps between two checks of the time budget and progress reports.
+    :type interval: int
+    """
+
+    def __init__(self, time_out = 0, step_budget = s_step_budget, progress = None, interval = s_progress_interval) -> None:
+        self.time_out = time_out
+        self.step_budget = step_budget
+        self.progress = progress
+        self.interval = max(1, interval)
+        self.reset()
+
+    def reset(self):
+        """
+        Starts a new run: restarts the clock and clears the counters and the cancellation.
+        """
+        self.started = time.monotonic_ns()
+        self.paths = 0
+        self.edges = 0
+        self.queries = 0
+        self.steps = 0
+        self.next_poll = self.get_next_poll()
+        self.cancelled = False
+        self.reason = None
+
+    def __str__(self) -> str:
+        return f"{self.paths} paths, {self.edges} transitions walked, {self.queries} Z3 queries in {self.get_ellapsed_time() // 1000000} ms" + (f" (cancelled: {self.reason})" if self.cancelled else "")
+
+    def cancel(self, reason = "cancelled"):
+        """
+        Cancels the run.
+
+        :param reason: Why the run is cancelled, "time", "steps" or "cancelled".
+        :type reason: str
+        """
+        if not self.cancelled:
+            self.cancelled = True
+            self.reason = reason
+
+    def get_ellapsed_time(self) -> int:
+        """
+        Gives the time spent since the start of the run.
+
+        :return: The time in nanoseconds.
+        :rtype: int
+        """
+        return time.monotonic_ns() - self.started
+
+    def get_time_left(self):
+        """
+        Gives what is left of the time budget of the run.
+
+        :return: The time in milliseconds, None if the run has no time budget.
+        :rtype: int or None
+        """
+        if self.time_out <= 0:
+            return None
+        return max(0, (self.time_out - self.get_ellapsed_time()) // 1000000)
+
+    def poll(self) -> bool:
+        """
+        Checks the budgets of the run.
+
+        :return: True if the run is cancelled.
+        :rtype: bool
+        """
+        if self.step_budget > 0 and self.steps >= self.step_budget:
+            self.cancel("steps")
+        if self.time_out > 0 and self.get_ellapsed_time() > self.time_out:
+            self.cancel("time")
+        return self.cancelled
+
+    def advance(self, steps, check = False) -> bool:
+        """
+        Counts steps of the run, checking the budgets and reporting the progress every ``interval`` steps.
+
+        :param steps: Number of steps.
+        :type steps: int
+        :param check: If True, checks the budgets even between two reports.
+        :type check: bool
+        :return: True if the run is cancelled.
+        :rtype: bool
+        """
+        self.steps += steps
+        if self.steps >= self.next_poll:
+            self.next_poll = self.get_next_poll()
+            self.poll()
+            if self.progress is not None:
+                self.progress(self)
+        elif check or self.steps >= self.step_budget > 0:
+            self.poll()
+        return self.cancelled
+
+    def get_next_poll(self) -> int:
+        """
+        Gives the number of steps of the next report.
+
+        :return: The number of steps.
+        :rtype: int
+        """
+        return (self.steps // self.interval + 1) * self.interval
+
+    def step(self, edges = 1) -> bool:
+        """
+        Counts transitions walked by an analysis, one step each.
+
+        :param edges: Number of transitions walked.
+        :type edges: int
+        :return: True if the run is cancelled.
+        :rtype: bool
+        """
+        self.edges += edges
+        return self.advance(edges)
+
+    def path(self) -> bool:
+        """
+        Counts a path explored by an analysis, as one step.
+
+        :return: True if the run is cancelled.
+        :rtype: bool
+        """
+        self.paths += 1
+        return self.advance(1)
+
+    def query(self) -> bool:
+        """
+        Counts a Z3 query, as one step, and checks the time budget, a query taking much longer than a step.
+
+        :return: True if the run is cancelled.
+        :rtype: bool
+        """
+        self.queries += 1
+        return self.advance(1, True)
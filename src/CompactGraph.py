@@ -0,0 +1,195 @@
+from array import array
+
+class CompactGraph:
+    """
+    Integer indexed representation of the graph of a DAFSM.
+
+    States are numbered in the order they are declared, then in the order they appear in the transitions.
+    Transitions are numbered in the order of the model and kept in a table, and the transitions leaving and
+    entering each state are stored in CSR arrays: the ids of the transitions leaving state ``s`` are
+    ``out_ids[out_offsets[s]:out_offsets[s + 1]]``. The transitions leaving a state are grouped by target
+    state, in the order the targets first appear, and ``successors`` gives each of these groups as a range of
+    ``out_ids``, so a path over states is enumerated once whatever the number of parallel transitions.
+
+    :param data: DAFSM data including states and transitions. The transitions are read once, so they can be
+        streamed (see ``The_Validator.read_transitions``), and the states can be left out.
+    :type data: dict
+    """
+
+    def __init__(self, data) -> None:
+        self.names = []
+        self.index = {}
+        for state in data.get('states', ()):
+            self.add_state(state)
+
+        self.transitions = []
+        self.sources = array('i')
+        self.targets = array('i')
+        for transition in data['transitions']:
+            self.sources.append(self.add_state(transition['from']))
+            self.targets.append(self.add_state(transition['to']))
+            # shallow copies, as the edge attributes of the former networkx graph: the dicts they hold, such as
+            # newParticipants, are those of the transitions, so the participants inferred by the caller check
+            # (FSMGraph.is_in_a_path) are seen by the processing of the transitions, as in the baseline
+            self.transitions.append(dict(transition))
+
+        self.out_offsets, self.out_ids, self.successors = self.build_csr(self.sources, self.targets)
+        self.in_offsets, self.in_ids, self.predecessors = self.build_csr(self.targets, self.sources)
+        self.components = None
+        self.component_of = None
+
+    def add_state(self, name) -> int:
+        """
+        Numbers a state, if it is not numbered yet.
+
+        :param name: Name of the state.
+        :type name: str
+        :return: The number of the state.
+        :rtype: int
+        """
+        if name not in self.index:
+            self.index[name] = len(self.names)
+            self.names.append(name)
+        return self.index[name]
+
+    def build_csr(self, keys, others):
+        """
+        Builds the CSR arrays of the transitions by one of their ends.
+
+        :param keys: The end of each transition the arrays are indexed by.
+        :type keys: array
+        :param others: The other end of each transition.
+        :type others: array
+        :return: The offsets and the transition ids of the states, and the ranges of transition ids sharing their other end, by state.
+        :rtype: tuple[array, array, list[list[tuple[int, int, int]]]]
+        """
+        groups = [{} for _ in self.names]
+        for transition_id, (key, other) in enumerate(zip(keys, others)):
+            groups[key].setdefault(other, []).append(transition_id)
+
+        offsets = array('i', [0])
+        ids = array('i')
+        ranges = []
+        for group in groups:
+            state_ranges = []
+            for other, transition_ids in group.items():
+                state_ranges.append((other, len(ids), len(ids) + len(transition_ids)))
+                ids.extend(transition_ids)
+            offsets.append(len(ids))
+            ranges.append(state_ranges)
+        return offsets, ids, ranges
+
+    def outgoing(self, state) -> array:
+        """
+        Gives the ids of the transitions leaving a state.
+
+        :param state: Number of the state.
+        :type state: int
+        :return: The transition ids.
+        :rtype: array
+        """
+        return self.out_ids[self.out_offsets[state]:self.out_offsets[state + 1]]
+
+    def incoming(self, state) -> array:
+        """
+        Gives the ids of the transitions entering a state.
+
+        :param state: Number of the state.
+        :type state: int
+        :return: The transition ids.
+        :rtype: array
+        """
+        return self.in_ids[self.in_offsets[state]:self.in_offsets[state + 1]]
+
+    def simple_paths(self, source, targets):
+        """
+        Enumerates the simple paths from a state to a set of states, in depth first order.
+
+        A path is given once, as the ranges of ``out_ids`` holding the parallel transitions of each of its steps.
+
+        :param source: Number of the first state.
+        :type source: int
+        :param targets: Numbers of the last states.
+        :type targets: set[int]
+        :return: The steps ``(to_state, start, end)`` of each path.
+        :rtype: Iterator[list[tuple[int, int, int]]]
+        """
+        steps = []
+        on_path = {source}
+        if source in targets:
+            yield []
+        stack = [iter(self.successors[source])] if targets - on_path else []
+        while stack:
+            step = next((step for step in stack[-1] if step[0] not in on_path), None)
+            if step is None:
+                stack.pop()
+                if steps:
+                    on_path.discard(steps.pop()[0])
+                continue
+            if step[0] in targets:
+                yield steps + [step]
+            if targets - on_path - {step[0]}:
+                steps.append(step)
+                on_path.add(step[0])
+                stack.append(iter(self.successors[step[0]]))
+
+    def get_components(self):
+        """
+        Computes the strongly connected components of the graph (Tarjan's algorithm, without recursion).
+
+        :return: The components, as lists of state numbers, in topological order of the condensation
+            (a component only has transitions to the components after it), and the component of each state.
+        :rtype: tuple[list[list[int]], list[int]]
+        """
+        if self.components is not None:
+            return self.components, self.component_of
+
+        order = [None] * len(self.names)
+        low = [0] * len(self.names)
+        on_stack = [False] * len(self.names)
+        stack = []
+        components = []
+        counter = 0
+        for root in range(len(self.names)):
+            if order[root] is not None:
+                continue
+            work = [(root, iter(self.successors[root]))]
+            order[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            while work:
+                state, successors = work[-1]
+                step = next(successors, None)
+                if step is not None:
+                    to_state = step[0]
+                    if order[to_state] is None:
+                        order[to_state] = low[to_state] = counter
+                        counter += 1
+                        stack.append(to_state)
+                        on_stack[to_state] = True
+                        work.append((to_state, iter(self.successors[to_state])))
+                    elif on_stack[to_state]:
+                        low[state] = min(low[state], order[to_state])
+                    continue
+                work.pop()
+                if work:
+                    low[work[-1][0]] = min(low[work[-1][0]], low[state])
+                if low[state] == order[state]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == state:
+                            break
+                    components.append(component)
+
+        # Tarjan's algorithm gives the components in reverse topological order
+        components.reverse()
+        component_of = [0] * len(self.names)
+        for number, component in enumerate(components):
+            for state in component:
+                component_of[state] = number
+        self.components, self.component_of = components, component_of
+        return components, component_of
@@ -0,0 +1,454 @@
+import re
+
+class ExpressionSyntaxError(Exception):
+    """
+    Raised on a guard or an assigned value that is not an expression of the notation of Z3's python API.
+
+    :param message: What is wrong.
+    :type message: str
+    :param column: Column of the error in the expression, from 1.
+    :type column: int
+    """
+
+    def __init__(self, message, column) -> None:
+        super().__init__(f"column {column}: {message}")
+        self.message = message
+        self.column = column
+
+
+# A node of the tree of an expression is a tuple (kind, text, children, start, end):
+#   - kind: "name", "number", "string", "call" (the function, then the arguments), "index" (the indexed expression, then the index),
+#     "attribute" (the expression, its attribute being the text), "unary", "operation" (operands of operators of a same precedence,
+#     the operators being the text), "group" (an expression in parentheses), "tuple" or "list";
+#   - text: the name, the literal, the operator, the tuple of operators of an operation, "," for a call, tuple or list ending with a comma, "" otherwise;
+#   - children: the tuple of the sub-expressions, in the order of the text;
+#   - start, end: the position of the first character of the node in the expression and the position following its last character.
+# Plain tuples of strings and numbers are left alone by the garbage collector once they are old, so the trees kept in the caches cost nothing to the later collections.
+KIND, TEXT, CHILDREN, START, END = range(5)
+
+# operators written as words, kept apart from their operands by spaces
+word_operators = {"and", "or", "not", "in", "not in", "is", "is not"}
+
+def names(node) -> list:
+    """
+    Gives the names of an expression, in the order of the text. The attributes and the content of the strings are not names.
+
+    :param node: The root of the tree of the expression.
+    :type node: tuple
+    :return: The "name" nodes.
+    :rtype: list[tuple]
+    """
+    found = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node[KIND] == "name":
+            found.append(node)
+        elif node[CHILDREN]:
+            stack.extend(reversed(node[CHILDREN]))
+    return found
+
+def render(node, rewrite = None) -> str:
+    """
+    Writes an expression back, without spaces but around the operators written as words.
+
+    :param node: The root of the tree of the expression.
+    :type node: tuple
+    :param rewrite: Called on each call with the node and its arguments already written, it returns the text replacing the call, or None to keep it.
+    :type rewrite: Callable[[tuple, list[str]], str]
+    :return: The expression.
+    :rtype: str
+    """
+    # the children are written before their parent from a stack, as in ``names``, so that deeply nested expressions do not reach the recursion limit
+    written = []
+    stack = [(node, False)]
+    while stack:
+        node, ready = stack.pop()
+        kind, text, children, _, _ = node
+        if not children and kind != "call" and kind != "tuple" and kind != "list":
+            written.append(text)
+            continue
+        if not ready:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(children))
+            continue
+        first = len(written) - len(children)
+        children = written[first:]
+        del written[first:]
+        if kind == "operation":
+            parts = [children[0]]
+            for operator, operand in zip(text, children[1:]):
+                parts.append(f" {operator} " if operator in word_operators else operator)
+                parts.append(operand)
+            written.append("".join(parts))
+        elif kind == "call":
+            replacement = rewrite(node, children[1:]) if rewrite is not None else None
+            written.append(replacement if replacement is not None else f"{children[0]}({','.join(children[1:])}{text})")
+        elif kind == "unary":
+            written.append(f"{text} {children[0]}" if text in word_operators else text + children[0])
+        elif kind == "index":
+            written.append(f"{children[0]}[{children[1]}]")
+        elif kind == "attribute":
+            written.append(f"{children[0]}.{text}")
+        elif kind == "group":
+            written.append(f"({children[0]})")
+        elif kind == "tuple":
+            written.append(f"({','.join(children)}{text})")
+        else:
+            written.append(f"[{','.join(children)}{text}]")
+    return written[0]
+
+class ExpressionParser:
+    """
+    Tokenizer and operator precedence parser of the guards and of the values assigned by the postconditions,
+    written in the notation of Z3's python API (see "Format of a DAFSM" in the README)::
+
+        expression  := {"not" | "-" | "+" | "~"} primary {operator expression}
+        primary     := (name | number | string | "(" [expressions] ")" | "[" [expressions] "]") {"(" [expressions] ")" | "[" expression "]" | "." name}
+        assignments := expression ":=" expression {"&" expression ":=" expression}
+
+    with the operators and the precedences of python. The special forms of the DSL, such as ``in(x, s)``, are calls.
+    The tokens are read in one loop, the operators waiting on a stack until their operands are read (shunting yard),
+    and each node keeps its position in the text, so that the text can be rewritten in one walk of the tree.
+    """
+
+    # the spaces before a token and the token, any other character being a token of its own, reported as unexpected
+    _token = re.compile(r"""(\s*)(\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|\.\d+|[^\W\d]\w*|"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|\*\*|//|<<|>>|==|!=|<=|>=|:=|[-+*/%<>&|^~()\[\],.]|\S)""")
+    _keywords = {"and", "or", "not", "in", "is", "if", "else", "lambda", "for"}
+    # precedence of the binary operators, "not in" and "is not" being read as one operator, "**" being right associative
+    _precedence = {
+        "or": 1, "and": 2,
+        "==": 4, "!=": 4, "<": 4, "<=": 4, ">": 4, ">=": 4, "in": 4, "not in": 4, "is": 4, "is not": 4,
+        "|": 5, "^": 6, "&": 7, "<<": 8, ">>": 8, "+": 9, "-": 9, "*": 10, "/": 10, "//": 10, "%": 10, "**": 12,
+    }
+    # precedence of the unary operators, applied to the operators of a higher precedence that follow them
+    _unary = {"not": 3, "-": 11, "+": 11, "~": 11}
+
+    def tokenize(self, text) -> list:
+        """
+        Splits an expression into tokens.
+
+        :param text: The expression.
+        :type text: str
+        :return: The tokens and their positions, ending with the empty token of the end of the expression.
+        :rtype: list[tuple[str, int]]
+        """
+        tokens = []
+        position = 0
+        for space, token in self._token.findall(text):
+            position += len(space)
+            tokens.append((token, position))
+            position += len(token)
+        tokens.append(("", len(text)))
+        return tokens
+
+    def parse(self, text, assignments = False):
+        """
+        Parses an expression, or the assignments of a postcondition.
+
+        :param text: The expression, or the assignments ``target := value`` separated by ``&``.
+        :type text: str
+        :param assignments: True to parse assignments.
+        :type assignments: bool
+        :return: The root of the tree of the expression, or the trees of the target and of the value of each assignment.
+        :rtype: tuple
+        """
+        tokens = self.tokenize(text)
+        precedences = self._precedence
+        unary = self._unary
+        keywords = self._keywords
+        values = []
+        # operators as ("operator", precedence, text, start) and ("unary", precedence, text, start), brackets as ("bracket", 0, kind, start, number of values below)
+        stack = []
+        depth = 0
+        parsed = []
+        target = None
+        # what the previous token was: "open" bracket, "comma", "operator" or "operand"
+        previous = "operator"
+
+        def reduce(precedence):
+            while stack:
+                entry = stack[-1]
+                if entry[1] < precedence or entry[0] == "bracket":
+                    return
+                stack.pop()
+                right = values.pop()
+                if entry[0] == "unary":
+                    values.append(("unary", entry[2], (right,), entry[3], right[END]))
+                    continue
+                left = values.pop()
+                operator = entry[2]
+                # a left operand with operators of the same precedence is the beginning of the same sequence
+                if left[KIND] == "operation" and operator != "**" and precedences[left[TEXT][0]] == entry[1]:
+                    values.append(("operation", left[TEXT] + (operator,), left[CHILDREN] + (right,), left[START], right[END]))
+                else:
+                    values.append(("operation", (operator,), (left, right), left[START], right[END]))
+
+        index = 0
+        while True:
+            token, start = tokens[index]
+            index += 1
+            first = token[:1]
+            if previous != "operand":
+                # an operand is expected
+                if first.isalpha() or first == "_":
+                    if token in keywords:
+                        if token == "not":
+                            stack.append(("unary", unary[token], token, start))
+                            continue
+                        # "in" is a function of the DSL when it is called
+                        if token != "in" or tokens[index][0] != "(":
+                            raise ExpressionSyntaxError(f"expected an operand, found '{token}'", start + 1)
+                    values.append(("name", token, (), start, start + len(token)))
+                elif first.isdigit() or (first == "." and len(token) > 1):
+                    values.append(("number", token, (), start, start + len(token)))
+                elif first == '"' or first == "'":
+                    values.append(("string", token, (), start, start + len(token)))
+                elif token == "(" or token == "[":
+                    stack.append(("bracket", 0, "paren" if token == "(" else "list", start, len(values)))
+                    depth += 1
+                    previous = "open"
+                    continue
+                elif token in unary:
+                    stack.append(("unary", unary[token], token, start))
+                    continue
+                elif (token == ")" or token == "]") and (previous == "open" or previous == "comma"):
+                    pass
+                else:
+                    raise ExpressionSyntaxError(f"expected an operand, found {self.describe(token)}", start + 1)
+                if token != ")" and token != "]":
+                    previous = "operand"
+                    continue
+
+            # an operator, a bracket or the end is expected
+            if token == "not" or token == "is":
+                following = tokens[index][0]
+                if token == "not" and following != "in":
+                    raise ExpressionSyntaxError(f"expected 'in' after 'not', found {self.describe(following)}", tokens[index][1] + 1)
+                if following == ("in" if token == "not" else "not"):
+                    token = f"{token} {following}"
+                    index += 1
+            precedence = precedences.get(token)
+            if precedence is not None and not (assignments and token == "&"):
+                reduce(precedence + 1 if token == "**" else precedence)
+                stack.append(("operator", precedence, token, start))
+                previous = "operator"
+            elif token == "(" or token == "[":
+                stack.append(("bracket", 0, "call" if token == "(" else "index", start, len(values)))
+                depth += 1
+                previous = "open"
+            elif token == ".":
+                name, name_start = tokens[index]
+                if not (name[:1].isalpha() or name[:1] == "_") or name in keywords:
+                    raise ExpressionSyntaxError(f"expected an attribute, found {self.describe(name)}", name_start + 1)
+                index += 1
+                node = values.pop()
+                values.append(("attribute", name, (node,), node[START], name_start + len(name)))
+            elif token == "," and depth > 0:
+                reduce(1)
+                previous = "comma"
+            elif token == ")" or token == "]":
+                reduce(1)
+                if depth == 0:
+                    raise ExpressionSyntaxError(f"'{token}' closes nothing", start + 1)
+                _, _, kind, opening, base = stack.pop()
+                depth -= 1
+                if (token == ")") != (kind == "paren" or kind == "call"):
+                    raise ExpressionSyntaxError(f"'{token}' closes the '{text[opening]}' of column {opening + 1}", start + 1)
+                trailing = "," if previous == "comma" else ""
+                items = tuple(values[base:])
+                del values[base:]
+                end = start + 1
+                if kind == "call":
+                    function = values.pop()
+                    values.append(("call", trailing, (function,) + items, function[START], end))
+                elif kind == "index":
+                    if len(items) != 1 or trailing:
+                        raise ExpressionSyntaxError("expected one index", opening + 2)
+                    indexed = values.pop()
+                    values.append(("index", "", (indexed,) + items, indexed[START], end))
+                elif kind == "list":
+                    values.append(("list", trailing, items, opening, end))
+                elif len(items) == 1 and not trailing:
+                    values.append(("group", "", items, opening, end))
+                else:
+                    values.append(("tuple", trailing, items, opening, end))
+                previous = "operand"
+            elif token == "":
+                if depth > 0:
+                    opening = next(entry for entry in reversed(stack) if entry[0] == "bracket")[3]
+                    raise ExpressionSyntaxError(f"'{text[opening]}' is never closed", opening + 1)
+                reduce(1)
+                if not assignments:
+                    return values[0]
+                if target is None:
+                    raise ExpressionSyntaxError("expected ':=', found the end of the expression", start + 1)
+                parsed.append((target, values.pop()))
+                return tuple(parsed)
+            elif assignments and depth == 0 and token == ":=" and target is None:
+                reduce(1)
+                target = values.pop()
+                previous = "operator"
+            elif assignments and depth == 0 and token == "&" and target is not None:
+                reduce(1)
+                parsed.append((target, values.pop()))
+                target = None
+                previous = "operator"
+            else:
+                raise ExpressionSyntaxError(f"unexpected {self.describe(token)}", start + 1)
+
+    def describe(self, token) -> str:
+        """
+        Names a token in the error messages.
+
+        :param token: The token, "" for the end of the expression.
+        :type token: str
+        :return: The name of the token.
+        :rtype: str
+        """
+        return "the end of the expression" if token == "" else f"'{token}'"
+
+
+class ExpressionCache:
+    """
+    The trees of the expressions already parsed, the least recently used being dropped above ``max_entries``.
+
+    Unlike ``functools.lru_cache``, the trees of the rewritten expressions can be put in, see ``rename``,
+    so that the text written by a rewriting is not parsed again by the next one.
+
+    :param max_entries: Number of trees kept.
+    :type max_entries: int
+    """
+
+    def __init__(self, max_entries = 4096) -> None:
+        self.max_entries = max_entries
+        self.trees = {}
+
+    def get(self, text):
+        """
+        Looks a tree up and marks it as recently used.
+
+        :param text: The expression.
+        :type text: str
+        :return: The tree, or None on a miss.
+        :rtype: tuple or None
+        """
+        tree = self.trees.pop(text, None)
+        if tree is not None:
+            self.trees[text] = tree
+        return tree
+
+    def put(self, text, tree):
+        """
+        Stores the tree of an expression, dropping the least recently used one when the cache is full.
+
+        :param text: The expression.
+        :type text: str
+        :param tree: The tree.
+        :type tree: tuple
+        """
+        self.trees.pop(text, None)
+        self.trees[text] = tree
+        if len(self.trees) > self.max_entries:
+            del self.trees[next(iter(self.trees))]
+
+
+expression_cache = ExpressionCache()
+assignments_cache = ExpressionCache()
+
+def parse_expression(text):
+    """
+    Parses a guard or an assigned value once and keeps its tree for the later transitions, models and runs.
+
+    :param text: The expression.
+    :type text: str
+    :return: The root of the tree of the expression.
+    :rtype: tuple
+    """
+    tree = expression_cache.get(text)
+    if tree is None:
+        tree = ExpressionParser().parse(text)
+        expression_cache.put(text, tree)
+    return tree
+
+def parse_assignments(text):
+    """
+    Parses the assignments of a postcondition once and keeps their trees, see ``parse_expression``.
+
+    :param text: The postcondition.
+    :type text: str
+    :return: The trees of the target and of the value of each assignment.
+    :rtype: tuple[tuple[tuple, tuple]]
+    """
+    tree = assignments_cache.get(text)
+    if tree is None:
+        tree = ExpressionParser().parse(text, True)
+        assignments_cache.put(text, tree)
+    return tree
+
+def rename(node, renamed, suffix, offset = 0, space = ""):
+    """
+    Gives the tree of an expression whose names are written with a suffix, without parsing the new text.
+    With no names to rename, the tree is only moved by ``offset``.
+
+    :param node: The root of the tree of the expression.
+    :type node: tuple
+    :param renamed: The names to write with the suffix.
+    :type renamed: set[str]
+    :param suffix: The suffix, as "_old".
+    :type suffix: str
+    :param offset: The shift of the position of the expression in the new text.
+    :type offset: int
+    :param space: The spaces written after each suffix.
+    :type space: str
+    :return: The tree of the new text.
+    :rtype: tuple
+    """
+    shift = offset
+    growth = len(suffix) + len(space)
+    # walked from a stack, as ``render``: a node is entered before its children, which shift its end, and built after them
+    built = []
+    stack = [(node, None)]
+    while stack:
+        node, start = stack.pop()
+        kind, text, children, node_start, end = node
+        if start is not None:
+            first = len(built) - len(children)
+            children = tuple(built[first:])
+            del built[first:]
+            built.append((kind, text, children, start, end + shift))
+            continue
+        start = node_start + shift
+        if kind == "name" and text in renamed:
+            shift += growth
+            built.append((kind, text + suffix, children, start, start + len(text) + len(suffix)))
+        elif kind != "name" and children:
+            stack.append((node, start))
+            stack.extend((child, None) for child in reversed(children))
+        else:
+            built.append((kind, text, children, start, end + shift))
+    return built[0]
+
+def substitute(text, replacements, start = 0, end = None):
+    """
+    Replaces parts of a text in one pass.
+
+    :param text: The text.
+    :type text: str
+    :param replacements: The (start, end, replacement) of the parts, in the order of the text and not overlapping.
+    :type replacements: list[tuple[int, int, str]]
+    :param start: Position where the part of the text returned starts.
+    :type start: int
+    :param end: Position where the part of the text returned ends, None for the end of the text.
+    :type end: int
+    :return: The part of the text from ``start`` to ``end``, with the parts replaced.
+    :rtype: str
+    """
+    parts = []
+    position = start
+    for part_start, part_end, replacement in replacements:
+        parts.append(text[position:part_start])
+        parts.append(replacement)
+        position = part_end
+    parts.append(text[position:end])
+    return "".join(parts)
@@ -1,5 +1,6 @@
 from z3 import *
 import re
+from functools import lru_cache
 
 formulas = {}
 
@@ -72,63 +73,137 @@ def forall_in_set(formula, set):
   # Check if the solver has a solution.
   return solver.check() == z3.sat
 
+def lower_call(name, first, second):
+    """
+    Replaces a call of a function of the DSL (``in``, ``sum``, ``exist`` or ``forall``) by its implementation.
+
+    :param name: The function called.
+    :type name: str
+    :param first: The first argument, written without spaces.
+    :type first: str
+    :param second: The second argument, written without spaces.
+    :type second: str
+    :return: The call of the implementation, or None if the function is not one of the DSL.
+    :rtype: str
+    """
+
+    if name == 'in':
+        return f'is_in_set({first}, {second})'
+    if name == 'sum':
+        bound =  second if second else 100
+        if bound == "0" or not is_int(bound):
+           bound = 2
+        return f'Sum([If(And(i >= 0, i < {bound}), Select({first}, i), 0) for i in range({bound})])'
+    elif name in ('exist', 'forall'):
+        # Define a function to evaluate the formula
+        formula_function = f"formula_{len(formulas)}"
+        formulas[formula_function] = second
+        return f'{name}_in_set({formula_function}, {first})'
+    return None
+
+def lower_node(node, arguments):
+    """
+    Rewrites the calls of the functions of the DSL while an expression tree is written back, see ``Expression.render``.
+
+    :param node: The call.
+    :type node: tuple
+    :param arguments: The arguments of the call, already written.
+    :type arguments: list[str]
+    :return: The call of the implementation, or None to keep the call.
+    :rtype: str
+    """
+
+    from Expression import KIND, TEXT, CHILDREN
+    function = node[CHILDREN][0]
+    if function[KIND] != "name" or len(arguments) != 2:
+        return None
+    return lower_call(function[TEXT], arguments[0], arguments[1])
+
+@lru_cache(maxsize=4096)
+def lower_expression(assertion):
+    """
+    Lowers the calls of the functions of the DSL in an assertion once and keeps the result for the later transitions.
+    Only for the assertions calling neither ``exist`` nor ``forall``, whose lowering registers new formulas.
+
+    :param assertion: The assertion.
+    :type assertion: str
+    :return: The assertion written back without spaces, with the calls lowered.
+    :rtype: str
+    """
+
+    from Expression import parse_expression, render
+    return render(parse_expression(assertion), lower_node)
+
+def load_expression_parser():
+    """
+    Imports the expression parser when the "ast" one is selected.
+
+    The generated models import this module as ``TRAC.src.Extension``, without ``src`` on the path, so the
+    parser and the settings are imported when an assertion is lowered, and not with the module.
+
+    :return: The ``Expression`` module, or None to lower with the regular expression.
+    :rtype: module or None
+    """
+
+    try:
+        import Expression
+        from Settings import s_expression_parser
+    except ImportError:
+        return None
+    return Expression if s_expression_parser == "ast" else None
+
 # Function to parse and replace assertions
 def replace_assertion(assertion): 
     """
     Parses and replaces assertions within a given string with appropriate function calls for evaluation.
 
+    With the "ast" expression parser the assertion is parsed once into a tree (see ``Expression``) and written back in one walk,
+    lowering the calls of the functions of the DSL on the way; an assertion that does not parse, or a run where the parser
+    cannot be imported (see ``load_expression_parser``), is rewritten with the regular expression.
+
     :param assertion: The assertion string to be parsed and modified.
     :type assertion: str
     :return: A modified version of the assertion string where assertions have been replaced with function calls suitable for evaluation.
     :rtype: str
     """
 
+    expression = load_expression_parser() if assertion.strip() != "" else None
+    if expression is not None:
+        try:
+            if "exist" in assertion or "forall" in assertion:
+                return expression.render(expression.parse_expression(assertion), lower_node)
+            return lower_expression(assertion)
+        except expression.ExpressionSyntaxError:
+            pass
+
     # Define a replacement function for re.sub
 
     def replace(match):
-        if match.group(1) == 'in':
-            return f'is_in_set({match.group(2)}, {match.group(3)})'
-        if match.group(1) == 'sum':
-            bound =  match.group(3) if match.group(3) else 100
-            if bound == "0" or not is_int(bound):
-               bound = 2
-            return f'Sum([If(And(i >= 0, i < {bound}), Select({match.group(2)}, i), 0) for i in range({bound})])'
-        elif match.group(1) == 'exist':
-            set_name = match.group(2)
-            formula = match.group(3)
-            # Define a function to evaluate the formula
-            formula_function = f"formula_{len(formulas)}"
-            formulas[formula_function] = formula
-            return f'exist_in_set({formula_function}, {set_name})'
-        elif match.group(1) == 'forall':
-            set_name = match.group(2)
-            formula = match.group(3)
-            # Define a function to evaluate the formula
-            formula_function = f"formula_{len(formulas)}"
-            formulas[formula_function] = formula
-            return f'forall_in_set({formula_function}, {set_name})'
-        else:
-            return match.group(0)
+        text = lower_call(match.group(1), match.group(2), match.group(3))
+        return text if text is not None else match.group(0)
 
     # Use re.sub with the replacement function to replace all occurrences
     assertion = re.sub(r'(in|exist|forall|sum)\((.*?),(.*?)\)', replace, assertion.replace(" ", ""))
 
     return assertion
 
-def generateFuntionsFormulas():
+def generateFuntionsFormulas(functions = None):
   """
   Generates Python function definitions for formulas stored in a global `formulas` dictionary. Each formula is turned into a Python function that can be evaluated.
 
+  :param functions: Formulas to use instead of the global `formulas` dictionary.
+  :type functions: dict, optional
   :return: A string containing Python code with generated function definitions for each formula.
   :rtype: str
   """
 
+  functions = formulas if functions is None else functions
   code = ""
-  for name in formulas:
+  for name in functions:
     code += f"""\n
 def {name}(item):
   solver = z3.Solver()
-  solver.add({formulas[name]})
+  solver.add({functions[name]})
   return solver.check() == z3.sat
   """
   return code
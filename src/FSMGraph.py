@@ -1,58 +1,60 @@
-import networkx as nx
-import time
 from itertools import product
 import hashlib
+import json
+from collections import deque
+from math import prod
+from CompactGraph import CompactGraph
+from ParticipantIndex import ParticipantIndex
+from PathCounter import PathCounter
+from CallerCheckResult import CallerCheckResult
+from CallerCheckCache import CallerCheckCache
+from CancellationToken import CancellationToken
 from MiniTimer import MiniTimer
+from Settings import s_caller_check, s_path_estimate_probes
 
 class FSMGraph(MiniTimer):
     """
     Represents a DAFSM as a directed graph, providing functionalities for analyzing and manipulating DAFSM data.
 
-    :param data: DAFSM data including states and transitions.
+    :param data: DAFSM data including states and transitions, which can be streamed (see ``CompactGraph``).
     :type data: dict
     :param log: Indicates if logging is enabled. Defaults to True.
     :type log: bool, optional
-    :param time_out: Timeout for operations in seconds. Defaults to 0.
+    :param time_out: Time budget in nanoseconds of the token created when none is given, 0 for no limit. Defaults to 0.
     :type time_out: int, optional
+    :param caller_check: Strategy of the caller check, "dataflow", "scc", "dfs" or "paths".
+    :type caller_check: str, optional
+    :param caller_cache: Path of the CallerCheckCache keeping the verdicts across runs, None to keep them for this graph only.
+    :type caller_cache: str, optional
+    :param token: Budget of the run shared with the other analyses, the caller checks and path counts stop once it is cancelled.
+    :type token: CancellationToken, optional
     """
 
-    def __init__(self, data, log = True, time_out = 0 ):
+    def __init__(self, data, log = True, time_out = 0, caller_check = s_caller_check, caller_cache = None, token = None):
         """
         Initializes the DAFSMGraph with given data, logging preference, and timeout value.
         """
         self.data = data
-        self.graph = nx.MultiDiGraph()  # Using MultiDiGraph to support multiple edges between the same nodes
-        self._construct_graph()
+        self.graph = CompactGraph(data)
+        self.participants = ParticipantIndex(self.graph.transitions)
         self.log = log
         self.visited_path_for_paticipant = {}
         self.time_out = time_out
-        self.timed_out = False
+        self.token = token if token is not None else CancellationToken(time_out)
         self.nb_path = 0
-        
-    def _construct_graph(self):
-        """
-        Constructs the graph based on the initial data provided.
-        """
-        # Add states as nodes
-        for state in self.data['states']:
-            self.graph.add_node(state)
-
-        # Add transitions as edges with metadata
-        for transition in self.data['transitions']:
-            self._add_transition(transition)
+        self.caller_check_mode = caller_check
+        self.introduced = None
+        self.result = None
+        # the "paths" check infers participants in the transitions as it goes, its verdicts depend on the previous checks
+        self.caller_cache = CallerCheckCache.open(caller_cache) if caller_cache and caller_check != "paths" else None
+        self.fingerprints = {}
 
-    def _add_transition(self, transition):
+    @property
+    def timed_out(self) -> bool:
         """
-        Adds a transition to the graph as an edge with metadata.
-
-        :param transition: Contains transition details.
-        :type transition: dict
+        True if the token of the run is cancelled, the caller checks it cut are failed.
         """
-        # Define a unique key for each transition to distinguish between multiple edges between the same nodes
-        transition_key = f"{transition['actionLabel']}_{time.time_ns()}"
-
-        # Add the transition as an edge with all its data as attributes
-        self.graph.add_edge(transition['from'], transition['to'], key=transition_key, **transition)
+        return self.token.cancelled
 
     def get_outgoing_transitions(self, state):
         """
@@ -63,37 +65,64 @@ class FSMGraph(MiniTimer):
         :return: List of outgoing transitions.
         :rtype: list
         """
-        outgoing_transitions = []
-        for _, v, data in self.graph.out_edges(state, data=True):
-            outgoing_transitions.append(data)
-        return outgoing_transitions
-    
-    from itertools import product
+        if state not in self.graph.index:
+            return []
+        return [self.graph.transitions[transition_id] for transition_id in self.graph.outgoing(self.graph.index[state])]
+
+    def count_paths(self, target_state):
+        """
+        Counts the paths from the initial state to a target state, see ``PathCounter``.
+
+        Paths going through different parallel transitions are counted as different paths.
+
+        :param target_state: Target state for path calculation, or a list of target states.
+        :type target_state: str or list
+        :return: Number of paths, exact or bounded inside the cycles.
+        :rtype: PathCount
+        """
+        targets = {self.graph.index[state] for state in ([target_state] if isinstance(target_state, str) else target_state) if state in self.graph.index}
+        return PathCounter(self.graph, token = self.token).count(self.graph.index["_"], targets)
+
+    def estimate_paths(self, target_state, probes = s_path_estimate_probes, bound = 0):
+        """
+        Estimates the number of paths from the initial state to a target state by random probes, see ``PathCounter.estimate``.
+
+        :param target_state: Target state for path estimation, or a list of target states.
+        :type target_state: str or list
+        :param probes: Number of random probes.
+        :type probes: int
+        :param bound: A known lower bound of the number of paths.
+        :type bound: int
+        :return: Estimated number of paths, with its confidence interval.
+        :rtype: PathCount
+        """
+        targets = {self.graph.index[state] for state in ([target_state] if isinstance(target_state, str) else target_state) if state in self.graph.index}
+        return PathCounter(self.graph, token = self.token).estimate(self.graph.index["_"], targets, probes, bound = bound)
 
     def get_number_of_paths(self, target_state):
         """
         Calculates the number of paths from the initial state to a target state.
 
-        :param target_state: Target state for path calculation.
-        :type target_state: str
-        :return: Number of paths.
+        :param target_state: Target state for path calculation, or a list of target states.
+        :type target_state: str or list
+        :return: Number of paths, a lower bound if the count inside the cycles ran out of budget.
         :rtype: int
         """
-        
-        all_simple_paths = list(nx.all_simple_paths(self.graph, source="_", target=target_state))
-        return len(all_simple_paths)
-    
+        return self.count_paths(target_state).count
+
     def caller_check(self, transition):
         """
         Checks if the caller of a transition is introduced in any path leading to the transition's source state.
         CallerCheck Implementation
 
+        The result is also kept in ``result``; its witness path and message are only built when they are read.
+        With a ``caller_cache``, the verdicts found there for the same ancestor subgraph are reused, and ``nb_path`` is not counted for them.
+
         :param transition: Transition to check.
         :type transition: dict
-        :return: Whether the caller is correctly introduced.
-        :rtype: bool
+        :return: The result of the check, ``reused`` when it was already found for the same caller and state by this graph.
+        :rtype: CallerCheckResult
         """
-        self.start_time()
         self.nb_path = 1
         from_state = transition['from']
         caller = list(transition['caller'].keys())[0]  # Assuming there's a single caller for simplicity
@@ -103,19 +132,388 @@ class FSMGraph(MiniTimer):
         
         # Check if the caller is introduced in the current transition 
         if len(callerRoles) == 0 and caller in transition['newParticipants']:
-            return True
+            self.result = CallerCheckResult(self, True, from_state, caller, callerRoles)
+            return self.result
         if len(transition['newParticipants'].keys()) > 0 and all(item in transition['newParticipants'][list(transition['newParticipants'].keys())[0]] for item in callerRoles):
-            return True
+            self.result = CallerCheckResult(self, True, from_state, caller, callerRoles)
+            return self.result
 
         hasched_path_caller = hashlib.md5(f"{caller}_{callerRoles[:]}_{from_state}".encode()).hexdigest()
 
         if hasched_path_caller in self.visited_path_for_paticipant:
-            return self.visited_path_for_paticipant[hasched_path_caller]
+            self.result = CallerCheckResult(self, self.visited_path_for_paticipant[hasched_path_caller], from_state, caller, callerRoles, reused=True)
+            return self.result
         
-        self.visited_path_for_paticipant[hasched_path_caller] = self.is_in_all_paths(from_state, caller, callerRoles)
+        key = None
+        passed = None
+        if self.caller_cache is not None:
+            key = CallerCheckCache.key(self.caller_check_mode, self.get_fingerprint(from_state), caller, callerRoles)
+            passed = self.caller_cache.get(key)
+
+        if passed is None:
+            if self.caller_check_mode in ("dataflow", "scc"):
+                passed = self.is_introduced_in_all_paths(from_state, caller, callerRoles)
+            elif self.caller_check_mode == "dfs":
+                passed = self.is_in_all_paths_backwards(from_state, caller, callerRoles)
+            else:
+                passed = self.is_in_all_paths(from_state, caller, callerRoles)
+            # a check cut by the token has no verdict to keep
+            if key is not None and not self.timed_out:
+                self.caller_cache.put(key, passed)
+
+        self.result = CallerCheckResult(self, passed, from_state, caller, callerRoles)
+        if not self.timed_out:
+            self.visited_path_for_paticipant[hasched_path_caller] = passed
+        return self.result
+
+
+    def get_fingerprint(self, state):
+        """
+        Computes a fingerprint of the subgraph of the ancestors of a state: the states having a path to it and the
+        transitions between them, with what the caller checks read of them (their states, new participants with their
+        roles, caller and caller roles). The transitions are sorted, so the fingerprint does not depend on their order
+        in the model.
+
+        :param state: Name of the state.
+        :type state: str
+        :return: The hexadecimal digest of the subgraph.
+        :rtype: str
+        """
+        if state in self.fingerprints:
+            return self.fingerprints[state]
+
+        graph = self.graph
+        transitions = []
+        if state in graph.index:
+            ancestors = {graph.index[state]}
+            pending = deque(ancestors)
+            while pending:
+                for from_state, _, _ in graph.predecessors[pending.popleft()]:
+                    if from_state not in ancestors:
+                        ancestors.add(from_state)
+                        pending.append(from_state)
+            for ancestor in ancestors:
+                for transition_id in graph.incoming(ancestor):
+                    transition = graph.transitions[transition_id]
+                    caller = list(transition['caller'].keys())[0]
+                    newParticipants = sorted([participant, role if isinstance(role, str) else sorted(role)] for participant, role in transition.get('newParticipants', {}).items())
+                    transitions.append([transition['from'], transition['to'], newParticipants, caller, sorted(transition['caller'][caller])])
+
+        content = json.dumps([state, sorted(transitions)])
+        self.fingerprints[state] = hashlib.sha256(content.encode()).hexdigest()
+        return self.fingerprints[state]
+
+    def get_introductions(self, transition_id, introduced):
+        """
+        Gives the participants and roles a transition introduces, given those introduced before it.
+
+        A transition without new participants whose caller has roles all introduced before it
+        introduces its caller, as ``is_in_a_path`` infers it.
+
+        :param transition_id: Id of the transition in the table.
+        :type transition_id: int
+        :param introduced: Participants and roles introduced before the transition, as a mask of the ``ParticipantIndex``.
+        :type introduced: int
+        :return: The mask of the participants and roles introduced by the transition.
+        :rtype: int
+        """
+        index = self.participants
+        introductions = index.participants[transition_id] | index.roles[transition_id]
+        callerRoles = index.caller_roles[transition_id]
+        if index.participants[transition_id] == 0 and callerRoles != 0 and callerRoles & introduced == callerRoles:
+            introductions |= index.callers[transition_id]
+        return introductions
+
+    def get_introduced(self):
+        """
+        Computes, for each state, the participants and roles introduced in every path from the initial state.
+
+        Must-introduce dataflow analysis: the set of a state is the intersection, over its incoming transitions,
+        of the set of their source state with what they introduce. The sets only shrink, so the worklist
+        reaches the fixpoint after a number of steps linear in the transitions times the participants and roles.
+
+        :return: The masks of the introduced participants and roles, by state number, None for the states not reached,
+            or None if the token was cancelled before the fixpoint.
+        :rtype: list[int] or None
+        """
+        if self.introduced is not None:
+            return self.introduced
+
+        graph = self.graph
+        initial_state = graph.index["_"]
+        introduced = [None] * len(graph.names)
+        introduced[initial_state] = 0
+        pending = deque([initial_state])
+        queued = {initial_state}
+        while pending:
+            state = pending.popleft()
+            queued.discard(state)
+            for transition_id in graph.outgoing(state):
+                to_state = graph.targets[transition_id]
+                # there is no path from the initial state back to itself
+                if to_state == initial_state:
+                    continue
+                if self.token.step():
+                    return None
+                out = introduced[state] | self.get_introductions(transition_id, introduced[state])
+                new = out if introduced[to_state] is None else introduced[to_state] & out
+                if new != introduced[to_state]:
+                    introduced[to_state] = new
+                    if to_state not in queued:
+                        queued.add(to_state)
+                        pending.append(to_state)
+
+        self.introduced = introduced
+        return introduced
+
+    def get_introduced_by_components(self):
+        """
+        Computes the same sets as ``get_introduced``, one strongly connected component at a time.
+
+        The components are taken in the topological order of the condensation, so the sets of the states entering a
+        component are final when it is reached: they are the intersection over the transitions coming from the components
+        before it. The fixpoint is then only iterated inside the component, once, and a component of a single state needs
+        no iteration at all, since a transition from a state to itself cannot remove anything from its set. The cycles of
+        the DAFSM are thus summarised by their component instead of being walked again each time a set entering them shrinks.
+
+        :return: The masks of the introduced participants and roles, by state number, None for the states not reached,
+            or None if the token was cancelled before the fixpoint.
+        :rtype: list[int] or None
+        """
+        if self.introduced is not None:
+            return self.introduced
+
+        graph = self.graph
+        components, component_of = graph.get_components()
+        initial_state = graph.index["_"]
+        introduced = [None] * len(graph.names)
+        introduced[initial_state] = 0
+        # the components before the one of the initial state are not reachable from it
+        for number in range(component_of[initial_state], len(components)):
+            component = components[number]
+            for state in component:
+                # there is no path from the initial state back to itself
+                if state == initial_state:
+                    continue
+                for transition_id in graph.incoming(state):
+                    from_state = graph.sources[transition_id]
+                    if component_of[from_state] == number or introduced[from_state] is None:
+                        continue
+                    if self.token.step():
+                        return None
+                    out = introduced[from_state] | self.get_introductions(transition_id, introduced[from_state])
+                    introduced[state] = out if introduced[state] is None else introduced[state] & out
+
+            if len(component) == 1:
+                continue
+            pending = deque(state for state in component if introduced[state] is not None)
+            queued = set(pending)
+            while pending:
+                state = pending.popleft()
+                queued.discard(state)
+                for transition_id in graph.outgoing(state):
+                    to_state = graph.targets[transition_id]
+                    if component_of[to_state] != number or to_state == initial_state:
+                        continue
+                    if self.token.step():
+                        return None
+                    out = introduced[state] | self.get_introductions(transition_id, introduced[state])
+                    new = out if introduced[to_state] is None else introduced[to_state] & out
+                    if new != introduced[to_state]:
+                        introduced[to_state] = new
+                        if to_state not in queued:
+                            queued.add(to_state)
+                            pending.append(to_state)
+
+        self.introduced = introduced
+        return introduced
+
+    def is_introduced_in_all_paths(self, target_state, caller, callerRoles):
+        """
+        Verifies if a caller is introduced in all paths leading to a target state, with the dataflow analysis of ``get_introduced``,
+        or of ``get_introduced_by_components`` for the "scc" caller check.
+
+        :param target_state: Target state to check.
+        :type target_state: str
+        :param caller: Caller to be verified.
+        :type caller: str
+        :param callerRoles: Roles associated with the caller.
+        :type callerRoles: list
+        :return: Whether the caller is introduced in all paths.
+        :rtype: bool
+        """
+        introduced = self.get_introduced_by_components() if self.caller_check_mode == "scc" else self.get_introduced()
+        if introduced is None:
+            return False
+        target = self.graph.index.get(target_state)
+        if target is None or introduced[target] is None:
+            return True
+
+        required = self.participants.get_required(caller, callerRoles)
+        return introduced[target] & required == required
 
-        return self.visited_path_for_paticipant[hasched_path_caller]
+    def get_counterexample(self, target_state, caller, callerRoles):
+        """
+        Finds a shortest path from the initial state to a target state that does not introduce a caller.
 
+        Breadth first search over the states paired with the roles introduced so far among those that matter
+        for the caller: its own roles, or the roles of the transitions that would introduce it by inference
+        (see ``is_in_a_path``). A shortest such path never goes twice through a state, as removing the loop
+        would give a shorter one, still without the caller.
+
+        :param target_state: Target state of the path.
+        :type target_state: str
+        :param caller: Caller to be verified.
+        :type caller: str
+        :param callerRoles: Roles associated with the caller.
+        :type callerRoles: list
+        :return: The path as transition ids, empty if every path introduces the caller.
+        :rtype: list[int]
+        """
+        graph = self.graph
+        index = self.participants
+        if target_state not in graph.index:
+            return []
+        initial_state = graph.index["_"]
+        target = graph.index[target_state]
+        direct = index.get_bit("participant", caller) if len(callerRoles) == 0 else 0
+        required = 0 if direct else index.get_mask("role", callerRoles)
+        inferring = [direct != 0 and index.callers[transition_id] == direct and index.participants[transition_id] == 0 for transition_id in range(len(graph.transitions))]
+        relevant = required
+        for transition_id, inferred in enumerate(inferring):
+            if inferred:
+                relevant |= index.caller_roles[transition_id]
+
+        start = (initial_state, 0)
+        previous = {start: None}
+        pending = deque([start])
+        while pending and target != initial_state:
+            state, roles = pending.popleft()
+            for transition_id in graph.outgoing(state):
+                to_state = graph.targets[transition_id]
+                callerRolesTransition = index.caller_roles[transition_id]
+                if to_state == initial_state or index.participants[transition_id] & direct:
+                    continue
+                if inferring[transition_id] and callerRolesTransition != 0 and callerRolesTransition & roles == callerRolesTransition:
+                    continue
+                to_roles = roles | (index.roles[transition_id] & relevant)
+                if required and to_roles & required == required or (to_state, to_roles) in previous:
+                    continue
+                previous[(to_state, to_roles)] = ((state, roles), transition_id)
+                if to_state == target:
+                    path = []
+                    step = previous[(to_state, to_roles)]
+                    while step is not None:
+                        path.insert(0, step[1])
+                        step = previous[step[0]]
+                    return path
+                pending.append((to_state, to_roles))
+        return []
+
+    def walk_back(self, transition_id, direct, pending):
+        """
+        Prepends a transition to the end of a path walked backwards by ``is_in_all_paths_backwards``.
+
+        :param transition_id: Id of the transition in the table.
+        :type transition_id: int
+        :param direct: The bit of the caller when it has no roles, 0 otherwise.
+        :type direct: int
+        :param pending: The masks of roles of which one must be introduced before the transition for the caller to be introduced.
+        :type pending: tuple[int]
+        :return: Whether the caller is introduced whatever the transitions before this one, and the masks of roles still pending otherwise.
+        :rtype: tuple[bool, tuple[int]]
+        """
+        index = self.participants
+        if index.participants[transition_id] & direct:
+            return True, pending
+        remaining = set()
+        for mask in pending:
+            mask &= ~index.roles[transition_id]
+            if mask == 0:
+                return True, pending
+            remaining.add(mask)
+        # the caller is inferred as participant of this transition if its roles are introduced before it
+        if direct and index.callers[transition_id] == direct and index.participants[transition_id] == 0 and index.caller_roles[transition_id] != 0:
+            remaining.add(index.caller_roles[transition_id])
+        return False, tuple(sorted(remaining))
+
+    def get_branches(self, state, direct):
+        """
+        Lists the transitions entering a state, keeping one of the parallel transitions that introduce the same participants and roles for the caller.
+
+        :param state: Number of the state.
+        :type state: int
+        :param direct: The bit of the caller when it has no roles, 0 otherwise.
+        :type direct: int
+        :return: The source state and the id of each kept transition.
+        :rtype: Iterator[tuple[int, int]]
+        """
+        index = self.participants
+        for from_state, start, end in self.graph.predecessors[state]:
+            signatures = set()
+            for transition_id in self.graph.in_ids[start:end]:
+                inferred = direct and index.callers[transition_id] == direct and index.participants[transition_id] == 0
+                signature = (index.participants[transition_id] & direct != 0, index.roles[transition_id], index.caller_roles[transition_id] if inferred else 0)
+                if signature not in signatures:
+                    signatures.add(signature)
+                    yield from_state, transition_id
+
+    def is_in_all_paths_backwards(self, target_state, caller, callerRoles):
+        """
+        Verifies if a caller is introduced in all paths leading to a target state, with a depth first search of the
+        simple paths walked backwards from the target state.
+
+        A branch is cut as soon as the transitions walked introduce the caller, since every path ending with them does,
+        and the parallel transitions introducing the same participants and roles are walked once. A transition whose
+        caller is the checked one, with roles and no new participants, introduces it if its roles are introduced before
+        it (see ``is_in_a_path``), so these roles are kept pending while walking back.
+
+        :param target_state: Target state to check.
+        :type target_state: str
+        :param caller: Caller to be verified.
+        :type caller: str
+        :param callerRoles: Roles associated with the caller.
+        :type callerRoles: list
+        :return: Whether the caller is introduced in all paths.
+        :rtype: bool
+        """
+        graph = self.graph
+        if target_state not in graph.index:
+            return True
+        initial_state = graph.index["_"]
+        target = graph.index[target_state]
+        direct = self.participants.get_bit("participant", caller) if len(callerRoles) == 0 else 0
+        pending = () if direct else (self.participants.get_mask("role", callerRoles),)
+        if target == initial_state:
+            return self.is_in_a_path([], caller, callerRoles)
+
+        on_path = {target}
+        stack = [(target, self.get_branches(target, direct), pending)]
+        while stack:
+            state, branches, pending = stack[-1]
+            branch = next((branch for branch in branches if branch[0] not in on_path), None)
+            if branch is None:
+                stack.pop()
+                on_path.discard(state)
+                continue
+
+            from_state, transition_id = branch
+            if self.token.step():
+                return False
+            introduced, remaining = self.walk_back(transition_id, direct, pending)
+            if introduced:
+                self.nb_path += 1
+                self.token.path()
+                continue
+            if from_state == initial_state:
+                self.nb_path += 1
+                self.token.path()
+                return False
+
+            on_path.add(from_state)
+            stack.append((from_state, self.get_branches(from_state, direct), remaining))
+
+        return True
 
     def is_in_all_paths(self, target_state, caller, callerRoles) :
         """
@@ -130,26 +528,24 @@ class FSMGraph(MiniTimer):
         :return: Whether the caller is introduced in all paths.
         :rtype: bool
         """
+        graph = self.graph
+        if target_state not in graph.index:
+            return True
+
         # Directly iterate over each simple path without collecting them all at once
-        for path in nx.all_simple_paths(self.graph, source="_", target=target_state):
+        for steps in graph.simple_paths(graph.index["_"], {graph.index[target_state]}):
             self.nb_path += 1
-            # Collect all transitions for each step in the path
-            
-            if  self.time_out > 0 and ((self.get_ellapsed_time() > self.time_out) or   self.timed_out):
-                self.timed_out = True
+            if self.token.path():
                 return False
             
-            transitions = []
-            for i in range(len(path) - 1):
-                from_state = path[i]
-                to_state = path[i + 1]
-                transitions_at_step = list(self.graph.get_edge_data(from_state, to_state).values())
-                transitions.append(transitions_at_step)
+            # Collect all transitions for each step in the path
+            transitions = [graph.out_ids[start:end] for _, start, end in steps]
             # Compute all combinations of transitions for the path
             for transition_combination in product(*transitions):
-                detailed_path = list(zip(path[:-1], path[1:], transition_combination))
-                if not self.is_in_a_path(detailed_path, caller, callerRoles):
+                if self.token.step(len(transition_combination)) or not self.is_in_a_path(transition_combination, caller, callerRoles):
                     return False
+            # a path is counted once for each combination of its parallel transitions
+            self.nb_path += prod(len(step) for step in transitions) - 1
     
         return True  # Caller was introduced in every path or in the current transition
 
@@ -157,8 +553,11 @@ class FSMGraph(MiniTimer):
         """
         Determines if a caller with specific roles is introduced in a single path.
 
-        :param path: Path to check.
-        :type path: list
+        A transition without new participants whose caller has roles all introduced before it in the path
+        gets its caller as new participant.
+
+        :param path: Path to check, as transition ids.
+        :type path: list[int]
         :param caller: Caller to be verified.
         :type caller: str
         :param callerRoles: Roles associated with the caller.
@@ -166,47 +565,38 @@ class FSMGraph(MiniTimer):
         :return: Whether the caller is introduced in the path.
         :rtype: bool
         """
+        index = self.participants
+        required = index.get_required(caller, callerRoles)
         caller_introduced = False
-        pathRoles = []
-        steps = 0
-        for _, _, transition_data in path:
-            newParticipants = transition_data.get('newParticipants', {})
-            callerTransition = list(transition_data['caller'].keys())[0]
-            callerRolesTransition = transition_data['caller'][callerTransition]
-            steps += 1
-            pathRoles = pathRoles +[transition_data['newParticipants'][key][:] for key in list(newParticipants.keys())]
-
-            if len(newParticipants) == 0 and len(callerRolesTransition) > 0 and all(item in pathRoles for item in callerRolesTransition):
-                transition_data['newParticipants'][callerTransition] = callerRolesTransition
-                newParticipants = transition_data.get('newParticipants', {})
-
-            if len(callerRoles) == 0 and caller in newParticipants:
+        pathRoles = 0
+        for transition_id in path:
+            pathRoles |= index.roles[transition_id]
+            callerRolesTransition = index.caller_roles[transition_id]
+
+            if index.participants[transition_id] == 0 and callerRolesTransition != 0 and callerRolesTransition & pathRoles == callerRolesTransition:
+                transition_data = self.graph.transitions[transition_id]
+                callerTransition = list(transition_data['caller'].keys())[0]
+                transition_data['newParticipants'][callerTransition] = transition_data['caller'][callerTransition]
+                index.participants[transition_id] |= index.callers[transition_id]
+
+            if index.introduces(transition_id, required):
                 caller_introduced = True
                 break  # Caller is introduced in this path, no need to check further
             
-            
-            if len(newParticipants) > 0 and len(callerRoles) > 0 and all(item in [newParticipants[i] for i in list(newParticipants.keys())] for item in callerRoles) > 0:
-                caller_introduced = True
-                break  # Caller is introduced in this path, no need to check further 
-            
-        if not caller_introduced:
-            if self.log:
-                print(f"The Path : {self.printPathTrace(path)} does not contain the participant {caller} : {callerRoles[:]}") 
-            return False  # Caller was not introduced in at least one path
-    
-        return True
+        return caller_introduced  # False if the caller was not introduced in this path
 
     def printPathTrace(self, path):
         """
         Constructs a string representation of a given path.
 
-        :param path: Path to be represented.
-        :type path: list
+        :param path: Path to be represented, as transition ids.
+        :type path: list[int]
         :return: String representation of the path.
         :rtype: str
         """
         result = []
-        for _, _, transition in path:
+        for transition_id in path:
+            transition = self.graph.transitions[transition_id]
             result.append(f"{transition['from']}-{transition['actionLabel']}-{transition['to']}")
         
         return ">".join(result)
\ No newline at end of file
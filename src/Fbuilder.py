@@ -1,6 +1,7 @@
 
 from Extension import generateFuntionsFormulas
 from MessagesTemplates import MessagesTemplates
+from Settings import s_z3_query_time_out
 
 class Fbuilder :
     """
@@ -21,20 +22,13 @@ class Fbuilder :
         :rtype: str
         """
         str_code = trGrinder.transition_processor.str_code
+        query_time_out = getattr(trGrinder, "z3_query_time_out", s_z3_query_time_out)
+        if query_time_out > 0:
+            # a query running out of time answers unknown, which the generated checks count as a failure
+            str_code = f"set_param('timeout', {int(query_time_out)})\n" + str_code
         #create formulas functions
         str_code += generateFuntionsFormulas() + "\n"
-        with_log = False
-        
-        
-        if trGrinder.non_stop:
-            if not only_latest and trGrinder.log:
-               with_log = True 
-
-        elif trGrinder.log: 
-            with_log = True
-        else:
-            with_log = True
-        
+        with_log = Fbuilder.get_with_log(trGrinder, only_latest)
         
         checks = []
         solvers = trGrinder.transition_processor.solvers
@@ -55,6 +49,21 @@ class Fbuilder :
         
         return file_name
 
+    @staticmethod
+    def get_with_log(trGrinder, only_latest = False):
+        """
+        Tells if the checks of the model should print the details of their failures.
+
+        :param trGrinder: An instance of TransactionsGrinder containing processed transitions.
+        :type trGrinder: TransactionsGrinder
+        :param only_latest: If True, only the latest transition formula is checked, defaults to False.
+        :type only_latest: bool, optional
+        :return: True if the failures should be detailed.
+        :rtype: bool
+        """
+        if trGrinder.non_stop:
+            return not only_latest and trGrinder.log
+        return True
     
     @staticmethod
     def save_infile(str_code, file_name = "str_code"):
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+
+class IncrementalState:
+    """
+    Keeps the DAFSM of the previous check of a model with the results of its transitions, so that
+    an edited model only rechecks the transitions affected by the edit.
+
+    A transition is affected when it changed, when it leaves the source or target state of a changed
+    transition or when it enters the source state of a changed transition (its A-consistency and
+    non-determinism formulas use the transitions leaving that state). The caller check of a transition
+    is also redone when a changed transition lies on a path leading to it, as it walks those paths.
+    Only passing results are kept: failing transitions are always rechecked to print their details.
+    """
+
+    @staticmethod
+    def transition_keys(transitions) -> list:
+        """
+        Computes the keys identifying transitions by their content. Equal transitions are told apart by their
+        position among them, so that the results of each copy are kept and removing a copy is a change.
+
+        :param transitions: The transitions, as parsed from the model.
+        :type transitions: list[dict]
+        :return: The key of each transition, in the same order.
+        :rtype: list[str]
+        """
+        occurrences = {}
+        keys = []
+        for transition in transitions:
+            content = json.dumps(transition, sort_keys=True, default=str)
+            occurrence = occurrences.get(content, 0)
+            occurrences[content] = occurrence + 1
+            keys.append(hashlib.sha256(f"{occurrence}|{content}".encode()).hexdigest())
+        return keys
+
+    @staticmethod
+    def get_keys(fsm) -> dict:
+        """
+        Computes the keys of the transitions of a DAFSM before they are processed.
+
+        :param fsm: The DAFSM.
+        :type fsm: dict
+        :return: The key of each transition, by transition id.
+        :rtype: dict[int, str]
+        """
+        return {id(transition): key for transition, key in zip(fsm['transitions'], IncrementalState.transition_keys(fsm['transitions']))}
+
+    @staticmethod
+    def load(path):
+        """
+        Loads the state saved by the previous check of a model.
+
+        :param path: The path of the saved state.
+        :type path: str
+        :return: The saved state, or None if there is none.
+        :rtype: dict or None
+        """
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring the incremental state {path}: {e}")
+            return None
+
+    @staticmethod
+    def save(path, fsm, results):
+        """
+        Saves the DAFSM of a check and the results of its transitions.
+
+        :param path: The path of the saved state.
+        :type path: str
+        :param fsm: The DAFSM as it was before processing.
+        :type fsm: dict
+        :param results: The results of the transitions, by transition key.
+        :type results: dict[str, dict]
+        """
+        with open(path, 'w') as file:
+            json.dump({'fsm': fsm, 'results': results}, file, default=str)
+
+    @staticmethod
+    def reachable(fsm, states) -> set:
+        """
+        Lists the states reachable from some states, these included.
+
+        :param fsm: The DAFSM.
+        :type fsm: dict
+        :param states: The states to start from.
+        :type states: set
+        :return: The reachable states.
+        :rtype: set
+        """
+        successors = {}
+        for transition in fsm['transitions']:
+            successors.setdefault(transition['from'], set()).add(transition['to'])
+
+        reached = set(states)
+        pending = list(states)
+        while pending:
+            for state in successors.get(pending.pop(), ()):
+                if state not in reached:
+                    reached.add(state)
+                    pending.append(state)
+        return reached
+
+    @staticmethod
+    def get_affected(previous_fsm, fsm):
+        """
+        Diffs a DAFSM against the previous one and lists the transitions to recheck.
+
+        :param previous_fsm: The DAFSM of the previous check.
+        :type previous_fsm: dict
+        :param fsm: The DAFSM to check.
+        :type fsm: dict
+        :return: The keys of the transitions to recheck and of the transitions whose caller check has to be redone,
+            or None if the whole model has to be rechecked.
+        :rtype: tuple[set, set] or None
+        """
+        for field in ['statesDeclaration', 'initialState', 'states', 'finalStates']:
+            if previous_fsm.get(field) != fsm.get(field):
+                return None
+
+        previous_keys = IncrementalState.transition_keys(previous_fsm['transitions'])
+        keys = IncrementalState.transition_keys(fsm['transitions'])
+        previous_set, key_set = set(previous_keys), set(keys)
+        changed = [(t, key) for t, key in zip(fsm['transitions'], keys) if key not in previous_set]
+        changed += [(t, key) for t, key in zip(previous_fsm['transitions'], previous_keys) if key not in key_set]
+
+        sources = {transition['from'] for transition, _ in changed}
+        targets = {transition['to'] for transition, _ in changed}
+        downstream = IncrementalState.reachable(fsm, targets) | IncrementalState.reachable(previous_fsm, targets)
+
+        affected = {key for _, key in changed}
+        callers = set()
+        for transition, key in zip(fsm['transitions'], keys):
+            if transition['from'] in sources | targets or transition['to'] in sources:
+                affected.add(key)
+            if transition['from'] in downstream:
+                callers.add(key)
+        return affected, callers
+
+    @staticmethod
+    def get_reusable(path, fsm) -> dict:
+        """
+        Gives the saved results of the transitions of a DAFSM that are not affected by its changes.
+
+        :param path: The path of the saved state.
+        :type path: str
+        :param fsm: The DAFSM to check, as given by ``snapshot``.
+        :type fsm: dict
+        :return: The reusable results, by transition key: ``participants`` if the caller check can be skipped and
+            ``passed`` if the other checks passed.
+        :rtype: dict[str, dict]
+        """
+        state = IncrementalState.load(path)
+        if state is None:
+            return {}
+        diff = IncrementalState.get_affected(state['fsm'], fsm)
+        if diff is None:
+            return {}
+        affected, callers = diff
+        reusable = {}
+        for key, result in state['results'].items():
+            if key not in affected:
+                reusable[key] = {name: value for name, value in result.items() if name != 'participants' or key not in callers}
+        return reusable
+
+    @staticmethod
+    def snapshot(fsm) -> dict:
+        """
+        Copies a DAFSM before its processing changes the participants of its transitions.
+
+        :param fsm: The DAFSM.
+        :type fsm: dict
+        :return: The copy.
+        :rtype: dict
+        """
+        return json.loads(json.dumps(fsm, default=str))
@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import time
+
+class KeyedStore:
+    """
+    A persistent store of values identified by a hash, kept in a table of a SQLite file.
+
+    The caches of the checker derive from it: each one names its ``table`` and the ``columns`` of its
+    values, computes its keys and, when needed, converts its values with ``encode`` and ``decode``.
+    Above ``max_entries`` the least recently used entries are evicted.
+
+    :param path: Path of the SQLite file, ``default_path`` if None.
+    :type path: str
+    :param max_entries: Number of entries kept in the store, ``default_max_entries`` if None.
+    :type max_entries: int
+    """
+
+    table = None
+    # the column definitions of the values, as "name TYPE"
+    columns = ()
+    default_path = None
+    default_max_entries = 0
+    # the stores opened by the current process, by class and path
+    _opened = {}
+
+    def __init__(self, path = None, max_entries = None) -> None:
+        path = path if path is not None else self.default_path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries if max_entries is not None else self.default_max_entries
+        # autocommit, the WAL journal keeps the writes cheap and lets the processes of a run share the file
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(f"""CREATE TABLE IF NOT EXISTS {self.table} (
+            key TEXT PRIMARY KEY,
+            {", ".join(self.columns)},
+            last_used REAL
+        )""")
+        self.connection.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_last_used ON {self.table} (last_used)")
+        self.names = [column.split()[0] for column in self.columns]
+        self.size = self.connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def encode(self, *values) -> tuple:
+        """
+        Converts the values of an entry to the values of its columns.
+
+        :return: The values of the columns, in the order of ``columns``.
+        :rtype: tuple
+        """
+        return values
+
+    def decode(self, row):
+        """
+        Converts the values of the columns of an entry back.
+
+        :param row: The values of the columns, in the order of ``columns``.
+        :type row: tuple
+        :return: The values of the entry.
+        """
+        return row
+
+    def get(self, key):
+        """
+        Looks an entry up and marks it as recently used.
+
+        :param key: The hash of the entry.
+        :type key: str
+        :return: The values of the entry, see ``decode``, or None on a miss.
+        """
+        row = self.connection.execute(f"SELECT {', '.join(self.names)} FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.connection.execute(f"UPDATE {self.table} SET last_used = ? WHERE key = ?", (time.time(), key))
+        return self.decode(row)
+
+    def put(self, key, *values):
+        """
+        Stores an entry, evicting the least recently used entries when the store is full.
+
+        :param key: The hash of the entry.
+        :type key: str
+        :param values: The values of the entry, see ``encode``.
+        """
+        row = self.encode(*values)
+        # INSERT OR REPLACE counts a replaced row as inserted, so a new key is only counted when no row is updated
+        assignments = ", ".join(f"{name} = excluded.{name}" for name in self.names + ["last_used"])
+        updated = self.connection.execute(f"SELECT 1 FROM {self.table} WHERE key = ?", (key,)).fetchone() is not None
+        self.connection.execute(f"INSERT INTO {self.table} VALUES (?, {', '.join('?' * len(row))}, ?) ON CONFLICT(key) DO UPDATE SET {assignments}", (key, *row, time.time()))
+        if not updated:
+            self.size += 1
+        if self.size > self.max_entries:
+            # other processes sharing the file may have added the same keys
+            self.size = self.connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        if self.size > self.max_entries:
+            self.evict(self.max_entries - max(1, self.max_entries // 10))
+
+    def evict(self, keep):
+        """
+        Removes the least recently used entries.
+
+        :param keep: The number of entries to keep.
+        :type keep: int
+        """
+        self.connection.execute(f"DELETE FROM {self.table} WHERE key NOT IN (SELECT key FROM {self.table} ORDER BY last_used DESC LIMIT ?)", (max(0, keep),))
+        self.size = self.connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def clear(self):
+        """
+        Removes every entry of the store.
+        """
+        self.evict(0)
+
+    @classmethod
+    def open(cls, path = None):
+        """
+        Returns the store stored at a path, opening it once per process.
+
+        :param path: Path of the SQLite file, ``default_path`` if None.
+        :type path: str
+        :return: The store.
+        :rtype: KeyedStore
+        """
+        path = path if path is not None else cls.default_path
+        if (cls, path) not in KeyedStore._opened:
+            KeyedStore._opened[(cls, path)] = cls(path)
+        return KeyedStore._opened[(cls, path)]
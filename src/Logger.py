@@ -1,6 +1,6 @@
 from MiniTimer import *
 from Z3Runner import Z3Runner
-from Fbuilder import Fbuilder 
+from Settings import s_cancelled_message
 
 class Logger(MiniTimer):
     
@@ -33,11 +33,16 @@ class Logger(MiniTimer):
         """
         Checks if execution should stop due to a timeout.
 
-        :param o: An object that contains a `time_out` attribute and a `transition_processor` with timing information.
+        :param o: An object that contains a `time_out` attribute, a `transition_processor` with timing information and optionally the `token` of the run.
         :type o: object
         :return: True if execution should stop due to a timeout, False otherwise.
         :rtype: bool
         """
+        token = getattr(o, "token", None)
+        if token is not None and token.cancelled:
+            self.info["is_time_out"] = True
+            self.logIt(s_cancelled_message.format(token))
+            return True
         if o.time_out == 0: 
             return False
         if o.transition_processor.infos["is_time_out"] :
@@ -62,8 +67,8 @@ class Logger(MiniTimer):
         if self.non_stop:
             return False
         
-        Fbuilder.build_z3_formulas_model_and_save(trGrinder, trGrinder.get_full_z3model_path(), True)
-        if not Z3Runner.execute_model(trGrinder, path):
+        Z3Runner.build_model(trGrinder, trGrinder.get_full_z3model_path(), True)
+        if not Z3Runner.execute_model(trGrinder, path, True):
             print(f"Error from this stage:{item['from']}_{item['actionLabel']}({item['input']})_{item['to']}")
             print(trGrinder.output)
             return True
\ No newline at end of file
@@ -4,7 +4,7 @@ import json
 from TransactionsGrinder import TransactionsGrinder
 from VariableDeclarationConverter import VariableDeclarationConverter
 from The_Validator import *
-from Settings import s_non_stop
+from Settings import s_non_stop, s_z3_engine, s_z3_backend, s_z3_cache, s_incremental, s_z3_query_time_out, s_z3_model_time_out, s_caller_check, s_caller_cache, s_step_budget, s_write_json, s_parse_cache
 from Visual_graph import *
 from Helpers import clear
 
@@ -37,27 +37,42 @@ def main():
     parser.add_argument('--filetype', choices=['json', 'txt'], default='json', help='Specify the file type (json or txt). Default is json.')
     parser.add_argument('--non_stop', default= s_non_stop, choices=['1', '2'], help='Checking And Stopping Immediately When Error Default is non_stop = 1, 2 means stop mode.')
     parser.add_argument('--time_out', type=int, default = 0, help='Time out number')
+    parser.add_argument('--z3_engine', default= s_z3_engine, choices=['inprocess', 'pool', 'parallel', 'subprocess'], help='Run the Z3 model in the current process (inprocess), in warm worker processes (pool), spread its checks over processes (parallel) or with a new python3 interpreter (subprocess).')
+    parser.add_argument('--z3_cache', type=int, default= s_z3_cache, choices=[0, 1], help='Reuse the results of the obligations already checked (1) or check every obligation with Z3 (0).')
+    parser.add_argument('--incremental', type=int, default= s_incremental, choices=[0, 1], help='Recheck only the transitions affected by the changes made since the previous check of the model (1) or the whole model (0).')
+    parser.add_argument('--z3_query_time_out', type=int, default= s_z3_query_time_out, help='Time budget of each Z3 query in milliseconds, a query running out of it gives an unknown verdict (0 for no limit).')
+    parser.add_argument('--z3_model_time_out', type=int, default= s_z3_model_time_out, help='Time budget of the Z3 checks of the model in milliseconds (0 for no limit).')
+    parser.add_argument('--caller_check', default= s_caller_check, choices=['dataflow', 'scc', 'dfs', 'paths'], help='Check that callers are introduced with a fixpoint over the DAFSM (dataflow), with a fixpoint solved one strongly connected component at a time (scc), by searching its simple paths backwards from each transition (dfs) or by enumerating its simple paths (paths).')
+    parser.add_argument('--caller_cache', type=int, default= s_caller_cache, choices=[0, 1], help='Reuse the verdicts of the caller checks already done on the same paths, in previous runs or other models (1), or check every caller (0).')
+    parser.add_argument('--step_budget', type=int, default= s_step_budget, help='Steps of the graph analyses and Z3 queries of the run (paths explored, transitions walked, queries) beyond which it is cancelled (0 for no limit).')
+    parser.add_argument('--progress', type=int, default= 0, choices=[0, 1], help='Print the progress of the graph analyses and Z3 queries of the run (1) or not (0).')
+    parser.add_argument('--parse_cache', type=int, default= s_parse_cache, choices=[0, 1], help='With --filetype txt, reuse the DAFSM parsed and pre-processed from the unchanged file in a previous run (1) or parse the file (0).')
+    parser.add_argument('--write_json', type=int, default= s_write_json, choices=[0, 1], help='With --filetype txt, also write the parsed DAFSM to its JSON file (1) or only keep it in memory (0). The fsm check type always writes it.')
+    parser.add_argument('--z3_backend', default= s_z3_backend, choices=['ast', 'source'], help='Build the formulas of the inprocess engine as z3 expressions (ast) or from their source text (source).')
 
     args = parser.parse_args()
 
     file_name = f"{args.file_name}"
-    trGrinder = TransactionsGrinder(file_name, non_stop = args.non_stop == "1", time_out = args.time_out)
+    trGrinder = TransactionsGrinder(file_name, non_stop = args.non_stop == "1", time_out = args.time_out, z3_engine = args.z3_engine, z3_backend = args.z3_backend, z3_cache = args.z3_cache == 1, incremental = args.incremental == 1, z3_query_time_out = args.z3_query_time_out, z3_model_time_out = args.z3_model_time_out, caller_check = args.caller_check, caller_cache = args.caller_cache == 1, step_budget = args.step_budget, progress = (lambda token: print(f"Progress: {token}")) if args.progress == 1 else None, parse_cache = args.parse_cache == 1)
     
     if args.filetype == "txt":
         if not os.path.isfile(trGrinder.get_full_txt_path()):
             exitWithMessage(f"{trGrinder.get_full_txt_path()} does not exist")
 
-        print("--Parsing Txt to generate Json file")
-        sParser = The_Validator()
-        sParser.transitions_to_json(trGrinder.get_full_txt_path(), trGrinder.get_full_json_path())
+        # GraphGen reads the DAFSM from its JSON file
+        write_json = args.write_json == 1 or args.check_type == 'fsm'
+        print("--Parsing Txt to generate Json file" if write_json else "--Parsing Txt")
+        trGrinder.get_fsm_from_txt(write_json)
+        input_text = json.dumps(trGrinder.fsm, indent=4)
         print()
         file_name = f"{file_name}"
 
         #setattr(trGrinder, "file_name", file_name)
     elif not os.path.isfile(trGrinder.get_full_json_path()):
         exitWithMessage(f"{trGrinder.get_full_json_path()} does not exist")
+    else:
+        input_text = trGrinder.get_json_from_file()
 
-    input_text = trGrinder.get_json_from_file()
     trGrinder.pre_process_fsm()
 
     # Write the JSON output
@@ -0,0 +1,64 @@
+import hashlib
+import json
+from KeyedStore import KeyedStore
+from Settings import s_parse_cache_path, s_parse_cache_max_entries
+
+class ParseCache(KeyedStore):
+    """
+    A persistent cache of the DAFSMs parsed from txt models and pre-processed, stored in a SQLite file (see ``KeyedStore``).
+
+    A model is identified by a hash of the content of its file and of the parser used, so an edited file
+    gets a new entry and its former DAFSM is never read again, until it is evicted. The entries hold the DAFSM
+    as left by ``TransactionsGrinder.pre_process_fsm``, serialized in JSON, so a hit skips both the parsing
+    and the pre-processing. Above ``max_entries`` the least recently used entries are evicted.
+
+    :param path: Path of the SQLite file.
+    :type path: str
+    :param max_entries: Number of entries kept in the cache.
+    :type max_entries: int
+    """
+
+    # Changes when the parsing or the pre-processing give other DAFSMs, so that the former entries are not read
+    version = 1
+    table = "parsed_models"
+    columns = ("fsm TEXT",)
+    default_path = s_parse_cache_path
+    default_max_entries = s_parse_cache_max_entries
+
+    @staticmethod
+    def key(content, parser) -> str:
+        """
+        Computes the hash identifying a model.
+
+        :param content: The content of the txt file of the model.
+        :type content: bytes
+        :param parser: Parser of the txt DSL, see ``The_Validator``.
+        :type parser: str
+        :return: The hexadecimal digest identifying the model.
+        :rtype: str
+        """
+        digest = hashlib.sha256(f"{ParseCache.version}|{parser}|".encode())
+        digest.update(content)
+        return digest.hexdigest()
+
+    def encode(self, fsm) -> tuple:
+        """
+        Serializes a pre-processed DAFSM.
+
+        :param fsm: The pre-processed DAFSM.
+        :type fsm: dict
+        :return: The DAFSM in JSON.
+        :rtype: tuple[str]
+        """
+        return (json.dumps(fsm),)
+
+    def decode(self, row) -> dict:
+        """
+        Reads a pre-processed DAFSM back.
+
+        :param row: The DAFSM in JSON.
+        :type row: tuple[str]
+        :return: The pre-processed DAFSM.
+        :rtype: dict
+        """
+        return json.loads(row[0])
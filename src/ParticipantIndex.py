@@ -0,0 +1,85 @@
+class ParticipantIndex:
+    """
+    Gives each participant name and role of a DAFSM a bit, so that the participants and roles introduced
+    along a path are an integer and the caller checks are bitwise operations.
+
+    For each transition of the table, the index keeps the bits of the participants it introduces (the keys of
+    its ``newParticipants``), of the roles it introduces (their values), of its caller and of the roles of its caller.
+
+    :param transitions: The transition table of the DAFSM, see ``CompactGraph``.
+    :type transitions: list[dict]
+    """
+
+    def __init__(self, transitions) -> None:
+        self.bits = {}
+        self.participants = []
+        self.roles = []
+        self.callers = []
+        self.caller_roles = []
+        for transition in transitions:
+            newParticipants = transition.get('newParticipants', {})
+            caller = list(transition['caller'].keys())[0]
+            self.participants.append(self.get_mask("participant", newParticipants.keys()))
+            # a role inferred by the caller check is a list, it introduces the caller and not a role
+            self.roles.append(self.get_mask("role", [role for role in newParticipants.values() if isinstance(role, str)]))
+            self.callers.append(self.get_bit("participant", caller))
+            self.caller_roles.append(self.get_mask("role", transition['caller'][caller]))
+
+    def get_bit(self, kind, name) -> int:
+        """
+        Gives the bit of a participant or a role, allocating it on first use.
+
+        :param kind: "participant" or "role".
+        :type kind: str
+        :param name: Name of the participant or role.
+        :type name: str
+        :return: The bit, as a power of two.
+        :rtype: int
+        """
+        if (kind, name) not in self.bits:
+            self.bits[(kind, name)] = 1 << len(self.bits)
+        return self.bits[(kind, name)]
+
+    def get_mask(self, kind, names) -> int:
+        """
+        Gives the union of the bits of participants or roles.
+
+        :param kind: "participant" or "role".
+        :type kind: str
+        :param names: Names of the participants or roles.
+        :type names: Iterable[str]
+        :return: The mask.
+        :rtype: int
+        """
+        mask = 0
+        for name in names:
+            mask |= self.get_bit(kind, name)
+        return mask
+
+    def get_required(self, caller, callerRoles) -> int:
+        """
+        Gives the bits a path must introduce for a caller: its roles if it has some, the caller itself otherwise.
+
+        :param caller: Caller to be verified.
+        :type caller: str
+        :param callerRoles: Roles associated with the caller.
+        :type callerRoles: list
+        :return: The mask.
+        :rtype: int
+        """
+        return self.get_mask("role", callerRoles) if len(callerRoles) > 0 else self.get_bit("participant", caller)
+
+    def introduces(self, transition_id, required) -> bool:
+        """
+        Checks if a transition introduces the bits required for a caller, see ``get_required``: the caller itself,
+        or the roles of the caller along with some participant.
+
+        :param transition_id: Id of the transition in the table.
+        :type transition_id: int
+        :param required: The mask given by ``get_required``.
+        :type required: int
+        :return: Whether the transition introduces the caller.
+        :rtype: bool
+        """
+        participants = self.participants[transition_id]
+        return participants & required == required or (participants != 0 and self.roles[transition_id] & required == required)
@@ -0,0 +1,193 @@
+import math
+import random
+from collections import deque
+from Settings import s_path_count_budget, s_path_estimate_probes, s_path_estimate_seed
+
+class PathCount:
+    """
+    A number of paths of a DAFSM, as given by ``PathCounter``.
+
+    :param count: The number of paths, a lower bound of it when the count is not exact, or its estimate.
+    :type count: int
+    :param exact: True if the count is exact, False if the budget ran out inside a cycle or if the count is estimated.
+    :type exact: bool
+    :param interval: The 95% confidence interval of an estimated count, None if the count is not estimated.
+    :type interval: tuple[int, int]
+    """
+
+    def __init__(self, count, exact = True, interval = None) -> None:
+        self.count = count
+        self.exact = exact
+        self.interval = interval
+
+    @property
+    def kind(self) -> str:
+        """
+        How the count was obtained: "exact", "bound" (lower bound) or "estimate".
+        """
+        if self.interval is not None:
+            return "estimate"
+        return "exact" if self.exact else "bound"
+
+    def __str__(self) -> str:
+        if self.interval is not None:
+            return f"~ {self.count} (95% confidence interval [{self.interval[0]}, {self.interval[1]}])"
+        return str(self.count) if self.exact else f">= {self.count} (bounded inside cycles)"
+
+
+class PathCounter:
+    """
+    Counts the simple paths of a DAFSM without listing them.
+
+    A simple path goes through the strongly connected components of the graph in their topological order and
+    stays in each of them for one contiguous part, so the paths are counted by dynamic programming over the
+    condensation: the paths entering a component at some state are extended by the simple paths inside the
+    component that start from it. Parallel transitions count as different paths. Outside cycles this only sums
+    and multiplies counts, so the result is exact, with Python integers of arbitrary size. Inside a cycle the
+    simple paths are enumerated, with a budget of steps for the whole count; once it is exhausted, the paths
+    not enumerated yet are left out and the count is a lower bound, as when the token of the run is cancelled.
+
+    :param graph: The graph of the DAFSM.
+    :type graph: CompactGraph
+    :param budget: Number of steps of the enumeration inside the cycles.
+    :type budget: int
+    :param token: Budget of the run the steps of the enumeration are counted on, None for none.
+    :type token: CancellationToken
+    """
+
+    def __init__(self, graph, budget = s_path_count_budget, token = None) -> None:
+        self.graph = graph
+        self.budget = budget
+        self.token = token
+        self.steps = 0
+
+    def count(self, source, targets) -> PathCount:
+        """
+        Counts the simple paths from a state to a set of states.
+
+        :param source: Number of the first state.
+        :type source: int
+        :param targets: Numbers of the last states.
+        :type targets: set[int]
+        :return: The number of paths.
+        :rtype: PathCount
+        """
+        graph = self.graph
+        components, component_of = graph.get_components()
+        # number of paths from the source ending in each state
+        paths = [0] * len(graph.names)
+        self.steps = 0
+        exact = True
+        for component in components[component_of[source]:]:
+            entering = {}
+            for state in component:
+                number = 1 if state == source else 0
+                for transition_id in graph.incoming(state):
+                    from_state = graph.sources[transition_id]
+                    if component_of[from_state] != component_of[state]:
+                        number += paths[from_state]
+                if number > 0:
+                    entering[state] = number
+
+            for state, number in entering.items():
+                paths[state] += number
+                if len(component) > 1:
+                    exact = self.count_inside(state, number, paths) and exact
+
+        return PathCount(sum(paths[state] for state in targets), exact)
+
+    def count_inside(self, entry, number, paths) -> bool:
+        """
+        Extends the paths entering a component at a state by the simple paths inside the component.
+
+        :param entry: Number of the state where the paths enter the component.
+        :type entry: int
+        :param number: Number of paths entering the component at this state.
+        :type number: int
+        :param paths: Number of paths ending in each state, updated with the extended paths.
+        :type paths: list[int]
+        :return: False if the budget or the token ran out before all the simple paths inside the component were enumerated.
+        :rtype: bool
+        """
+        graph = self.graph
+        component_of = graph.component_of
+        component = component_of[entry]
+        trail = [entry]
+        on_path = {entry}
+        stack = [(iter(graph.successors[entry]), number)]
+        while stack:
+            successors, weight = stack[-1]
+            step = next((step for step in successors if component_of[step[0]] == component and step[0] not in on_path), None)
+            if step is None:
+                stack.pop()
+                on_path.discard(trail.pop())
+                continue
+            if self.steps >= self.budget or (self.token is not None and self.token.step()):
+                return False
+            self.steps += 1
+            to_state, start, end = step
+            paths[to_state] += weight * (end - start)
+            trail.append(to_state)
+            on_path.add(to_state)
+            stack.append((iter(graph.successors[to_state]), weight * (end - start)))
+        return True
+
+    def estimate(self, source, targets, probes = s_path_estimate_probes, seed = s_path_estimate_seed, bound = 0) -> PathCount:
+        """
+        Estimates the number of simple paths from a state to a set of states, for the DAFSMs too large to count them.
+
+        Knuth's estimator: a probe walks a random simple path from the source, picking each step uniformly among the
+        states not on the path yet that can still reach a target. Each state reached is weighted by the product of
+        the number of choices met before it, times the parallel transitions taken, and a probe gives the sum of the
+        weights of the targets it reaches, whose expectation is the number of paths. The count is the mean of the
+        probes and its confidence interval is given by their standard deviation.
+
+        :param source: Number of the first state.
+        :type source: int
+        :param targets: Numbers of the last states.
+        :type targets: set[int]
+        :param probes: Number of random probes.
+        :type probes: int
+        :param seed: Seed of the random probes, None for a random seed.
+        :type seed: int
+        :param bound: A known lower bound of the number of paths, for instance a bounded ``count``, the estimate and its interval are kept above it.
+        :type bound: int
+        :return: The estimated number of paths, with its confidence interval.
+        :rtype: PathCount
+        """
+        graph = self.graph
+        generator = random.Random(seed)
+        # the states having a path to a target, the others are never worth a step
+        reaching = set(targets)
+        pending = deque(reaching)
+        while pending:
+            for from_state, _, _ in graph.predecessors[pending.popleft()]:
+                if from_state not in reaching:
+                    reaching.add(from_state)
+                    pending.append(from_state)
+
+        total = squares = 0
+        probes = max(1, probes)
+        for _ in range(probes):
+            value = 1 if source in targets else 0
+            weight = 1
+            state = source
+            on_path = {source}
+            while True:
+                choices = [step for step in graph.successors[state] if step[0] in reaching and step[0] not in on_path]
+                if not choices or (self.token is not None and self.token.step()):
+                    break
+                state, start, end = generator.choice(choices)
+                weight *= len(choices) * (end - start)
+                on_path.add(state)
+                if state in targets:
+                    value += weight
+            total += value
+            squares += value * value
+
+        mean = total / probes
+        # the sums are integers, so the variance of the probes is computed exactly before the division
+        variance = (probes * squares - total * total) / (probes * (probes - 1)) if probes > 1 else 0
+        margin = 1.96 * math.sqrt(variance / probes)
+        count = max(bound, round(mean))
+        return PathCount(count, False, (max(bound, math.floor(mean - margin)), max(count, math.ceil(mean + margin))))
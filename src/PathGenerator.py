@@ -11,40 +11,50 @@ class PathGenerator :
     """
 
     @staticmethod
-    def find_paths(graph, start, end, path=[]):
+    def find_paths(graph, start, end, path=[], token = None):
         """
         Recursively finds all paths from start to end node in a graph.
 
+        Each node visited is a step of the token, once it is cancelled the paths found so far are returned.
+
         :param graph: The graph represented as a dictionary.
         :type graph: dict
         :param start: The starting node.
         :param end: The ending node.
         :param path: The current path (used in recursive calls).
         :type path: list
+        :param token: Budget of the run, None for none.
+        :type token: CancellationToken
         :return: A list of paths, where each path is a list of nodes.
         :rtype: list[list]
         """
 
         path = path + [start]
         if start == end:
+            if token is not None:
+                token.path()
             return [path]
         if start not in graph:
             return []
         paths = []
         for node in graph[start]['to']:
+            if token is not None and token.step():
+                break
             if node not in path:
-                new_paths = PathGenerator.find_paths(graph, node, end, path)
+                new_paths = PathGenerator.find_paths(graph, node, end, path, token)
                 for new_path in new_paths:
                     paths.append(new_path)
         return paths
 
     @staticmethod
-    def group_transactions(transition_json):
+    def group_transactions(transition_json, token = None):
         """
         Groups transitions from the JSON representation of a DAFSM into paths from the initial to final states.
 
         :param transition_json: The JSON representation of the DAFSM's transitions.
         :type transition_json: dict
+        :param token: Budget of the run, the paths are only partly grouped once it is cancelled, None for none.
+        :type token: CancellationToken
         :return: A dictionary where keys are string representations of paths and values are lists of transitions for each path.
         :rtype: dict
         """
@@ -62,7 +72,7 @@ class PathGenerator :
 
         grouped_transactions = {}
         for final_state in final_states:
-            paths = PathGenerator.find_paths(graph, initial_state, final_state)
+            paths = PathGenerator.find_paths(graph, initial_state, final_state, token = token)
             for path in paths:
                 path_str = ' -> '.join(path)
                 formatted_transitions = []
@@ -115,7 +125,7 @@ class PathGenerator :
         return formatted_transition
     
     @staticmethod
-    def check_path_satisfiability(fsm, file_name):
+    def check_path_satisfiability(fsm, file_name, token = None):
         """
         Checks the satisfiability of each path within the DAFSM and outputs the results to a Python file for execution.
 
@@ -123,11 +133,17 @@ class PathGenerator :
         :type fsm: dict
         :param file_name: The base name for the output file where Z3 code will be generated.
         :type file_name: str
+        :param token: Budget of the run, the paths left once it is cancelled are not checked, None for none.
+        :type token: CancellationToken
         """
 
         file_name = f'./Z3_models/{file_name}'
-        result = PathGenerator.group_transactions(fsm)
+        result = PathGenerator.group_transactions(fsm, token)
         for path, transitions in result.items():
+            # each path is checked by a Z3 run of its own
+            if token is not None and token.query():
+                print(f"Run cancelled ({token}), the remaining paths are not checked")
+                break
             print(f"Path: {path}")
             temp = TransitionProcessor(fsm)
             result, deploy_init_var_val, var_names, participants = VariableDeclarationConverter.convert_to_z3_declarations(fsm['statesDeclaration'], temp.deploy_init_var_val, temp.var_names, True)
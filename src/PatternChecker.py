@@ -1,5 +1,8 @@
 import re
-from Extension import replace_assertion
+from functools import lru_cache
+from Extension import replace_assertion, lower_node
+from Expression import parse_expression, parse_assignments, names, render, rename, substitute, expression_cache, assignments_cache, ExpressionSyntaxError, TEXT, START, END
+from Settings import s_expression_parser
 
 class PatternChecker:
     """
@@ -25,6 +28,26 @@ class PatternChecker:
         pattern = r'^(\s*([a-zA-Z_]\w*|\w+\[\s*-?\d+\s*\])\s*:=\s*[^&|]+(&\s*([a-zA-Z_]\w*|\w+\[\s*-?\d+\s*\])\s*:=\s*[^&|]+)*)$'
         return bool(re.match(pattern, input_string))
 
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def free_variables(input_string):
+        """
+        Extracts the variables of an expression or of a list of assignments, in one walk of the tree of each expression.
+
+        :param input_string: The expression, or the assignments separated by '&'.
+        :type input_string: str
+        :return: The unique variable names, in the order of their first occurrence, or None if the string does not parse.
+        :rtype: tuple or None
+        """
+
+        if input_string.strip() == "":
+            return ()
+        try:
+            trees = [tree for assignment in parse_assignments(input_string) for tree in assignment] if ":=" in input_string else [parse_expression(input_string)]
+        except ExpressionSyntaxError:
+            return None
+        return tuple(dict.fromkeys(node[TEXT] for tree in trees for node in names(tree)))
+
     @staticmethod
     def get_all_old_variables(input_string):
         """
@@ -36,6 +59,13 @@ class PatternChecker:
         :rtype: list
         """
 
+        if s_expression_parser == "ast":
+            if "_old" not in input_string:
+                return []
+            variables = PatternChecker.free_variables(input_string)
+            if variables is not None:
+                return [name for name in variables if len(name) > 4 and name.endswith("_old")]
+
         pattern = r'\b\w+_old\b'
         old_words = list(set(re.findall(pattern, input_string)))
         return old_words
@@ -55,6 +85,30 @@ class PatternChecker:
         :rtype: str
         """
 
+        if s_expression_parser == "ast":
+            try:
+                assignments = parse_assignments(assertion)
+            except ExpressionSyntaxError:
+                assignments = None
+            if assignments is not None:
+                targets = [assertion[target[START]:target[END]] for target, _ in assignments]
+                var_in_f = set(targets).intersection(vars)
+                parts = [
+                    f"{text} := {substitute(assertion, [(node[START], node[END], node[TEXT] + '_old ') for node in names(value) if node[TEXT] in var_in_f], value[START], value[END])}"
+                    for text, (_, value) in zip(targets, assignments)
+                ]
+                updated = " & ".join(parts)
+                if updated != assertion:
+                    # the trees of the written assignments are kept, z3_post_condition and get_all_old_variables read them next
+                    trees = []
+                    position = 0
+                    for text, part, (target, value) in zip(targets, parts, assignments):
+                        value_position = position + len(text) + len(" := ")
+                        trees.append((rename(target, (), "", position - target[START]), rename(value, var_in_f, "_old", value_position - value[START], " ")))
+                        position += len(part) + len(" & ")
+                    assignments_cache.put(updated, tuple(trees))
+                return updated
+
         updated_vars = []  # List to store updated variable names
         var_in_f = set()
         processed_assignments = []
@@ -73,7 +127,8 @@ class PatternChecker:
         for d in assertion.split("&"):
             parts = [part.strip() for part in d.split(":=")]
             if len(parts) == 2:      
-                updated_expression = re.sub(pattern, replace, parts[1])
+                # an empty alternation would match at every word boundary
+                updated_expression = re.sub(pattern, replace, parts[1]) if var_in_f else parts[1]
                 processed_assignments.append(f"{parts[0]} := {updated_expression}")
 
         modified_assertion = " & ".join(processed_assignments)
@@ -96,6 +151,16 @@ class PatternChecker:
 
         if  postC.strip() == "" :
             return ["True", []]
+
+        if s_expression_parser == "ast":
+            try:
+                assignments = parse_assignments(postC)
+            except ExpressionSyntaxError:
+                assignments = None
+            if assignments is not None:
+                _varnames = [postC[target[START]:target[END]] for target, _ in assignments]
+                formula = ", ".join(f"{_varname} == {render(value, lower_node)}" for _varname, (_, value) in zip(_varnames, assignments))
+                return [f"And({formula})", _varnames]
         
         try:
             _list = postC.split("&")
@@ -155,13 +220,36 @@ class PatternChecker:
         def replace(match):
             return match.group(0) + "_old"
 
+        z3_reserved_words = ['And', 'Or', 'Not', 'Implies', 'ForAll', 'Exists', 'Bool', 'Int', 'Real', 'eq']
+        reserved_words = z3_reserved_words + ['and', 'or', 'not', 'if', 'else', 'for', 'while', 'in', 'True', 'False', 'None', 'len', 'append']
+        inputs = []
+
+        if s_expression_parser == "ast" and preC.strip() != "":
+            try:
+                variables = names(parse_expression(preC))
+            except ExpressionSyntaxError:
+                variables = None
+            if variables is not None:
+                post_variables = set(postC_vars).difference(reserved_words)
+                renamed = set()
+                try:
+                    for node in variables:
+                        if node[TEXT] in post_variables:
+                            renamed.add(node[TEXT])
+                            inputs.append(f"{var_names[node[TEXT]]} {node[TEXT]}_old")
+                except Exception as e:
+                    print(f"replace_var_with_old_in_pre: {e}")
+                if not renamed:
+                    return (preC, inputs)
+                updated = substitute(preC, [(node[START], node[END], node[TEXT] + "_old") for node in variables if node[TEXT] in renamed])
+                # replace_assertion reads the precondition next
+                expression_cache.put(updated, rename(parse_expression(preC), renamed, "_old"))
+                return (updated, inputs)
+
         try:
-            z3_reserved_words = ['And', 'Or', 'Not', 'Implies', 'ForAll', 'Exists', 'Bool', 'Int', 'Real', 'eq']
-            reserved_words = z3_reserved_words + ['and', 'or', 'not', 'if', 'else', 'for', 'while', 'in', 'True', 'False', 'None', 'len', 'append']
             pattern = r'\b(?:[a-zA-Z_]\w*)\b'
             variable_names = re.findall(pattern, preC)
 
-            inputs = []
             for name in variable_names:
                 if name not in reserved_words and name in postC_vars:
                     preC = re.sub(r'\b' + re.escape(name) + r'\b', replace, preC)
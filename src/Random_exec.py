@@ -5,18 +5,20 @@ import time
 import traceback
 import argparse
 import pandas as pd
-from Fbuilder import Fbuilder
 from TransactionsGrinder import TransactionsGrinder
+from FSMGraph import FSMGraph
 from The_Validator import The_Validator
 from MiniTimer import MiniTimer
 from Settings import *
 from Helpers import run_parallel_generations, write_csv
 from Z3Runner import Z3Runner
+from Z3WorkerPool import Z3WorkerPool
 
 
-def function_to_count_num_path(list_, csv_data, index, directory, time_out = s_time_out ):
+def function_to_count_num_path(list_, csv_data, index, directory, time_out = s_time_out, estimate = False):
     """ 
     Counts the number of paths in DAFSMs defined in text files and updates a CSV data structure with the counts.
+    The CSV records in ``num_paths_kind`` whether each count is "exact", a lower "bound" or an "estimate".
     
     :param list_: List of text file paths containing DAFSM definitions.
     :type list_: list[str]
@@ -32,8 +34,10 @@ def function_to_count_num_path(list_, csv_data, index, directory, time_out = s_t
 
     :param time_out: Timeout limit for processing each DAFSM.
     :type time_out: float
+
+    :param estimate: If True, the counts that are not exact are replaced by an estimate by random probes.
+    :type estimate: bool
     """
-    sValidator = The_Validator()
     n_csv_data = []
     timer = MiniTimer()
     for txt_file_path in list_:
@@ -46,10 +50,18 @@ def function_to_count_num_path(list_, csv_data, index, directory, time_out = s_t
             folder += "/"
             part = folder.split("random_txt")
             trGrinder = TransactionsGrinder(file_base_name, f"./Z3_models/random_tests/" + part[1], folder, folder.replace('random_txt', 'random_json'), False, time_out = time_out)
-            sValidator.transitions_to_json(trGrinder.get_full_txt_path(), trGrinder.get_full_json_path())
-            trGrinder.get_json_from_file()
             print(f"Counting Paths-- {trGrinder.get_full_txt_path()} -----")
-            csv_data[txt_file_path][1]["num_paths"] = trGrinder.transition_processor().fsmGraph.get_number_of_paths(trGrinder.fsm['states'])
+            # the graph is built from the transitions as they are read, without the DAFSM data
+            validator = The_Validator()
+            fsm_graph = FSMGraph({"transitions": validator.read_transitions(trGrinder.get_full_txt_path())}, False)
+            states = list(validator.states)
+            num_paths = fsm_graph.count_paths(states)
+            if estimate and not num_paths.exact:
+                num_paths = fsm_graph.estimate_paths(states, bound = num_paths.count)
+            if not num_paths.exact:
+                print(f"Number of paths: {num_paths}")
+            csv_data[txt_file_path][1]["num_paths"] = num_paths.count
+            csv_data[txt_file_path][1]["num_paths_kind"] = num_paths.kind
             n_csv_data.append(list(csv_data[txt_file_path][1].values()))
             print()
         except Exception as e:
@@ -62,7 +74,7 @@ def function_to_count_num_path(list_, csv_data, index, directory, time_out = s_t
     write_csv(path, n_csv_data)
     return []
 
-def function_to_run(list_, csv_data, index, directory, number_runs_per_each, time_out = s_time_out ):
+def function_to_run(list_, csv_data, index, directory, number_runs_per_each, time_out = s_time_out, z3_engine = s_z3_engine, z3_query_time_out = s_z3_query_time_out, z3_model_time_out = s_z3_model_time_out, caller_check = s_caller_check, caller_cache = 0, step_budget = s_step_budget, progress = 0, parse_cache = s_parse_cache):
     """
     Processes DAFSMs defined in text files, runs verification, and updates CSV data with the results.
 
@@ -78,11 +90,29 @@ def function_to_run(list_, csv_data, index, directory, number_runs_per_each, tim
     :type number_runs_per_each: int
     :param time_out: Timeout limit for processing each DAFSM.
     :type time_out: int
+    :param z3_engine: Engine used to check the Z3 models, "inprocess", "pool", "parallel" or "subprocess".
+    :type z3_engine: str
+    :param z3_query_time_out: Time budget of each Z3 query in milliseconds, 0 for no limit.
+    :type z3_query_time_out: int
+    :param z3_model_time_out: Time budget of the Z3 checks of each model in milliseconds, 0 for no limit.
+    :type z3_model_time_out: int
+    :param caller_check: Strategy of the caller check, "dataflow", "scc", "dfs" or "paths".
+    :type caller_check: str
+    :param caller_cache: Reuses the verdicts of the caller checks already done, in previous runs or other models, if 1. Off by default, the cached verdicts would hide the times of the caller checks and the numbers of paths measured here.
+    :type caller_cache: int
+    :param step_budget: Steps of each run of the graph analyses and Z3 queries beyond which it is cancelled, 0 for no limit.
+    :type step_budget: int
+    :param progress: Prints the progress of the runs if 1.
+    :type progress: int
+    :param parse_cache: Reuses the DAFSMs parsed and pre-processed from unchanged txt files if 1.
+    :type parse_cache: int
     """
 
-    sValidator = The_Validator()
     n_csv_data = []
     timer = MiniTimer()
+    if z3_engine == "pool":
+        # one warm worker per process, the models are already spread over the CPUs
+        Z3WorkerPool.shared(1)
     for txt_file_path in list_:
         if txt_file_path not in list(csv_data.keys()):
             continue
@@ -99,10 +129,19 @@ def function_to_run(list_, csv_data, index, directory, number_runs_per_each, tim
                 folder, 
                 folder.replace('random_txt', 'random_json'), 
                 False, 
-                time_out = time_out
+                time_out = time_out,
+                z3_engine = z3_engine,
+                z3_query_time_out = z3_query_time_out,
+                z3_model_time_out = z3_model_time_out,
+                caller_check = caller_check,
+                caller_cache = caller_cache == 1,
+                parse_cache = parse_cache == 1,
+                step_budget = step_budget,
+                progress = (lambda token, name = file_base_name: print(f"Progress-- {name}: {token}")) if progress == 1 else None,
+                # cached results would hide the solving times measured here
+                z3_cache = False
             )
-            sValidator.transitions_to_json(trGrinder.get_full_txt_path(), trGrinder.get_full_json_path())
-            trGrinder.get_json_from_file()
+            trGrinder.get_fsm_from_txt()
             trGrinder.pre_process_fsm()
 
             print(f"Building-- and running -- {trGrinder.get_full_z3model_path()} -----")
@@ -125,6 +164,8 @@ def function_to_run(list_, csv_data, index, directory, number_runs_per_each, tim
                 times["a_consistency"] += trGrinder.info["t_a_consistency"]
 
                 if trGrinder.info["is_time_out"]:
+                    if trGrinder.token.cancelled:
+                        print(f"Time out-- {file_base_name}: {trGrinder.token}")
                     if nb_time_out > 2:
                         break
 
@@ -133,17 +174,23 @@ def function_to_run(list_, csv_data, index, directory, number_runs_per_each, tim
                 
                 
                 timer.start_time()
-                Fbuilder.build_z3_formulas_model_and_save(trGrinder, trGrinder.get_full_z3model_path(), False)
+                Z3Runner.build_model(trGrinder, trGrinder.get_full_z3model_path(), False)
                 times["f_building"] += timer.get_ellapsed_time()
 
                 timer.start_time()
                 verdict = Z3Runner.execute_model(trGrinder,trGrinder.get_full_z3model_path())
                 runningTime += timer.get_ellapsed_time()
+
+                # The in-process engine builds the formulas while running, move that part to f_building
+                if trGrinder.verdict is not None:
+                    times["f_building"] += trGrinder.verdict.building_time
+                    runningTime -= trGrinder.verdict.building_time
             
             print(trGrinder.output)
             
             if txt_file_path in list(csv_data.keys()):
                 csv_data[txt_file_path][1]["num_paths"] = trGrinder.info["nb_path"]
+                csv_data[txt_file_path][1]["num_paths_kind"] = "explored"
                 csv_data[txt_file_path][1]["verdict"] = verdict
                 csv_data[txt_file_path][1]["participants_time"] = times["participants"] / nb_runs
                 csv_data[txt_file_path][1]["non_determinism_time"] = times["non_determinism"] / nb_runs
@@ -180,11 +227,29 @@ class RandomTransitionsExecuter:
     :type number_runs_per_each: int
     :param time_out: Timeout limit for processing each DAFSM.
     :type time_out: int
+    :param z3_engine: Engine used to check the Z3 models, "inprocess", "pool", "parallel" or "subprocess".
+    :type z3_engine: str
+    :param z3_query_time_out: Time budget of each Z3 query in milliseconds, 0 for no limit.
+    :type z3_query_time_out: int
+    :param z3_model_time_out: Time budget of the Z3 checks of each model in milliseconds, 0 for no limit.
+    :type z3_model_time_out: int
+    :param caller_check: Strategy of the caller check, "dataflow", "scc", "dfs" or "paths".
+    :type caller_check: str
+    :param caller_cache: Reuses the verdicts of the caller checks already done, in previous runs or other models, if 1. Off by default, see ``function_to_run``.
+    :type caller_cache: int
+    :param step_budget: Steps of each run of the graph analyses and Z3 queries beyond which it is cancelled, 0 for no limit.
+    :type step_budget: int
+    :param progress: Prints the progress of the runs if 1.
+    :type progress: int
+    :param parse_cache: Reuses the DAFSMs parsed and pre-processed from unchanged txt files if 1.
+    :type parse_cache: int
     """
 
     def __init__(self, directory, merge_csv = 0, 
                  number_test_per_cpu = s_number_test_per_cpu, 
-                 number_runs_per_each = s_number_runs_per_each, time_out =  s_time_out) -> None:
+                 number_runs_per_each = s_number_runs_per_each, time_out =  s_time_out, z3_engine = s_z3_engine,
+                 z3_query_time_out = s_z3_query_time_out, z3_model_time_out = s_z3_model_time_out, caller_check = s_caller_check, caller_cache = 0,
+                 step_budget = s_step_budget, progress = 0, parse_cache = s_parse_cache) -> None:
         self.directory = directory
         self.merge_csv = merge_csv
         self.headers = s_csv_headers
@@ -196,6 +261,14 @@ class RandomTransitionsExecuter:
         self.base_dir =  os.path.join('./Examples/random_txt/', self.directory)
         self.timer = MiniTimer()
         self.time_out = time_out
+        self.z3_engine = z3_engine
+        self.z3_query_time_out = z3_query_time_out
+        self.z3_model_time_out = z3_model_time_out
+        self.caller_check = caller_check
+        self.caller_cache = caller_cache
+        self.step_budget = step_budget
+        self.progress = progress
+        self.parse_cache = parse_cache
         print("Init Done")
 
     def read_csv_data(self, path):
@@ -259,13 +332,16 @@ class RandomTransitionsExecuter:
         works = []
         num_item = self.number_test_per_cpu
         for i in range(0, len(txt_files), num_item):
-            works.append((function_to_run, txt_files[i:min(i + num_item, len(txt_files))], self.csv_data, i, self.directory, self.number_runs_per_each, self.time_out))
+            works.append((function_to_run, txt_files[i:min(i + num_item, len(txt_files))], self.csv_data, i, self.directory, self.number_runs_per_each, self.time_out, self.z3_engine, self.z3_query_time_out, self.z3_model_time_out, self.caller_check, self.caller_cache, self.step_budget, self.progress, self.parse_cache))
 
         run_parallel_generations(works)
 
-    def count_all_path_in_fsm(self):
+    def count_all_path_in_fsm(self, estimate = False):
         """
         Counts all paths in DAFSMs defined in text files and updates CSV data with the counts.
+
+        :param estimate: If True, the counts that are not exact are replaced by an estimate by random probes.
+        :type estimate: bool
         """
         self.csv_data = self.read_csv_data(self.csv_merged_file_path)
         data = pd.read_csv(os.path.join(self.base_dir, 'merged_list_of_files_info.csv'))
@@ -276,7 +352,7 @@ class RandomTransitionsExecuter:
         num_item = self.number_test_per_cpu
         for i in range(0, len(txt_files), num_item):
             end_index = min(i + num_item, len(txt_files))
-            works.append((function_to_count_num_path, txt_files[i:end_index], self.csv_data, i, self.directory))
+            works.append((function_to_count_num_path, txt_files[i:end_index], self.csv_data, i, self.directory, self.time_out, estimate))
 
         run_parallel_generations(works)
 
@@ -284,16 +360,24 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate Random Transitions and Store Them in Files')
     parser.add_argument('directory', type=str, help='Txt Dir where tests are located')
     parser.add_argument('--merge_csv', type=int, default = 0, help='Merge Only Csvs in dir 1 true 0')
-    parser.add_argument('--add_path', type=int, default = 0, help='add path in dir 1 true 0')
+    parser.add_argument('--add_path', type=int, default = 0, choices=[0, 1, 2], help='Count the paths of the DAFSMs in dir: 1 exactly (bounded inside large cycles), 2 estimating the counts that are not exact, 0 no')
     parser.add_argument('--number_test_per_cpu', type=int, default = s_number_test_per_cpu, help='Number per cpu / thread')
     parser.add_argument('--number_runs_per_each', type=int, default = s_number_runs_per_each, help='Number of runs per each')
     parser.add_argument('--time_out', type=int, default = s_time_out , help='Time out number')
+    parser.add_argument('--z3_engine', default = s_z3_engine, choices=['inprocess', 'pool', 'parallel', 'subprocess'], help='Engine used to check the Z3 models')
+    parser.add_argument('--z3_query_time_out', type=int, default = s_z3_query_time_out, help='Time budget of each Z3 query in milliseconds (0 for no limit)')
+    parser.add_argument('--caller_check', default = s_caller_check, choices=['dataflow', 'scc', 'dfs', 'paths'], help='Strategy of the caller check')
+    parser.add_argument('--step_budget', type=int, default = s_step_budget, help='Steps of each run of the graph analyses and Z3 queries beyond which it is cancelled (0 for no limit)')
+    parser.add_argument('--progress', type=int, default = 0, choices=[0, 1], help='Print the progress of the runs (1) or not (0)')
+    parser.add_argument('--caller_cache', type=int, default = 0, choices=[0, 1], help='Reuse the verdicts of the caller checks already done (1) or check every caller (0), as by default so that the participants times and the numbers of paths are measured')
+    parser.add_argument('--parse_cache', type=int, default = s_parse_cache, choices=[0, 1], help='Reuse the models already parsed and pre-processed (1) or parse every model (0)')
+    parser.add_argument('--z3_model_time_out', type=int, default = s_z3_model_time_out, help='Time budget of the Z3 checks of each model in milliseconds (0 for no limit)')
     args = parser.parse_args()
    
-    rExec = RandomTransitionsExecuter(args.directory, args.merge_csv, args.number_test_per_cpu, args.number_runs_per_each, time_out = args.time_out)
+    rExec = RandomTransitionsExecuter(args.directory, args.merge_csv, args.number_test_per_cpu, args.number_runs_per_each, time_out = args.time_out, z3_engine = args.z3_engine, z3_query_time_out = args.z3_query_time_out, z3_model_time_out = args.z3_model_time_out, caller_check = args.caller_check, caller_cache = args.caller_cache, step_budget = args.step_budget, progress = args.progress, parse_cache = args.parse_cache)
 
-    if args.add_path == 1 :
-        rExec.count_all_path_in_fsm()
+    if args.add_path in (1, 2):
+        rExec.count_all_path_in_fsm(estimate = args.add_path == 2)
     elif args.merge_csv == 1:
         rExec.merge_and_delete()
     else:
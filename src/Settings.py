@@ -5,7 +5,7 @@ def _():
     pass
 
 # CSV headers metadata
-s_csv_headers = ["path", "num_states", "num_actions", "num_vars", "max_branching_factor", "num_participants", "num_transitions", "seed_num", "min_param_num", "average_param_num", "max_param_num", "min_bf_num", "average_bf_num", "max_bf_num", "num_paths",  "verdict", "participants_time", "non_determinism_time", "a_consistency_time", "f_building_time", "building_time", "z3_running_time", "total", "is_time_out"]
+s_csv_headers = ["path", "num_states", "num_actions", "num_vars", "max_branching_factor", "num_participants", "num_transitions", "seed_num", "min_param_num", "average_param_num", "max_param_num", "min_bf_num", "average_bf_num", "max_bf_num", "num_paths",  "verdict", "participants_time", "non_determinism_time", "a_consistency_time", "f_building_time", "building_time", "z3_running_time", "total", "is_time_out", "num_paths_kind"]
 
 # Time metrics for reporting
 s_time_metrics = ['participants_time', 'non_determinism_time', 'a_consistency_time', 'z3_running_time']
@@ -29,6 +29,12 @@ s_well_formed_message = "(!) Verdict: Well Formed"
 # Message indicating a non well-formed DAFSM
 s_non_well_formed_message = "(!) Verdict: Non Well Formed"
 
+# Message indicating a DAFSM whose checks ran out of solver time
+s_unknown_message = "(!) Verdict: Unknown (solver time out)"
+
+# Message indicating a DAFSM whose run was cancelled, filled with the state of the run (see CancellationToken)
+s_cancelled_message = "(!) Verdict: Unknown (run cancelled: {})"
+
 # Paths for file handling
 s_z3model_path = "./Z3_models/"  # Path to store Z3 model files
 s_txt_path = "./Examples/dafsm_txt/"  # Path to locate DAFSM text files
@@ -37,6 +43,30 @@ s_json_path = "./Examples/jsons/"  # Path to store generated JSON files
 # Default settings for processing
 s_non_stop = 1  # Flag to continue processing on errors
 s_time_out = 300000000000  # Timeout limit for processing
+s_z3_engine = "inprocess"  # Z3 engine: "inprocess" checks models in the running process, "pool" in warm worker processes, "parallel" spreads the checks of a model over processes, "subprocess" runs the generated file with python3
+s_z3_pool_size = 0  # Number of workers of the "pool" and "parallel" engines, 0 uses the number of CPUs minus 1
+s_z3_backend = "ast"  # Formulas of the in-process engine: "ast" builds z3 expressions directly, "source" evaluates the generated formula text
+s_z3_cache = 1  # Reuse the results of obligations already checked (all engines but "subprocess"), 0 checks every obligation with Z3
+s_z3_cache_path = "./Z3_models/obligations_cache.sqlite"  # SQLite file of the obligation cache
+s_z3_cache_max_entries = 100000  # Number of obligations kept in the cache, the least recently used ones are evicted above it
+s_z3_query_time_out = 0  # Time budget of each Z3 query in milliseconds, a query running out of it gives "unknown", 0 for no limit
+s_z3_model_time_out = 0  # Time budget of the Z3 checks of a model in milliseconds, 0 for no limit
+s_caller_check = "dataflow"  # Caller check: "dataflow" (participants introduced in every path, by fixpoint), "scc" (the same fixpoint, solved once per strongly connected component in topological order), "dfs" (search of the simple paths backwards, cut once the caller is introduced) or "paths" (enumeration of the simple paths)
+s_path_count_budget = 1000000  # Steps of the enumeration of the simple paths inside the cycles of a DAFSM when counting its paths, beyond which the count is a lower bound
+s_path_estimate_probes = 10000  # Random probes of the estimation of the number of simple paths of a DAFSM (Random_exec --add_path 2)
+s_path_estimate_seed = 0  # Seed of the random probes of the estimation of the number of paths, None for a random seed
+s_caller_cache = 1  # Reuse the verdicts of the caller checks already done on the same paths, across runs and models (all caller checks but "paths")
+s_caller_cache_path = "./Z3_models/caller_check_cache.sqlite"  # SQLite file of the caller check cache
+s_caller_cache_max_entries = 100000  # Number of caller checks kept in the cache, the least recently used ones are evicted above it
+s_step_budget = 0  # Steps of a run (paths explored and transitions walked by the graph analyses, Z3 queries) beyond which it is cancelled, 0 for no limit
+s_progress_interval = 100000  # Steps of a run between two checks of its time budget and two progress reports
+s_write_json = 0  # Write the DAFSM parsed from a txt file to its JSON file, 0 keeps it in memory only
+s_txt_parser = "regex"  # Parser of the txt DSL: "regex" (regular expressions, skipping the lines they do not match) or "descent" (single pass tokenizer and recursive descent parser, reporting the line and column of the syntax errors, about 40% slower)
+s_expression_parser = "ast"  # Rewriting of the guards and postconditions: "ast" (each expression is parsed once into a tree, the renaming of the old values, the lowering of the functions of the DSL and the extraction of the variables are walks of it) or "regex" (regular expressions over the text)
+s_parse_cache = 1  # Reuse the DAFSMs parsed and pre-processed from unchanged txt files, across runs and processes, 0 parses each time
+s_parse_cache_path = "./Z3_models/parse_cache.sqlite"  # SQLite file of the parse cache
+s_parse_cache_max_entries = 10000  # Number of parsed models kept in the cache, the least recently used ones are evicted above it
+s_incremental = 0  # Recheck only the transitions affected by the changes made since the previous check of the model
 
 # Default parameters for global randomizer. If set to None then they will be randomly generated
 s_num_tests = None  # Number of tests to be generated
@@ -1,19 +1,31 @@
 import json
 import re
+from TransitionParser import TransitionParser, TransitionSyntaxError
+from Settings import s_txt_parser
 
 class The_Validator:
     """
     Validates and converts textual representations of transitions into a structured JSON format.
     This class specifically handles parsing of deploy and action transitions defined in a textual
     format and constructs a corresponding JSON object that represents the contract structure.
+
+    :param parser: Parser of the lines, "descent" (``TransitionParser``, reporting the syntax errors with their line and column) or "regex" (the regex patterns, skipping the lines they do not match).
+    :type parser: str
     """
 
-    def __init__(self):
+    def __init__(self, parser = s_txt_parser):
         """
         Initializes The_Validator with regex patterns for deploy and action transitions.
         """
         self.contract_id = ""
         self.initialStage = ""
+        self.parser = parser
+        self.transition_parser = TransitionParser()
+        # Syntax errors, states (dicts kept as ordered sets), final states and state variables declarations of the last lines parsed
+        self.errors = []
+        self.states = {}
+        self.final_states = {}
+        self.states_declaration = ""
         # Define the regex patterns for each type of transition
         # Define the regex pattern for the deploy transition
         self.deploy_pattern = re.compile(
@@ -39,46 +51,99 @@ class The_Validator:
         # Check for deploy transition
         match = self.deploy_pattern.match(line)
         if match:
-            _, pre_condition, participant, role, self.contract_id, params, post_condition, states_variables_declaration, to_stage, final_marker = match.groups()
-            # Params are optional in the deploy transition
-            params = params.strip() if params else ""
-            self.initialStage = to_stage.rstrip('+')
-            transition = {
-                "from": "_",
-                "to": self.initialStage,
-                "initialStates": [self.initialStage],
-                "finalStates": [self.initialStage] if final_marker else [],
-                "newParticipants": {participant: role},
-                "caller": {participant: []},
-                "actionLabel": "starts",
-                "preCondition": pre_condition,
-                "postCondition": post_condition,
-                "input": params,
-                "externalAction": False
-            }
-            return transition, states_variables_declaration
+            return self.deploy_transition(match.groups())
 
         # Check for other types of transitions
         match = self.action_pattern.match(line)
         if match:
-            from_stage, pre_condition, any_keyword, participant, role, contract_id, action, params, post_condition, to_stage, final_marker = match.groups()
-            transition = {
-                "from": from_stage,
-                "to": to_stage.rstrip('+'),
-                "initialStates": [],
-                "finalStates": [to_stage.rstrip('+')] if final_marker else [],
-                "newParticipants": {participant: role} if role and not any_keyword else {},
-                "caller": {participant: [role] if any_keyword else []},
-                "actionLabel": action,
-                "preCondition": pre_condition,
-                "postCondition": post_condition,
-                "input": params,
-                "externalAction": False
-            }
-            return transition, None
+            return self.action_transition(match.groups()), None
 
         return None, None
 
+    def parse_line(self, line, number = 1, source = ""):
+        """
+        Parses a line of text representing a transition with the parser of the validator.
+
+        With the "descent" parser, a line that is not a transition is reported with its line and column,
+        kept in ``errors``, and skipped as the regex patterns skip the lines they do not match.
+
+        :param line: A line of text representing a transition.
+        :type line: str
+        :param number: Number of the line, for the syntax errors.
+        :type number: int
+        :param source: Where the line comes from, for the syntax errors.
+        :type source: str
+        :return: A tuple containing a dictionary representation of the transition and an
+                optional string of state variables declarations (if present).
+        :rtype: tuple[dict, str]
+        """
+        if self.parser != "descent":
+            return self.parse_transition(line.strip())
+        try:
+            kind, groups = self.transition_parser.parse(line, number)
+        except TransitionSyntaxError as e:
+            self.errors.append(e)
+            print(f"Syntax error in {source or 'the model'}, {e}")
+            return None, None
+        if kind == "deploy":
+            return self.deploy_transition(groups)
+        if kind == "action":
+            return self.action_transition(groups), None
+        return None, None
+
+    def deploy_transition(self, groups):
+        """
+        Builds the deploy transition from the groups of ``deploy_pattern``.
+
+        :param groups: The groups captured from the line.
+        :type groups: tuple
+        :return: A tuple containing a dictionary representation of the transition and the string of state variables declarations.
+        :rtype: tuple[dict, str]
+        """
+        _, pre_condition, participant, role, self.contract_id, params, post_condition, states_variables_declaration, to_stage, final_marker = groups
+        # Params are optional in the deploy transition
+        params = params.strip() if params else ""
+        self.initialStage = to_stage.rstrip('+')
+        transition = {
+            "from": "_",
+            "to": self.initialStage,
+            "initialStates": [self.initialStage],
+            "finalStates": [self.initialStage] if final_marker else [],
+            "newParticipants": {participant: role},
+            "caller": {participant: []},
+            "actionLabel": "starts",
+            "preCondition": pre_condition,
+            "postCondition": post_condition,
+            "input": params,
+            "externalAction": False
+        }
+        return transition, states_variables_declaration
+
+    def action_transition(self, groups):
+        """
+        Builds a transition other than the deploy one from the groups of ``action_pattern``.
+
+        :param groups: The groups captured from the line.
+        :type groups: tuple
+        :return: A dictionary representation of the transition.
+        :rtype: dict
+        """
+        from_stage, pre_condition, any_keyword, participant, role, contract_id, action, params, post_condition, to_stage, final_marker = groups
+        transition = {
+            "from": from_stage,
+            "to": to_stage.rstrip('+'),
+            "initialStates": [],
+            "finalStates": [to_stage.rstrip('+')] if final_marker else [],
+            "newParticipants": {participant: role} if role and not any_keyword else {},
+            "caller": {participant: [role] if any_keyword else []},
+            "actionLabel": action,
+            "preCondition": pre_condition,
+            "postCondition": post_condition,
+            "input": params,
+            "externalAction": False
+        }
+        return transition
+
     # Main function to convert the transitions text to JSON format
     def transitions_to_json(self, transitions_txt_path, json_output_path):
         """
@@ -88,47 +153,101 @@ class The_Validator:
         :type transitions_txt_path: str
         :param json_output_path: The output file path for the resulting JSON.
         :type json_output_path: str
+        :return: The contract structure written to the JSON file.
+        :rtype: dict
 
         This method reads transitions from a text file, parses them, and constructs a JSON
         object that represents the entire contract structure including transitions, states,
         and participants.
         """
+        contract_structure = self.transitions_to_fsm(transitions_txt_path)
+
+        # Write the JSON structure to a file
+        with open(json_output_path, 'w') as json_file:
+            json.dump(contract_structure, json_file, indent=4)
+        return contract_structure
+
+    def transitions_to_fsm(self, transitions_txt_path):
+        """
+        Parses a text file containing transitions into the contract structure, without writing it as JSON.
 
+        :param transitions_txt_path: The file path for the text file containing transitions.
+        :type transitions_txt_path: str
+        :return: The contract structure, as loaded from the JSON file by ``TransactionsGrinder``.
+        :rtype: dict
+        """
+        with open(transitions_txt_path, 'r') as file:
+            return self.lines_to_fsm(file, transitions_txt_path)
 
+    def lines_to_fsm(self, lines, source = ""):
+        """
+        Parses lines of transitions into the contract structure including transitions, states, and participants.
+
+        :param lines: The lines of text representing the transitions.
+        :type lines: Iterable[str]
+        :param source: Where the lines come from, for the syntax errors.
+        :type source: str
+        :return: The contract structure.
+        :rtype: dict
+        """
         contract_structure = {
             "id": "",  
             "initialState": "",  # Update as necessary
             "statesDeclaration": "",
             "states": [],
             "finalStates": [],
-            "transitions": [],
+            "transitions": list(self.iter_transitions(lines, source)),
             "rPAssociation": []  # Update as necessary if associations are provided
         }
 
-        # Read transitions from a text file and parse them
-        with open(transitions_txt_path, 'r') as file:
-            lines = file.readlines()
-            for line in lines:
-                transition, states_declaration = self.parse_transition(line.strip())
-                if transition:
-                    contract_structure['transitions'].append(transition)
-                    if transition['from'] and transition['from'] != "_":
-                        contract_structure['states'].append(transition['from'])
-                    contract_structure['states'].append(transition['to'])
-                    contract_structure['finalStates'].extend(transition['finalStates'])
-                    if states_declaration:  # Only the deploy transition will have this
-                        contract_structure['statesDeclaration'] = states_declaration
-
-        # Remove duplicates and sort states and final states
-        contract_structure['states'] = sorted(set(filter(None, contract_structure['states'])))
-        contract_structure['finalStates'] = sorted(set(contract_structure['finalStates']))
+        # Sort the states and final states, indexed without duplicates while parsing
+        contract_structure['statesDeclaration'] = self.states_declaration
+        contract_structure['states'] = sorted(filter(None, self.states))
+        contract_structure['finalStates'] = sorted(self.final_states)
         contract_structure['id'] = self.contract_id
        
         contract_structure['initialState'] = self.initialStage
-        
-        
+        return contract_structure
 
-        # Write the JSON structure to a file
-        with open(json_output_path, 'w') as json_file:
-            json.dump(contract_structure, json_file, indent=4)
+    def read_transitions(self, transitions_txt_path):
+        """
+        Streams the transitions of a text file one at a time, see ``iter_transitions``.
+
+        :param transitions_txt_path: The file path for the text file containing transitions.
+        :type transitions_txt_path: str
+        :return: The transitions, in the order of the file.
+        :rtype: Iterator[dict]
+        """
+        with open(transitions_txt_path, 'r') as file:
+            yield from self.iter_transitions(file, transitions_txt_path)
+
+    def iter_transitions(self, lines, source = ""):
+        """
+        Parses lines of transitions one at a time, so that a model is never held as a whole by the parsing.
+
+        The states and final states are indexed as the transitions are read, in ``states`` and ``final_states``
+        in the order they appear, and the state variables declarations are kept in ``states_declaration``.
+
+        :param lines: The lines of text representing the transitions.
+        :type lines: Iterable[str]
+        :param source: Where the lines come from, for the syntax errors.
+        :type source: str
+        :return: The transitions, in the order of the lines.
+        :rtype: Iterator[dict]
+        """
+        self.errors = []
+        self.states = {}
+        self.final_states = {}
+        self.states_declaration = ""
+        for number, line in enumerate(lines, 1):
+            transition, states_declaration = self.parse_line(line, number, source)
+            if transition:
+                if transition['from'] and transition['from'] != "_":
+                    self.states[transition['from']] = None
+                self.states[transition['to']] = None
+                for state in transition['finalStates']:
+                    self.final_states[state] = None
+                if states_declaration:  # Only the deploy transition will have this
+                    self.states_declaration = states_declaration
+                yield transition
 
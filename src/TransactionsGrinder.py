@@ -1,3 +1,4 @@
+import io
 import json
 import os
 import traceback
@@ -6,8 +7,11 @@ from TransitionProcessor import TransitionProcessor
 from VariableDeclarationConverter import VariableDeclarationConverter 
 from Logger import Logger
 from Z3Runner import Z3Runner
-from Fbuilder import Fbuilder
-from Settings import s_json_path, s_txt_path, s_z3model_path, s_well_formed_message
+from IncrementalState import IncrementalState
+from CancellationToken import CancellationToken
+from The_Validator import The_Validator
+from ParseCache import ParseCache
+from Settings import s_json_path, s_txt_path, s_z3model_path, s_well_formed_message, s_z3_engine, s_z3_backend, s_z3_cache, s_incremental, s_z3_query_time_out, s_z3_model_time_out, s_caller_check, s_caller_cache, s_caller_cache_path, s_step_budget, s_parse_cache, s_parse_cache_path, s_txt_parser
 
 class TransactionsGrinder(Logger):
     """
@@ -22,7 +26,9 @@ class TransactionsGrinder(Logger):
                  txt_path = s_txt_path, 
                  json_path = s_json_path, 
                  log = True, 
-                 logTime = False, non_stop = True, time_out = 0) -> None:
+                 logTime = False, non_stop = True, time_out = 0, z3_engine = s_z3_engine, z3_backend = s_z3_backend, z3_cache = s_z3_cache, incremental = s_incremental,
+                 z3_query_time_out = s_z3_query_time_out, z3_model_time_out = s_z3_model_time_out, caller_check = s_caller_check, caller_cache = s_caller_cache,
+                 step_budget = s_step_budget, progress = None, parse_cache = s_parse_cache) -> None:
         """
         Initializes the TransactionsGrinder with file paths and logging settings.
 
@@ -42,6 +48,28 @@ class TransactionsGrinder(Logger):
         :type non_stop: bool
         :param time_out: Timeout limit for processing.
         :type time_out: int
+        :param z3_engine: Engine used to check the Z3 model, "inprocess", "pool", "parallel" or "subprocess".
+        :type z3_engine: str
+        :param z3_backend: Formulas of the in-process engine, "ast" or "source".
+        :type z3_backend: str
+        :param z3_cache: Reuses the results of the obligations already checked if True.
+        :type z3_cache: bool
+        :param incremental: Rechecks only the transitions affected by the changes since the previous check if True.
+        :type incremental: bool
+        :param z3_query_time_out: Time budget of each Z3 query in milliseconds, 0 for no limit.
+        :type z3_query_time_out: int
+        :param z3_model_time_out: Time budget of the Z3 checks of the model in milliseconds, 0 for no limit.
+        :type z3_model_time_out: int
+        :param caller_check: Strategy of the caller check, "dataflow" (fixpoint over the DAFSM), "scc" (fixpoint over its strongly connected components), "dfs" (backward search of its simple paths) or "paths" (enumeration of its simple paths).
+        :type caller_check: str
+        :param caller_cache: Reuses the verdicts of the caller checks already done on the same paths, in previous runs or other models, if True.
+        :type caller_cache: bool
+        :param step_budget: Steps of a run of the graph analyses and Z3 queries beyond which it is cancelled, 0 for no limit.
+        :type step_budget: int
+        :param progress: Called with the CancellationToken of the run every ``s_progress_interval`` steps, None for no report.
+        :type progress: Callable[[CancellationToken], None]
+        :param parse_cache: Reuses the DAFSM parsed and pre-processed from an unchanged txt file, in previous runs or other processes, if True.
+        :type parse_cache: bool
         """
 
         Logger.__init__(self, log, non_stop)
@@ -61,6 +89,22 @@ class TransactionsGrinder(Logger):
         self.output = ""
         self.logTime = logTime
         self.time_out = time_out
+        self.z3_engine = z3_engine
+        self.z3_backend = z3_backend
+        self.z3_cache = z3_cache
+        self.incremental = incremental
+        self.z3_query_time_out = z3_query_time_out
+        self.z3_model_time_out = z3_model_time_out
+        self.caller_check = caller_check
+        self.caller_cache = caller_cache
+        self.parse_cache = parse_cache
+        # key of the DAFSM parsed from the txt file in the ParseCache, and whether it is pre-processed already
+        self.fsm_key = None
+        self.fsm_preprocessed = False
+        # shared by the caller checks, the path generation and the in-process Z3 engine, reset at each run
+        self.token = CancellationToken(time_out, step_budget, progress)
+        self.verdict = None
+        self.z3_stream = None
         self.info = {
             "t_participants": 0,
             "t_non_determinism": 0,
@@ -68,7 +112,10 @@ class TransactionsGrinder(Logger):
             "t_building" : 0,
             "t_total": 0,
             "nb_path" : 0,
-            "is_time_out": False
+            "is_time_out": False,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "settled": 0
         }
         os.makedirs(txt_path, exist_ok=True)
         os.makedirs(txt_path+"/images", exist_ok=True)
@@ -84,16 +131,24 @@ class TransactionsGrinder(Logger):
         """
 
         self.fsm = fsm
+        self.fsm_key = None
+        self.fsm_preprocessed = False
 
     def pre_process_fsm(self):
         """
         Pre-processes the DAFSM by converting variable declarations to Z3 declarations
         and updating transitions with new participants.
+        A DAFSM taken from the ParseCache is pre-processed already, a DAFSM parsed from a txt file is stored there once pre-processed.
         """
+        if self.fsm_preprocessed:
+            return
         for key in range(len(self.fsm['transitions'])):
             results = VariableDeclarationConverter.convert_to_z3_declarations(self.fsm['transitions'][key]['input'], [], {}, False)
             self.fsm['transitions'][key]['newParticipants'].update(results[3])
             self.fsm['transitions'][key]['newParticipants_from_param'] = results[3] 
+        self.fsm_preprocessed = True
+        if self.fsm_key is not None:
+            ParseCache.open(s_parse_cache_path).put(self.fsm_key, self.fsm)
             
     def get_full_json_path(self):
         """
@@ -134,6 +189,37 @@ class TransactionsGrinder(Logger):
         """
 
         return os.path.join(self.z3model_path, f"{self.file_name}{check}.py")
+
+    def get_full_incremental_path(self):
+        """
+        Constructs the full path to the state kept for the incremental checks of the model.
+
+        :return: The full path to the incremental state.
+        :rtype: str
+        """
+
+        return os.path.join(self.z3model_path, f"{self.file_name}_incremental.json")
+
+    def save_incremental_state(self, snapshot):
+        """
+        Saves the DAFSM and the passing results of its processed transitions for the next incremental check.
+
+        :param snapshot: The DAFSM as it was before processing, see ``IncrementalState.snapshot``.
+        :type snapshot: dict
+        """
+
+        results = {}
+        for action in self.transition_processor.solvers:
+            for item in self.transition_processor.solvers[action]:
+                if 'skey' not in item:
+                    continue
+                results[item['skey']] = {}
+                # failing results are not kept, they are rechecked to print their details
+                if item['sparticipants'] is True:
+                    results[item['skey']]['participants'] = True
+                if item.get('passed'):
+                    results[item['skey']]['passed'] = True
+        IncrementalState.save(self.get_full_incremental_path(), snapshot, results)
     
     def group_transactions(self, transitions):
         """
@@ -165,9 +251,45 @@ class TransactionsGrinder(Logger):
 
         with open(self.get_full_json_path(), 'r') as file:
             input_text = file.readlines()
-        self.fsm = json.loads(''.join(input_text))
+        self.set_fsm_data(json.loads(''.join(input_text)))
         return input_text
 
+    def get_fsm_from_txt(self, write_json = False):
+        """
+        Parses the DAFSM straight from the text file specified by the constructed full txt path,
+        without the round trip through its JSON file.
+
+        With ``parse_cache``, an unchanged file gives the DAFSM already parsed and pre-processed, see ``ParseCache``.
+        The JSON file is written before the pre-processing, so it is always parsed again.
+
+        :param write_json: If True, also writes the DAFSM to the JSON file specified by the full JSON path.
+        :type write_json: bool
+        :return: The DAFSM data.
+        :rtype: dict
+        """
+        validator = The_Validator()
+        if write_json:
+            self.set_fsm_data(validator.transitions_to_json(self.get_full_txt_path(), self.get_full_json_path()))
+            return self.fsm
+        if not self.parse_cache:
+            self.set_fsm_data(validator.transitions_to_fsm(self.get_full_txt_path()))
+            return self.fsm
+
+        with open(self.get_full_txt_path(), 'rb') as file:
+            content = file.read()
+        key = ParseCache.key(content, s_txt_parser)
+        fsm = ParseCache.open(s_parse_cache_path).get(key)
+        if fsm is not None:
+            self.set_fsm_data(fsm)
+            self.fsm_preprocessed = True
+            return self.fsm
+
+        self.set_fsm_data(validator.lines_to_fsm(io.StringIO(content.decode(), newline=None), self.get_full_txt_path()))
+        # the models with syntax errors are parsed at each run, so that the errors are reported each time
+        if not validator.errors:
+            self.fsm_key = key
+        return self.fsm
+
     def get_grouped_transaction(self, transitions):
         """
         Groups transactions and creates a copy for processing.
@@ -191,7 +313,7 @@ class TransactionsGrinder(Logger):
         """
 
         if self.transition_processor is None:
-            self.transition_processor = TransitionProcessor(self.fsm, self.log, self.non_stop, self.time_out)
+            self.transition_processor = TransitionProcessor(self.fsm, self.log, self.non_stop, self.time_out, self.caller_check, s_caller_cache_path if self.caller_cache else None, self.token)
     
         return self.transition_processor
     
@@ -219,6 +341,8 @@ class TransactionsGrinder(Logger):
 
         try:
             self.start_time()
+            self.token.reset()
+            self.info["is_time_out"] = False
             fsm = self.fsm 
             transitions = fsm['transitions']
             # Example usage
@@ -226,6 +350,12 @@ class TransactionsGrinder(Logger):
             
             self.logIt("Checking the well formness of the model----\n")
             self.transition_processor = self.get_transition_processor()
+            self.z3_stream = None
+            reusable = {}
+            if self.incremental:
+                snapshot = IncrementalState.snapshot(fsm)
+                keys = IncrementalState.get_keys(fsm)
+                reusable = IncrementalState.get_reusable(self.get_full_incremental_path(), snapshot)
             log = self.log
             if not self.non_stop:
                 self.log = False
@@ -234,6 +364,7 @@ class TransactionsGrinder(Logger):
             
             setattr(self.transition_processor, 'deploy_init_var_val', deploy_init_var_val)
             setattr(self.transition_processor, 'var_names', var_names)
+            setattr(self.transition_processor, 'states_declaration', declarations_str)
             
             self.transition_processor.append(result)
             grouped_transitions, grouped_transitions_copy = self.get_grouped_transaction(transitions)
@@ -242,9 +373,16 @@ class TransactionsGrinder(Logger):
             while data:
                 for transition in data:
                     outgoingTransitions = grouped_transitions.get(transition['to'], [])
-                    self.transition_processor.process(transition, outgoingTransitions)
+                    reused = reusable.get(keys[id(transition)], {}) if self.incremental else {}
+                    self.transition_processor.process(transition, outgoingTransitions, reused.get('participants'))
+                    if self.incremental:
+                        self.transition_processor.latest['skey'] = keys[id(transition)]
+                        # a caller check done again has to hold for the saved checks to still pass
+                        self.transition_processor.latest['passed'] = reused.get('passed', False) and self.transition_processor.latest['sparticipants'] is True
                     self.update_data([0])
                     if not self.non_stop and (self.should_stop_if_time_out(self) or self.should_stop(self.get_full_z3model_path(), transition, self)):  
+                        if self.incremental:
+                            self.save_incremental_state(snapshot)
                         return
                     
                     if transition['to'] not in grouped_transitions and transition['to'] not in fsm['finalStates']:
@@ -255,12 +393,19 @@ class TransactionsGrinder(Logger):
             if run and self.non_stop:
                 self.log = log
                 s_t = self.get_time()
-                Fbuilder.build_z3_formulas_model_and_save(self, self.get_full_z3model_path(), False)
+                Z3Runner.build_model(self, self.get_full_z3model_path(), False)
                 self.info["t_building"] += self.get_time() - s_t
                 Z3Runner.execute_model(self,self.get_full_z3model_path())
             if not self.non_stop: 
                 print(s_well_formed_message)
             
+            if self.incremental:
+                self.save_incremental_state(snapshot)
+                self.logIt(f"Incremental check: {len(reusable)} unchanged transitions reused out of {len(transitions)}\n")
+            if self.info["settled"] > 0:
+                self.logIt(f"Trivial obligations settled without Z3: {self.info['settled']}\n")
+            if self.info["cache_hits"] + self.info["cache_misses"] > 0:
+                self.logIt(f"Obligation cache: {self.info['cache_hits']} hits, {self.info['cache_misses']} misses\n")
             self.logIt("End----\n\n")
         except Exception as e:  
             traceback.print_exc()
@@ -282,6 +427,7 @@ class TransactionsGrinder(Logger):
 
             setattr(self.transition_processor, 'deploy_init_var_val', deploy_init_var_val)
             setattr(self.transition_processor, 'var_names', var_names)
+            setattr(self.transition_processor, 'states_declaration', declarations_str)
             self.transition_processor.append(result)
             
             grouped_transitions, _ = self.get_grouped_transaction(transitions)
@@ -307,6 +453,7 @@ class TransactionsGrinder(Logger):
         """
         fsm = self.fsm 
         self.logIt("Checking Path statisfiability of the model----\n\n")
-        PathGenerator.check_path_satisfiability(fsm, self.file_name)
+        self.token.reset()
+        PathGenerator.check_path_satisfiability(fsm, self.file_name, self.token)
 
         self.logIt("End----\n\n")
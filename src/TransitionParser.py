@@ -0,0 +1,285 @@
+import re
+
+class TransitionSyntaxError(Exception):
+    """
+    Raised on a line of the txt DSL that is not a transition.
+
+    :param message: What is wrong.
+    :type message: str
+    :param line: Number of the line, from 1.
+    :type line: int
+    :param column: Column of the error in the line, from 1.
+    :type column: int
+    """
+
+    def __init__(self, message, line, column) -> None:
+        super().__init__(f"line {line}, column {column}: {message}")
+        self.message = message
+        self.line = line
+        self.column = column
+
+
+class Token:
+    """
+    A token of a transition of the txt DSL.
+
+    :param kind: "word" (``\\w+``), "space", "braces" or "parens" (a balanced block, with its content as text), "symbol" (any other character) or "end".
+    :type kind: str
+    :param text: The text of the token, without the brackets of a block.
+    :type text: str
+    :param column: Column where the token starts, from 1.
+    :type column: int
+    """
+
+    __slots__ = ("kind", "text", "column")
+
+    def __init__(self, kind, text, column) -> None:
+        self.kind = kind
+        self.text = text
+        self.column = column
+
+    def describe(self) -> str:
+        """
+        Names the token in the error messages.
+
+        :return: The name of the token.
+        :rtype: str
+        """
+        if self.kind == "end":
+            return "the end of the line"
+        if self.kind == "space":
+            return "a space"
+        if self.kind == "braces":
+            return "'{'"
+        if self.kind == "parens":
+            return "'('"
+        return f"'{self.text}'"
+
+
+class TransitionParser:
+    """
+    Single pass tokenizer and recursive descent parser of the transitions of the txt DSL (see "Format of a DAFSM" in the README).
+
+    The tokenizer reads a line once: words, spaces and symbols are matched one at a time, and the guards,
+    parameters and assignments are taken whole as balanced blocks of ``{}`` or ``()``, so a line is parsed
+    in linear time whatever the brackets it holds. The parser then follows the grammar, with the spacing
+    rules of the regular expressions of ``The_Validator``::
+
+        deploy     := "_" [space] {guard} space participant ":" role space ">" space "starts" (contract ["," params]) [space] {assignments} [space] {declarations} space state ["+"]
+        transition := state [space] {guard} space ["any" space] participant [":" [role]] space ">" space contract "." action (params) [space] {assignments} space state ["+"]
+
+    Blank lines and lines starting with ``#`` are skipped. ``parse`` gives the groups the regular expressions
+    would capture, and a ``TransitionSyntaxError`` with the line and column of the first token that does not
+    fit the grammar.
+    """
+
+    _token = re.compile(r"(\w+)|(\s+)|([{(])|([})])|.")
+    _contract = re.compile(r"(\w+)(?:,\s*(.*))?", re.DOTALL)
+    _closing = {"{": "}", "(": ")"}
+
+    def tokenize(self, text, line = 1) -> list:
+        """
+        Splits a line into tokens.
+
+        :param text: The line.
+        :type text: str
+        :param line: Number of the line, for the errors.
+        :type line: int
+        :return: The tokens, ending with "end" tokens, so that the parser can look two tokens past the last one.
+        :rtype: list[Token]
+        """
+        tokens = []
+        match_token = self._token.match
+        position = 0
+        length = len(text)
+        while position < length:
+            match = match_token(text, position)
+            kind = match.lastindex
+            if kind == 1:
+                tokens.append(Token("word", match.group(), position + 1))
+            elif kind == 2:
+                tokens.append(Token("space", match.group(), position + 1))
+            elif kind == 3:
+                end = self.find_closing(text, position, line)
+                tokens.append(Token("braces" if match.group() == "{" else "parens", text[position + 1:end], position + 1))
+                position = end + 1
+                continue
+            elif kind == 4:
+                raise TransitionSyntaxError(f"'{match.group()}' closes nothing", line, position + 1)
+            else:
+                tokens.append(Token("symbol", match.group(), position + 1))
+            position = match.end()
+        end = Token("end", "", length + 1)
+        tokens.extend((end, end, end))
+        return tokens
+
+    def find_closing(self, text, start, line) -> int:
+        """
+        Finds the bracket closing a block, skipping the nested blocks of the same bracket.
+
+        Each character is looked at once: a closing bracket found stays valid until the search goes past it.
+
+        :param text: The line.
+        :type text: str
+        :param start: Position of the opening bracket.
+        :type start: int
+        :param line: Number of the line, for the errors.
+        :type line: int
+        :return: The position of the closing bracket.
+        :rtype: int
+        """
+        opening = text[start]
+        closing = self._closing[opening]
+        depth = 1
+        position = start + 1
+        close_at = -1
+        while True:
+            if close_at < position:
+                close_at = text.find(closing, position)
+                if close_at < 0:
+                    raise TransitionSyntaxError(f"'{opening}' is never closed", line, start + 1)
+            open_at = text.find(opening, position, close_at)
+            if open_at >= 0:
+                depth += 1
+                position = open_at + 1
+                continue
+            depth -= 1
+            if depth == 0:
+                return close_at
+            position = close_at + 1
+
+    def parse(self, text, line = 1):
+        """
+        Parses a line of the txt DSL.
+
+        :param text: The line.
+        :type text: str
+        :param line: Number of the line, for the errors.
+        :type line: int
+        :return: "deploy" or "action" and the groups of the matching regular expression of ``The_Validator``, or (None, None) for a blank or comment line.
+        :rtype: tuple[str, tuple]
+        """
+        content = text.lstrip()
+        if not content or content.startswith("#"):
+            return None, None
+        self.tokens = self.tokenize(text, line)
+        self.line = line
+        self.index = 0
+        self.skip("space")
+
+        from_stage = self.expect("word", "a state").text
+        space = self.skip("space")
+        space = space.text if space is not None else ""
+        pre_condition = self.expect("braces", "a guard in '{}'").text
+        self.expect("space", "a space after the guard")
+
+        participant_token = self.peek()
+        any_keyword = None
+        if participant_token.text == "any" and self.peek(1).kind == "space" and self.peek(2).kind == "word":
+            any_keyword = self.next().text + self.next().text
+        participant = self.expect("word", "a participant").text
+        role = ""
+        if self.skip("symbol", ":") is not None:
+            role_token = self.skip("word")
+            role = role_token.text if role_token is not None else ""
+        self.expect("space", "a space before '>'")
+        self.expect("symbol", "'>'", ">")
+        self.expect("space", "a space after '>'")
+
+        contract = self.expect("word", "a contract")
+        if from_stage == "_" and contract.text == "starts" and self.peek().kind == "parens":
+            if any_keyword is not None or not role:
+                raise TransitionSyntaxError("the deploy transition introduces its participant with a role, as in 'o:O'", line, participant_token.column)
+            arguments = self.next()
+            match = self._contract.fullmatch(arguments.text)
+            if match is None:
+                raise TransitionSyntaxError("expected the contract and the parameters, as in 'starts(c, int _x)'", line, arguments.column + 1)
+            contract_id, params = match.groups()
+            self.skip("space")
+            post_condition = self.expect("braces", "assignments in '{}'").text
+            self.skip("space")
+            states_declaration = self.expect("braces", "declarations of the contract variables in '{}'").text
+            to_stage, final_marker = self.parse_target()
+            return "deploy", (space, pre_condition, participant, role, contract_id, params, post_condition, states_declaration, to_stage, final_marker)
+
+        self.expect("symbol", "'.' after the contract", ".")
+        action = self.expect("word", "an action").text
+        params = self.expect("parens", "parameters in '()'").text
+        self.skip("space")
+        post_condition = self.expect("braces", "assignments in '{}'").text
+        to_stage, final_marker = self.parse_target()
+        return "action", (from_stage, pre_condition, any_keyword, participant, role, contract.text, action, params, post_condition, to_stage, final_marker)
+
+    def parse_target(self):
+        """
+        Parses the target state ending a transition, with its final marker.
+
+        :return: The state and "+" if it is final, "" otherwise.
+        :rtype: tuple[str, str]
+        """
+        self.expect("space", "a space before the target state")
+        to_stage = self.expect("word", "a target state").text
+        final_marker = "+" if self.skip("symbol", "+") is not None else ""
+        self.skip("space")
+        token = self.peek()
+        if token.kind != "end":
+            raise TransitionSyntaxError(f"unexpected {token.describe()} after the target state", self.line, token.column)
+        return to_stage, final_marker
+
+    def peek(self, offset = 0) -> Token:
+        """
+        Gives a token ahead without consuming it.
+
+        :param offset: Number of tokens to look past, up to 2.
+        :type offset: int
+        :return: The token, an "end" token past the end of the line.
+        :rtype: Token
+        """
+        return self.tokens[self.index + offset]
+
+    def next(self) -> Token:
+        """
+        Consumes a token.
+
+        :return: The token.
+        :rtype: Token
+        """
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def skip(self, kind, text = None):
+        """
+        Consumes the next token if it is of a kind, and of a text when given.
+
+        :param kind: Kind of the token.
+        :type kind: str
+        :param text: Text of the token, None for any.
+        :type text: str
+        :return: The token, None if the next token is another one.
+        :rtype: Token or None
+        """
+        token = self.tokens[self.index]
+        if token.kind == kind and (text is None or token.text == text):
+            self.index += 1
+            return token
+        return None
+
+    def expect(self, kind, what, text = None) -> Token:
+        """
+        Consumes the next token, which must be of a kind, and of a text when given.
+
+        :param kind: Kind of the token.
+        :type kind: str
+        :param what: What is expected, for the error.
+        :type what: str
+        :param text: Text of the token, None for any.
+        :type text: str
+        :return: The token.
+        :rtype: Token
+        """
+        token = self.skip(kind, text)
+        if token is None:
+            token = self.peek()
+            raise TransitionSyntaxError(f"expected {what}, found {token.describe()}", self.line, token.column)
+        return token
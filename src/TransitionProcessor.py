@@ -7,6 +7,7 @@ from SafeVariableAssignment import SafeVariableAssignment as SafeVars
 from VariableDeclarationConverter import VariableDeclarationConverter as VarDefConv
 from FSMGraph import FSMGraph
 from MiniTimer import *
+from Settings import s_caller_check
   
   
 class TransitionProcessor(MiniTimer):
@@ -17,7 +18,7 @@ class TransitionProcessor(MiniTimer):
     Inherits from MiniTimer for performance measurement.
     """
 
-    def __init__(self, data, log = True, non_stop = True, time_out = 0):
+    def __init__(self, data, log = True, non_stop = True, time_out = 0, caller_check = s_caller_check, caller_cache = None, token = None):
         """
         Initializes the transition processor with DAFSM data and configuration settings.
 
@@ -29,6 +30,12 @@ class TransitionProcessor(MiniTimer):
         :type non_stop: bool
         :param time_out: Timeout limit for processing.
         :type time_out: int
+        :param caller_check: Strategy of the caller check, "dataflow", "scc", "dfs" or "paths".
+        :type caller_check: str
+        :param caller_cache: Path of the CallerCheckCache to use, None to keep the caller check verdicts for this model only.
+        :type caller_cache: str
+        :param token: Budget of the run shared with the other analyses, see ``CancellationToken``.
+        :type token: CancellationToken
         """
 
         self.str_code = ""
@@ -37,11 +44,13 @@ class TransitionProcessor(MiniTimer):
         self.var_names = {}
         self.solvers['start'] = []
         self.solvers['starts'] = [] 
-        self.fsmGraph = FSMGraph(data, log, time_out)
+        self.fsmGraph = FSMGraph(data, log, time_out, caller_check, caller_cache, token)
         self.non_stop = non_stop
         self.log = log
         self.infos = {}
         self.non_det_formula = {}
+        self.non_det_parts = {}
+        self.states_declaration = ""
         self.time_out = time_out
         
     #Append to the global Code Model
@@ -105,8 +114,22 @@ class TransitionProcessor(MiniTimer):
                 exit()
         return inputs
 
+    def get_thesis_parts(self, otherPrecs, inputs):
+        """
+        Pairs each precondition of the outgoing transitions with the variables to quantify existentially.
+
+        :param otherPrecs: List of other preconditions.
+        :type otherPrecs: list
+        :param inputs: List of input strings of the outgoing transitions.
+        :type inputs: list
+        :return: A list of [precondition, variable names] pairs.
+        :rtype: list
+        """
+
+        return [[otherPrecs[i], list(self.get_vars_names_from_input(inputs[i]))] for i in range(len(otherPrecs))]
+
     # AConsistencyCheck formula gen
-    def a_consistency_check(self, preC, _postC_A, otherPrecs, inputs):
+    def a_consistency_check(self, preC, _postC_A, otherPrecs, inputs, thesis_parts = None):
         """
         Generates a formula for action consistency check (AConsistencyCheck formula generation).
         AConsistency Check Implementation
@@ -119,12 +142,16 @@ class TransitionProcessor(MiniTimer):
         :type otherPrecs: list
         :param inputs: List of input strings.
         :type inputs: list
+        :param thesis_parts: Result of get_thesis_parts for otherPrecs, computed if not given.
+        :type thesis_parts: list, optional
         :return: The generated consistency check formula.
         :rtype: str
         """
 
+        if thesis_parts is None:
+            thesis_parts = self.get_thesis_parts(otherPrecs, inputs[1])
         hypothesis = f"And({preC},{_postC_A})"
-        thesis = f'Or({",".join([self.quantifier_closure(otherPrecs[i], self.get_vars_names_from_input(inputs[1][i]), "Exists") for i in range(len(otherPrecs))])})' if len(otherPrecs) > 0 else "True"
+        thesis = f'Or({",".join([self.quantifier_closure(prec, variables, "Exists") for prec, variables in thesis_parts])})' if len(thesis_parts) > 0 else "True"
     
         return f'Not(Implies({hypothesis}, {thesis}))'
     
@@ -174,6 +201,7 @@ class TransitionProcessor(MiniTimer):
             indexes[action].append(i)
 
         result = []
+        parts = []
 
         # for each groups we build the formula
         for action, indices in indexes.items():
@@ -187,7 +215,9 @@ class TransitionProcessor(MiniTimer):
                 var_in = self.get_vars_names_from_input(inputs[index])
                 implication_part = f'And(Not({") , Not(".join([other_precs[j] for j in grouped])}))'
                 result.append(f"Not(Implies({hypothesis}, {implication_part}))")
+                parts.append([hypothesis, [other_precs[j] for j in grouped]])
 
+        self.non_det_parts[to_state] = parts
         self.non_det_formula[to_state] = f'Or({",".join(result)})' if result else "Not(True)"
         return self.non_det_formula[to_state]
 
@@ -214,7 +244,7 @@ class TransitionProcessor(MiniTimer):
                 exit()
     
    
-    def process(self, transition, outgoingTransitions):
+    def process(self, transition, outgoingTransitions, participants = None):
         """
         Processes a transition and outgoing transitions for solver compatibility.
 
@@ -222,6 +252,8 @@ class TransitionProcessor(MiniTimer):
         :type transition: dict
         :param outgoingTransitions: List of outgoing transitions.
         :type outgoingTransitions: list
+        :param participants: Result of the caller check of the transition when it is already known, it is computed if None.
+        :type participants: bool, optional
         """
 
         # Initialize necessary variables from the current transition and collect inputs and preconditions from all outgoing transitions.
@@ -235,10 +267,19 @@ class TransitionProcessor(MiniTimer):
         self.start_time()
         
         # Perform a check to ensure the caller of the transition is allowed, #CALLERCHECK
-        formula_for_participant_check = self.fsmGraph.caller_check(transition)
+        caller_check = None
+        if participants is None:
+            caller_check = self.fsmGraph.caller_check(transition)
+            formula_for_participant_check = caller_check.passed
+            self.infos['nb_path'] = self.fsmGraph.nb_path
+        else:
+            formula_for_participant_check = participants
+            self.infos['nb_path'] = 0
         self.infos["participants"] = self.get_ellapsed_time()
-        self.infos['nb_path'] = self.fsmGraph.nb_path
         self.infos["is_time_out"] = self.fsmGraph.timed_out
+        # the witness path of a failure is only searched to be printed
+        if caller_check is not None and self.fsmGraph.log and not caller_check.passed and not caller_check.reused and not self.fsmGraph.timed_out:
+            print(caller_check.message())
         # Decision point to potentially halt execution based on participant verification.
         self.should_stop(formula_for_participant_check, transition, transition["caller"])
 
@@ -273,7 +314,8 @@ class TransitionProcessor(MiniTimer):
         _, global_vars = SafeVars.safe_variable_assignment(postC, f'solver__{action}_{len(self.solvers[action])}')
 
         # Convert variable declarations to Z3-compatible format.
-        converted_declarations = VarDefConv.convert_to_z3_declarations(";".join([x for x in (inputs[1]+[inputs[0]]) if x != ""]))
+        declarations = ";".join([x for x in (inputs[1]+[inputs[0]]) if x != ""])
+        converted_declarations = VarDefConv.convert_to_z3_declarations(declarations)
 
         # Timing and checking for non-determinism within the transitions. # NDETCHECK
         self.start_time()
@@ -282,7 +324,8 @@ class TransitionProcessor(MiniTimer):
 
         # Timing and checking for action consistency within the transitions.  # AConsistencyCheck
         self.start_time()
-        sformula = self.a_consistency_check(preC, _postC_A, otherPrecs, inputs)
+        thesis_parts = self.get_thesis_parts(otherPrecs, inputs[1])
+        sformula = self.a_consistency_check(preC, _postC_A, otherPrecs, inputs, thesis_parts)
         self.infos["a_consistency"] = self.get_ellapsed_time()
 
         # Generate a unique identifier for the function related to the current action and solver iteration.
@@ -297,7 +340,13 @@ class TransitionProcessor(MiniTimer):
             'sglobalVars': global_vars,
             'sformula': sformula,
             'sparticipants': formula_for_participant_check,
-            'epsformula': thesis_non_eps
+            'epsformula': thesis_non_eps,
+            # Parts of the formulas above, used to build them as z3 expressions without generating code
+            'sinputs': declarations,
+            'spost': _postC_A,
+            'sthesis': thesis_parts,
+            'epsparts': self.non_det_parts[transition['to']],
+            'epsstate': transition['to']
         }
         # Append the result to the solvers dictionary for the current action, and update the latest processed transition.
         self.solvers[action].append(result)
@@ -0,0 +1,152 @@
+import re
+import z3
+from functools import lru_cache
+
+# z3 constructors for the declared variable types
+z3_constructors = {
+    'int': z3.Int,
+    'string': z3.String,
+    'float': z3.Real,
+    'bool': z3.Bool,
+}
+
+@lru_cache(maxsize=4096)
+def compile_expression(expression):
+    """
+    Compiles a guard, postcondition or formula of the DSL once and keeps it for later models and runs.
+
+    :param expression: The expression in the notation of Z3's python API.
+    :type expression: str
+    :return: The compiled expression.
+    :rtype: code
+    """
+    return compile(expression, "<formula>", "eval")
+
+
+class Z3AstBuilder:
+    """
+    Builds the obligations of a model (``sformula``, ``epsformula`` and ``sparticipants``) as ``z3.ExprRef``
+    objects straight from the parts kept by ``TransitionProcessor.process``.
+
+    Declarations are made with the z3 API and the formulas are combined with ``z3.And``, ``z3.Or``, ``z3.Not``,
+    ``z3.Implies`` and ``z3.Exists``; only the guards and postconditions written in the model are compiled, once each.
+    """
+
+    @staticmethod
+    def declare(declarations_str, scope):
+        """
+        Declares variables in a scope, following ``VariableDeclarationConverter.convert_to_z3_declarations``.
+
+        :param declarations_str: String containing variable declarations separated by semicolons or commas.
+        :type declarations_str: str
+        :param scope: The scope receiving the declared variables.
+        :type scope: dict
+        :return: The updated scope.
+        :rtype: dict
+        """
+        for declaration in re.split(';|,', declarations_str):
+            declaration = declaration.strip()
+            if declaration == "":
+                continue
+            try:
+                parts = declaration.split(":=")
+                splited = [s.strip() for s in parts[0].split()]
+                var_type, var_name = [splited[0], splited[1]] if len(splited) == 2 else [splited[0], splited[2]]
+
+                if var_type in ['set', 'array']:
+                    scope[var_name] = z3.Array(var_name, z3.IntSort(), getattr(z3, f"{splited[1]}Sort")()) if len(splited) == 3 else []
+                elif var_type == 'float' and len(parts) == 2:
+                    continue
+                elif var_type in z3_constructors:
+                    scope[var_name] = z3_constructors[var_type](var_name)
+
+                if len(parts) == 2:
+                    if var_type == 'int':
+                        scope[var_name] = int(parts[1])
+                    elif var_type == 'string':
+                        scope[var_name] = str(parts[1])
+                    elif var_type == 'bool':
+                        scope[var_name] = eval(compile_expression(parts[1].strip()), scope)
+            except Exception:
+                # Already reported by VariableDeclarationConverter
+                continue
+        return scope
+
+    @staticmethod
+    def get_model_scope(base_namespace, batch):
+        """
+        Builds the global scope of a model: state variables, their deploy values and the ``exist``/``forall`` formula functions.
+
+        :param base_namespace: The names available to every model (``z3`` and ``Extension``).
+        :type base_namespace: dict
+        :param batch: The batch of the model, see ``Z3Engine.get_batch``.
+        :type batch: dict
+        :return: The scope of the model.
+        :rtype: dict
+        """
+        scope = Z3AstBuilder.declare(batch['states_declaration'], dict(base_namespace))
+        for name in batch['formulas']:
+            scope[name] = Z3AstBuilder.formula_function(batch['formulas'][name], scope)
+        return scope
+
+    @staticmethod
+    def formula_function(formula, scope):
+        """
+        Builds the function checking a formula of ``exist``/``forall`` on an element, as ``generateFuntionsFormulas`` does.
+
+        :param formula: The formula on ``item``.
+        :type formula: str
+        :param scope: The scope of the model.
+        :type scope: dict
+        :return: The function.
+        :rtype: Callable
+        """
+        code = compile_expression(formula)
+
+        def function(item):
+            solver = z3.Solver()
+            solver.add(eval(code, scope, {'item': item}))
+            return solver.check() == z3.sat
+
+        return function
+
+    @staticmethod
+    def expression(expression, scope):
+        """
+        Evaluates a guard or postcondition in a scope.
+
+        :param expression: The expression.
+        :type expression: str
+        :param scope: The scope of the obligation.
+        :type scope: dict
+        :return: The z3 expression (or a python value for constant expressions).
+        """
+        return eval(compile_expression(expression), scope)
+
+    @staticmethod
+    def build(item, model_scope):
+        """
+        Builds the obligation of one processed transition.
+
+        :param item: The obligation built by ``TransitionProcessor.process``.
+        :type item: dict
+        :param model_scope: The scope of the model.
+        :type model_scope: dict
+        :return: The name of the obligation and its formulas as z3 expressions.
+        :rtype: dict
+        """
+        scope = Z3AstBuilder.declare(item['sinputs'], dict(model_scope))
+        e = lambda text: Z3AstBuilder.expression(text, scope)
+
+        thesis = [z3.Exists([scope[v] for v in variables], e(prec)) if len(variables) > 0 else e(prec) for prec, variables in item['sthesis']]
+        sformula = z3.Not(z3.Implies(z3.And(e(item['spre']), e(item['spost'])), z3.Or(thesis) if len(thesis) > 0 else True))
+
+        eps = [z3.Not(z3.Implies(e(hypothesis), z3.And([z3.Not(e(other)) for other in others]))) for hypothesis, others in item['epsparts']]
+        epsformula = z3.Or(eps) if len(eps) > 0 else z3.Not(True)
+
+        return {
+            'snameF': item['snameF'],
+            'sformula': sformula,
+            'epsformula': epsformula,
+            'sparticipants': z3.BoolVal(item['sparticipants'] is True)
+        }
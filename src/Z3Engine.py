@@ -0,0 +1,540 @@
+import io
+import z3
+from contextlib import redirect_stdout
+from Extension import generateFuntionsFormulas, formulas
+from MiniTimer import MiniTimer
+from Z3AstBuilder import Z3AstBuilder
+from Z3ObligationCache import Z3ObligationCache
+from Settings import s_well_formed_message, s_non_well_formed_message, s_unknown_message, s_z3_backend
+
+class ObligationResult:
+    """
+    Holds the outcome of the checks of one generated function ``_<action>_<n>``.
+
+    :param name: The name of the checked function (``snameF``).
+    :type name: str
+    :param a_consistency: True if the A-consistency formula is unsat, None if Z3 ran out of time.
+    :type a_consistency: bool or None
+    :param non_determinism: True if the non-determinism formula is unsat, None if Z3 ran out of time.
+    :type non_determinism: bool or None
+    :param participants: True if the participant formula is sat, None if Z3 ran out of time.
+    :type participants: bool or None
+    """
+
+    def __init__(self, name, a_consistency, non_determinism, participants):
+        self.name = name
+        self.a_consistency = a_consistency
+        self.non_determinism = non_determinism
+        self.participants = participants
+
+    @property
+    def passed(self) -> bool:
+        """
+        :return: True if all the checks of the obligation hold.
+        :rtype: bool
+        """
+        return self.a_consistency is True and self.non_determinism is True and self.participants is True
+
+    @property
+    def timed_out(self) -> bool:
+        """
+        :return: True if a check of the obligation ran out of time and none failed.
+        :rtype: bool
+        """
+        checks = [self.a_consistency, self.non_determinism, self.participants]
+        return None in checks and False not in checks
+
+    def __repr__(self):
+        return f"ObligationResult({self.name}, a_consistency={self.a_consistency}, non_determinism={self.non_determinism}, participants={self.participants})"
+
+
+class ModelVerdict:
+    """
+    Structured verdict of a model checked by the Z3Engine.
+
+    :param obligations: Results of the checked obligations, in checking order.
+    :type obligations: list[ObligationResult]
+    :param error: Error raised while building or solving the obligations, if any.
+    :type error: Exception or None
+
+    ``building_time`` and ``solving_time`` record the nanoseconds spent building the formulas and running Z3,
+    ``cache_hits`` and ``cache_misses`` count the obligations found or not in the Z3ObligationCache and
+    ``settled`` counts the trivial obligations decided without Z3 (see ``Z3Engine.settle``).
+    """
+
+    def __init__(self, obligations = None, error = None):
+        self.obligations = obligations if obligations is not None else []
+        self.error = error
+        self.building_time = 0
+        self.solving_time = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.settled = 0
+
+    @property
+    def well_formed(self) -> bool:
+        """
+        :return: True if no error occurred and every obligation holds.
+        :rtype: bool
+        """
+        return self.error is None and all(item.passed for item in self.obligations)
+
+    @property
+    def failures(self) -> list:
+        """
+        :return: The obligations that do not hold.
+        :rtype: list[ObligationResult]
+        """
+        return [item for item in self.obligations if not item.passed]
+
+    @property
+    def timed_out(self) -> list:
+        """
+        :return: The obligations whose checks ran out of time.
+        :rtype: list[ObligationResult]
+        """
+        return [item for item in self.obligations if item.timed_out]
+
+    def message(self) -> str:
+        """
+        :return: The verdict message printed by generated models, or the unknown verdict when the only failures are time outs.
+        :rtype: str
+        """
+        if self.well_formed:
+            return s_well_formed_message
+        if self.error is None and len(self.timed_out) == len(self.failures):
+            return s_unknown_message
+        return s_non_well_formed_message
+
+    def __repr__(self):
+        return f"ModelVerdict(well_formed={self.well_formed}, obligations={len(self.obligations)}, failures={len(self.failures)})"
+
+
+class Z3Engine:
+    """
+    Runs the obligations built by ``TransitionProcessor.process`` inside the calling process.
+
+    It checks the same formulas written by ``Fbuilder`` in the model file, but without starting a new
+    ``python3`` interpreter and re-importing ``z3`` for every model. The formulas are either built as z3
+    expressions by the Z3AstBuilder (``ast`` backend) or evaluated from their source text (``source`` backend).
+
+    The engine works on batches (see ``get_batch``): plain dictionaries that can also be sent to the Z3WorkerPool.
+    """
+
+    _base_namespace = None
+
+    @staticmethod
+    def get_base_namespace() -> dict:
+        """
+        Returns a copy of the names available to a generated model (``z3`` and ``Extension``).
+
+        :return: A fresh namespace to evaluate the model in.
+        :rtype: dict
+        """
+        if Z3Engine._base_namespace is None:
+            namespace = {}
+            exec("from z3 import *\nfrom Extension import *", namespace)
+            namespace['z3'] = z3
+            Z3Engine._base_namespace = namespace
+        return dict(Z3Engine._base_namespace)
+
+    @staticmethod
+    def build_namespace(batch) -> dict:
+        """
+        Builds the global namespace of a model from its source text: state variable declarations, deploy values and formula functions.
+
+        :param batch: The batch holding the declarations code of the model.
+        :type batch: dict
+        :return: The namespace of the model.
+        :rtype: dict
+        """
+        namespace = Z3Engine.get_base_namespace()
+        exec(batch['str_code'] + generateFuntionsFormulas(batch['formulas']), namespace)
+        return namespace
+
+    @staticmethod
+    def get_obligations(transition_processor, only_latest = False) -> list:
+        """
+        Lists the obligations to check, in the order used by ``Fbuilder``.
+
+        :param transition_processor: The processor holding the obligations.
+        :type transition_processor: TransitionProcessor
+        :param only_latest: If True, only the latest processed obligation is returned.
+        :type only_latest: bool
+        :return: The obligations.
+        :rtype: list[dict]
+        """
+        if only_latest:
+            return [transition_processor.latest]
+        return [item for s in transition_processor.solvers for item in transition_processor.solvers[s]]
+
+    @staticmethod
+    def get_batch(transition_processor, only_latest = False, cache = None, query_time_out = 0, model_time_out = 0) -> dict:
+        """
+        Collects what is needed to check a model: declarations, ``exist``/``forall`` formulas and obligations.
+
+        :param transition_processor: The processor holding the declarations and obligations.
+        :type transition_processor: TransitionProcessor
+        :param only_latest: If True, only the latest processed obligation is included.
+        :type only_latest: bool
+        :param cache: Path of the Z3ObligationCache to use, None to check every obligation with Z3.
+        :type cache: str or None
+        :param query_time_out: Time budget of each Z3 query in milliseconds, 0 for no limit.
+        :type query_time_out: int
+        :param model_time_out: Time budget of all the Z3 queries of the batch in milliseconds, 0 for no limit.
+        :type model_time_out: int
+        :return: The batch of the model.
+        :rtype: dict
+        """
+        return {
+            'str_code': transition_processor.str_code,
+            'states_declaration': transition_processor.states_declaration,
+            'formulas': dict(formulas),
+            'obligations': Z3Engine.get_obligations(transition_processor, only_latest),
+            'cache': cache,
+            'query_time_out': query_time_out,
+            'model_time_out': model_time_out
+        }
+
+    @staticmethod
+    def from_source(item, namespace) -> dict:
+        """
+        Evaluates the formulas of an obligation from their source text, as the generated function ``_<action>_<n>`` does.
+
+        :param item: The obligation built by ``TransitionProcessor.process``.
+        :type item: dict
+        :param namespace: The model namespace.
+        :type namespace: dict
+        :return: The name of the obligation and its formulas as z3 expressions.
+        :rtype: dict
+        """
+        scope = dict(namespace)
+        exec("\n".join(line.strip() for line in item['sparams'].split("\n")), scope)
+        return {
+            'snameF': item['snameF'],
+            'sformula': eval(item['sformula'], scope),
+            'epsformula': eval(item['epsformula'], scope),
+            'sparticipants': eval(str(item['sparticipants']), scope)
+        }
+
+    @staticmethod
+    def get_builder(batch, backend = s_z3_backend):
+        """
+        Builds the namespace of a model and returns the function preparing its obligations.
+
+        The ``exist``/``forall`` formulas added to the batch after the namespace was built (when the obligations
+        are streamed, see Z3StreamChecker) are declared before preparing the next obligation.
+
+        :param batch: The batch of the model, see ``get_batch``.
+        :type batch: dict
+        :param backend: "ast" to build the expressions with the Z3AstBuilder, "source" to evaluate the generated text.
+        :type backend: str
+        :return: A function giving the prepared obligation of an item of the batch.
+        :rtype: Callable[[dict], dict]
+        """
+        if backend == "source":
+            namespace = Z3Engine.build_namespace(batch)
+            build = Z3Engine.from_source
+        else:
+            namespace = Z3AstBuilder.get_model_scope(Z3Engine.get_base_namespace(), batch)
+            build = Z3AstBuilder.build
+
+        def build_item(item):
+            added = {name: batch['formulas'][name] for name in batch['formulas'] if name not in namespace}
+            if added and backend == "source":
+                exec(generateFuntionsFormulas(added), namespace)
+            elif added:
+                for name in added:
+                    namespace[name] = Z3AstBuilder.formula_function(added[name], namespace)
+            return build(item, namespace)
+
+        return build_item
+
+    @staticmethod
+    def prepare(batch, backend = s_z3_backend):
+        """
+        Yields the obligations of a model with their formulas as z3 expressions, one at a time.
+
+        :param batch: The batch of the model, see ``get_batch``.
+        :type batch: dict
+        :param backend: "ast" to build the expressions with the Z3AstBuilder, "source" to evaluate the generated text.
+        :type backend: str
+        :return: A generator of prepared obligations.
+        :rtype: Generator[dict]
+        """
+        build = Z3Engine.get_builder(batch, backend)
+        for item in batch['obligations']:
+            yield build(item)
+
+    @staticmethod
+    def get_answer(solver, expected):
+        """
+        Runs a solver and compares its answer with the expected one.
+
+        :param solver: The solver holding the formula to check.
+        :type solver: z3.Solver
+        :param expected: The answer meaning that the check holds, ``z3.sat`` or ``z3.unsat``.
+        :type expected: z3.CheckSatResult
+        :return: True if the check holds, False if it does not, None if Z3 ran out of time.
+        :rtype: bool or None
+        """
+        answer = solver.check()
+        if answer == z3.unknown:
+            return None
+        return answer == expected
+
+    @staticmethod
+    def settle(item):
+        """
+        Decides an obligation from the text of its parts when its checks are trivial, without building nor solving it.
+
+        The non-determinism formula must be ``Not(True)`` (no group of outgoing transitions with two members),
+        the participants check a python bool (``caller_check`` decided it) and the precondition and postcondition
+        literals: a ``False`` one makes the A-consistency hypothesis false, otherwise the thesis must hold
+        trivially (no outgoing transition or one guarded by ``True``).
+
+        :param item: The obligation built by ``TransitionProcessor.process``.
+        :type item: dict
+        :return: The result of the obligation, or None if it needs Z3.
+        :rtype: ObligationResult or None
+        """
+        if item['epsformula'] != "Not(True)" or not isinstance(item['sparticipants'], bool):
+            return None
+
+        hypothesis = [str(item['spre']).strip(), str(item['spost']).strip()]
+        if any(part not in ["True", "False"] for part in hypothesis):
+            return None
+        if "False" not in hypothesis and len(item['sthesis']) > 0 and all(prec.strip() != "True" for prec, _ in item['sthesis']):
+            return None
+
+        return ObligationResult(item['snameF'], True, True, item['sparticipants'])
+
+    @staticmethod
+    def check_obligation(obligation, infos = False, time_out = 0, eps_result = None) -> ObligationResult:
+        """
+        Checks one prepared obligation as the generated function ``_<action>_<n>`` does.
+
+        :param obligation: The obligation with its formulas as z3 expressions.
+        :type obligation: dict
+        :param infos: If True, prints the details of the failing checks.
+        :type infos: bool
+        :param time_out: Time budget of each query in milliseconds, 0 for no limit.
+        :type time_out: int
+        :param eps_result: Result of the non-determinism check when it is already known, it is solved if None.
+        :type eps_result: bool, optional
+        :return: The result of the obligation.
+        :rtype: ObligationResult
+        """
+        name = obligation['snameF']
+        sformula = obligation['sformula']
+        epsformula = obligation['epsformula']
+
+        solver = z3.Solver()
+        if time_out > 0:
+            solver.set("timeout", int(time_out))
+        solver.push()
+        solver.add(sformula)
+        post_result = Z3Engine.get_answer(solver, z3.unsat)
+
+        if eps_result is None:
+            solver.pop()
+            solver.push()
+            solver.add(epsformula)
+            eps_result = Z3Engine.get_answer(solver, z3.unsat)
+
+        solver.pop()
+        solver.add(obligation['sparticipants'])
+        part_result = Z3Engine.get_answer(solver, z3.sat)
+
+        result = ObligationResult(name, post_result, eps_result, part_result)
+
+        if infos:
+            if not result.passed:
+                print()
+                print(f"--For {name}: ", " Check result :: ", "time out" if result.timed_out else result.passed)
+
+            for label, value in [("Participants       ", part_result), ("Non Determinism  ", eps_result), ("A-Consistency", post_result)]:
+                if value is None:
+                    print(f"--- {label}: time out")
+
+            if part_result is False:
+                print(f"--- Participants       : {part_result}")
+
+            if eps_result is False:
+                print("--- Non Determinism  : ", epsformula)
+
+            if post_result is False:
+                print(f"--- A-Consistency: {post_result}")
+                solver2 = z3.Solver()
+                if time_out > 0:
+                    solver2.set("timeout", int(time_out))
+                solver2.add(z3.Not(sformula))
+                print("\nSimplification of the of the negation of the formula: ", z3.simplify(z3.Not(sformula)), " :: ", solver2.check() == z3.sat)
+
+        return result
+
+    @staticmethod
+    def results(batch, verdict, infos = True, backend = s_z3_backend, token = None):
+        """
+        Checks the obligations of a model one at a time, printing the details of the failing checks.
+
+        The obligations marked ``passed`` (see ``IncrementalState``) are not checked again and the trivial ones
+        are decided by ``settle``. The non-determinism formula of a state is the same for every transition
+        entering it, so it is solved once per state and its result shared by these transitions. When the batch
+        names a cache, the obligations found in it are not built nor solved, and the obligations checked
+        with Z3 are added to it. Each query gets the time budget of the batch, bounded by what is left of the
+        budget of the model; once it is spent the remaining obligations time out without being checked.
+        The queries are also counted on the token of the run, if any, and bounded by what is left of its time budget;
+        once the token is cancelled the remaining obligations time out in the same way.
+        The times and cache counters are added to the verdict.
+
+        :param batch: The batch of the model, see ``get_batch``.
+        :type batch: dict
+        :param verdict: The verdict receiving the times and cache counters.
+        :type verdict: ModelVerdict
+        :param infos: If True, prints the details of the failing checks.
+        :type infos: bool
+        :param backend: "ast" or "source", see ``prepare``.
+        :type backend: str
+        :param token: Budget of the run shared with the graph analyses, None for none.
+        :type token: CancellationToken
+        :return: A generator of the results of the obligations.
+        :rtype: Generator[ObligationResult]
+        """
+        cache = Z3ObligationCache.open(batch['cache']) if batch.get('cache') else None
+        build = None
+        timer = MiniTimer()
+        # results of the non-determinism checks, by target state
+        non_determinism = {}
+        for item in batch['obligations']:
+            if item.get('passed'):
+                yield ObligationResult(item['snameF'], True, True, True)
+                continue
+
+            result = Z3Engine.settle(item)
+            if result is not None:
+                verdict.settled += 1
+                if infos and not result.passed:
+                    print()
+                    print(f"--For {result.name}: ", " Check result :: ", result.passed)
+                    print(f"--- Participants       : {result.participants}")
+                yield result
+                continue
+
+            key = Z3ObligationCache.key(batch, item) if cache is not None else None
+            cached = cache.get(key) if cache is not None else None
+            if cached is not None:
+                verdict.cache_hits += 1
+                if infos:
+                    print(cached[3], end="")
+                yield ObligationResult(item['snameF'], *cached[:3])
+                continue
+
+            time_out = Z3Engine.get_time_out(batch, verdict, token)
+            if time_out is None or (token is not None and token.query()):
+                if infos:
+                    print()
+                    print(f"--For {item['snameF']}: ", " Check result :: ", "time out (model budget spent)" if time_out is None else f"time out (run cancelled: {token.reason})")
+                yield ObligationResult(item['snameF'], None, None, None)
+                continue
+
+            timer.start_time()
+            build = build or Z3Engine.get_builder(batch, backend)
+            obligation = build(item)
+            verdict.building_time += timer.get_ellapsed_time()
+
+            timer.start_time()
+            state = item.get('epsstate', item['epsformula'])
+            if cache is None:
+                result = Z3Engine.check_obligation(obligation, infos, time_out, non_determinism.get(state))
+            else:
+                verdict.cache_misses += 1
+                # the details are always kept, a later run may print them
+                buffer = io.StringIO()
+                with redirect_stdout(buffer):
+                    result = Z3Engine.check_obligation(obligation, True, time_out, non_determinism.get(state))
+                checks = [result.a_consistency, result.non_determinism, result.participants]
+                if None not in checks:
+                    cache.put(key, *checks, buffer.getvalue())
+                if infos:
+                    print(buffer.getvalue(), end="")
+            verdict.solving_time += timer.get_ellapsed_time()
+            if result.non_determinism is not None:
+                non_determinism[state] = result.non_determinism
+            yield result
+
+    @staticmethod
+    def get_time_out(batch, verdict, token = None):
+        """
+        Gives the time budget of the next query of a batch.
+
+        :param batch: The batch of the model, see ``get_batch``.
+        :type batch: dict
+        :param verdict: The verdict holding the solving time already spent on the batch.
+        :type verdict: ModelVerdict
+        :param token: Budget of the run, its time left bounds the query, None for none.
+        :type token: CancellationToken
+        :return: The budget in milliseconds, 0 for no limit, None if the budget of the model or of the run is spent.
+        :rtype: int or None
+        """
+        query_time_out = batch.get('query_time_out', 0)
+        model_time_out = batch.get('model_time_out', 0)
+        left = token.get_time_left() if token is not None else None
+        if model_time_out > 0:
+            model_left = model_time_out - verdict.solving_time // 1000000
+            left = model_left if left is None else min(left, model_left)
+        if left is None:
+            return query_time_out
+
+        if left <= 0:
+            return None
+        return min(query_time_out, left) if query_time_out > 0 else left
+
+    @staticmethod
+    def run(batch, infos = True, backend = s_z3_backend, token = None) -> ModelVerdict:
+        """
+        Checks the obligations of a model, stopping at the first failing one like the generated ``check_resut``.
+
+        :param batch: The batch of the model, see ``get_batch``.
+        :type batch: dict
+        :param infos: If True, prints the details of the failing checks.
+        :type infos: bool
+        :param backend: "ast" or "source", see ``prepare``.
+        :type backend: str
+        :param token: Budget of the run shared with the graph analyses, None for none.
+        :type token: CancellationToken
+        :return: The verdict of the model.
+        :rtype: ModelVerdict
+        """
+        verdict = ModelVerdict()
+        try:
+            for result in Z3Engine.results(batch, verdict, infos, backend, token):
+                verdict.obligations.append(result)
+                if not result.passed:
+                    break
+            print("\n" + verdict.message())
+        except Exception as e:
+            verdict.error = e
+            print(f"Error in Z3 runner, could be state variable non declared, types not matching in assignment....: {e}")
+        return verdict
+
+    @staticmethod
+    def execute(batch, infos = True, backend = s_z3_backend, token = None):
+        """
+        Runs a model and captures what it prints, as the subprocess runner does with stdout.
+
+        :param batch: The batch of the model, see ``get_batch``.
+        :type batch: dict
+        :param infos: If True, prints the details of the failing checks.
+        :type infos: bool
+        :param backend: "ast" or "source", see ``prepare``.
+        :type backend: str
+        :param token: Budget of the run shared with the graph analyses, None for none.
+        :type token: CancellationToken
+        :return: The verdict of the model and the captured output.
+        :rtype: tuple[ModelVerdict, str]
+        """
+        buffer = io.StringIO()
+        with redirect_stdout(buffer):
+            verdict = Z3Engine.run(batch, infos, backend, token)
+        return verdict, buffer.getvalue()
@@ -0,0 +1,55 @@
+import hashlib
+import json
+import re
+import z3
+from KeyedStore import KeyedStore
+from Settings import s_z3_cache_path, s_z3_cache_max_entries
+
+class Z3ObligationCache(KeyedStore):
+    """
+    A content addressed cache of checked obligations, stored in a SQLite file (see ``KeyedStore``).
+
+    An obligation is identified by a hash of what its checks depend on: the declarations of the model,
+    the ``exist``/``forall`` formulas it uses, its parameters, ``sformula``, ``epsformula`` and ``sparticipants``,
+    along with its name, which appears in the printed details.
+    The cache keeps the result of its three checks and the details printed for its failures, so a hit
+    does not need Z3 at all. Above ``max_entries`` the least recently used entries are evicted.
+
+    :param path: Path of the SQLite file.
+    :type path: str
+    :param max_entries: Number of entries kept in the cache.
+    :type max_entries: int
+    """
+
+    table = "obligations"
+    columns = ("a_consistency INTEGER", "non_determinism INTEGER", "participants INTEGER", "output TEXT")
+    default_path = s_z3_cache_path
+    default_max_entries = s_z3_cache_max_entries
+
+    @staticmethod
+    def key(batch, item) -> str:
+        """
+        Computes the canonical hash of an obligation.
+
+        :param batch: The batch of the model holding the obligation, see ``Z3Engine.get_batch``.
+        :type batch: dict
+        :param item: The obligation built by ``TransitionProcessor.process``.
+        :type item: dict
+        :return: The hexadecimal digest identifying the obligation.
+        :rtype: str
+        """
+        texts = [item['sparams'], item['sformula'], item['epsformula'], str(item['sparticipants'])]
+        used_formulas = {name: batch['formulas'][name] for name in sorted(batch['formulas']) if any(re.search(rf"\b{name}\b", text) for text in texts)}
+        content = json.dumps([z3.get_version_string(), batch['str_code'], used_formulas, item['snameF']] + texts)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def decode(self, row) -> tuple:
+        """
+        Gives the results of the three checks of an obligation and the details printed for its failures.
+
+        :param row: The stored results and details.
+        :type row: tuple
+        :return: The results of the A-consistency, non-determinism and participants checks and the printed details.
+        :rtype: tuple[bool, bool, bool, str]
+        """
+        return bool(row[0]), bool(row[1]), bool(row[2]), row[3]
@@ -0,0 +1,194 @@
+import atexit
+import concurrent.futures
+import io
+import multiprocessing
+import os
+from contextlib import redirect_stdout
+from MiniTimer import MiniTimer
+from Z3Engine import Z3Engine, ModelVerdict
+from Settings import s_z3_backend, s_z3_pool_size
+
+# in the workers, the run and the index of the first chunk holding a failure, shared with the parent process
+cancellation = None
+
+def init_worker(shared_cancellation):
+    """
+    Keeps the cancellation array of the Z3ParallelChecker in a worker, when the worker starts.
+
+    :param shared_cancellation: The run and the index of the first chunk holding a failure.
+    :type shared_cancellation: multiprocessing.Array
+    """
+    global cancellation
+    cancellation = shared_cancellation
+
+def is_cancelled(run, index) -> bool:
+    """
+    Tells whether a chunk of a run is no longer needed, a chunk before it holding a failure.
+
+    :param run: The number of the run.
+    :type run: int
+    :param index: The index of the chunk in the model.
+    :type index: int
+    :return: True if the chunk can stop.
+    :rtype: bool
+    """
+    if cancellation is None:
+        return False
+    with cancellation.get_lock():
+        return cancellation[0] == run and cancellation[1] < index
+
+def check_chunk(batch, infos = True, backend = s_z3_backend, stop_on_failure = True, run = 0, index = 0):
+    """
+    Checks the obligations of a batch one by one, in a worker of the Z3ParallelChecker.
+
+    When stopping on failure, the chunk also stops before its next obligation once a chunk before it holds a failure.
+
+    :param batch: The batch holding a contiguous chunk of the obligations of a model.
+    :type batch: dict
+    :param infos: If True, the outputs detail the failing checks.
+    :type infos: bool
+    :param backend: "ast" or "source", see ``Z3Engine.prepare``.
+    :type backend: str
+    :param stop_on_failure: If True, the chunk stops at its first failing obligation.
+    :type stop_on_failure: bool
+    :param run: The number of the run of the Z3ParallelChecker, see ``is_cancelled``.
+    :type run: int
+    :param index: The index of the chunk in the model.
+    :type index: int
+    :return: For each checked obligation, its result, its output and the error raised while checking it,
+        followed by the cache hits, cache misses and settled obligations of the chunk.
+    :rtype: tuple[list[tuple[ObligationResult, str, Exception]], int, int, int]
+    """
+    entries = []
+    verdict = ModelVerdict()
+    results = Z3Engine.results(batch, verdict, infos, backend)
+    try:
+        while not (stop_on_failure and is_cancelled(run, index)):
+            buffer = io.StringIO()
+            with redirect_stdout(buffer):
+                result = next(results, None)
+            if result is None:
+                break
+            entries.append((result, buffer.getvalue(), None))
+            if stop_on_failure and not result.passed:
+                break
+    except Exception as e:
+        # z3 errors are not always picklable, only their message is sent back
+        entries.append((None, "", RuntimeError(str(e))))
+    return entries, verdict.cache_hits, verdict.cache_misses, verdict.settled
+
+
+class Z3ParallelChecker:
+    """
+    Spreads the obligations of one model (the ``_<action>_<n>`` functions) over a pool of processes.
+
+    The obligations are split in contiguous chunks and the results are merged in the order of the model,
+    so the verdict does not depend on which worker ends first. When stopping on failure, the chunks that
+    come after the first failing obligation are cancelled: those not started yet are dropped, and those
+    running stop before their next obligation; otherwise every obligation is checked and all the failures
+    are reported.
+    """
+
+    _executor = None
+    _size = 0
+    # the run and the index of the first chunk holding a failure, read by the workers between two obligations
+    _cancellation = None
+    _runs = 0
+
+    @staticmethod
+    def get_executor(size = s_z3_pool_size) -> concurrent.futures.ProcessPoolExecutor:
+        """
+        Returns the executor shared by the checks of the current process, creating it on first use.
+
+        :param size: Number of workers, 0 uses the number of CPUs minus 1.
+        :type size: int
+        :return: The executor.
+        :rtype: concurrent.futures.ProcessPoolExecutor
+        """
+        if Z3ParallelChecker._executor is None:
+            Z3ParallelChecker._size = size if size > 0 else max(1, (os.cpu_count() or 2) - 1)
+            Z3ParallelChecker._cancellation = multiprocessing.Array('i', [0, 0])
+            Z3ParallelChecker._executor = concurrent.futures.ProcessPoolExecutor(max_workers=Z3ParallelChecker._size, initializer=init_worker, initargs=(Z3ParallelChecker._cancellation,))
+            atexit.register(Z3ParallelChecker._executor.shutdown)
+        return Z3ParallelChecker._executor
+
+    @staticmethod
+    def split(batch, number_chunks) -> list:
+        """
+        Splits the obligations of a batch in contiguous chunks sharing the declarations of the model.
+
+        :param batch: The batch of a model.
+        :type batch: dict
+        :param number_chunks: The number of chunks wanted.
+        :type number_chunks: int
+        :return: The batches of the chunks, in the order of the model.
+        :rtype: list[dict]
+        """
+        obligations = batch['obligations']
+        size = max(1, -(-len(obligations) // max(1, number_chunks)))
+        return [dict(batch, obligations=obligations[i:i + size]) for i in range(0, len(obligations), size)]
+
+    @staticmethod
+    def run(batch, infos = True, backend = s_z3_backend, stop_on_failure = True):
+        """
+        Checks the obligations of a model in parallel.
+
+        The formulas are built in the workers, so ``building_time`` stays 0 and ``solving_time`` is the
+        elapsed time of the whole check.
+
+        :param batch: The batch of a model, see ``Z3Engine.get_batch``.
+        :type batch: dict
+        :param infos: If True, the output details the failing checks.
+        :type infos: bool
+        :param backend: "ast" or "source", see ``Z3Engine.prepare``.
+        :type backend: str
+        :param stop_on_failure: If True, the check stops (and cancels the chunks after it) at the first failure, as the other engines do.
+        :type stop_on_failure: bool
+        :return: The verdict of the model and its output.
+        :rtype: tuple[ModelVerdict, str]
+        """
+        executor = Z3ParallelChecker.get_executor()
+        verdict = ModelVerdict()
+        timer = MiniTimer()
+        timer.start_time()
+        chunks = Z3ParallelChecker.split(batch, Z3ParallelChecker._size * 4)
+        Z3ParallelChecker._runs += 1
+        run = Z3ParallelChecker._runs
+        futures = [executor.submit(check_chunk, chunk, infos, backend, stop_on_failure, run, index) for index, chunk in enumerate(chunks)]
+
+        # index of the first chunk holding a failure, the chunks after it are not needed when stopping
+        first_failure = len(futures)
+        pending = set(futures)
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                index = futures.index(future)
+                if stop_on_failure and index < first_failure and any(result is None or not result.passed for result, _, _ in future.result()[0]):
+                    first_failure = index
+                    with Z3ParallelChecker._cancellation.get_lock():
+                        Z3ParallelChecker._cancellation[0] = run
+                        Z3ParallelChecker._cancellation[1] = index
+                    for outstanding in futures[index + 1:]:
+                        outstanding.cancel()
+            pending = {future for future in pending if futures.index(future) < first_failure}
+
+        output = ""
+        for future in futures[:first_failure + 1]:
+            entries, hits, misses, settled = future.result()
+            verdict.cache_hits += hits
+            verdict.cache_misses += misses
+            verdict.settled += settled
+            for result, text, error in entries:
+                output += text
+                if error is not None:
+                    verdict.error = error
+                    break
+                verdict.obligations.append(result)
+            if verdict.error is not None:
+                output += f"Error in Z3 runner, could be state variable non declared, types not matching in assignment....: {verdict.error}\n"
+                break
+        else:
+            output += "\n" + verdict.message() + "\n"
+
+        verdict.solving_time = timer.get_ellapsed_time()
+        return verdict, output
@@ -1,18 +1,195 @@
 import subprocess
-from Settings import s_well_formed_message
+from Settings import s_well_formed_message, s_unknown_message, s_z3_engine, s_z3_backend, s_z3_cache, s_z3_cache_path, s_z3_query_time_out, s_z3_model_time_out
+from Z3Engine import Z3Engine
+from Z3WorkerPool import Z3WorkerPool
+from Z3ParallelChecker import Z3ParallelChecker
+from Z3StreamChecker import Z3StreamChecker
+from Fbuilder import Fbuilder
 
 class Z3Runner:
     """
     A class to execute Z3 models and analyze the output.
-    
+
     This class provides static methods to run a Z3 solver model file and analyze the output
     to check for a specific well-formed message indicating success.
     """
-    
+
+    @staticmethod
+    def build_model(checker, path, only_latest = False):
+        """
+        Writes the Z3 model file when the checker runs it with the ``subprocess`` engine.
+
+        The in-process engine builds the formulas from the transition processor itself,
+        so no code is generated or written in that case.
+
+        :param checker: An object holding the processed transitions.
+        :param path: The file path of the Z3 model.
+        :type path: str
+        :param only_latest: If True, only the latest transition formula is included in the model.
+        :type only_latest: bool
+        """
+        if getattr(checker, "z3_engine", s_z3_engine) == "subprocess":
+            Fbuilder.build_z3_formulas_model_and_save(checker, path, only_latest)
+
     @staticmethod
-    def execute_model(checker, path) -> bool:
+    def execute_model(checker, path, only_latest = False) -> bool:
         """
-        Executes a Z3 model file and captures its output.
+        Executes a Z3 model and captures its output.
+
+        The model is checked in the calling process by the Z3Engine, the latest transition alone by the
+        checker's Z3StreamChecker, unless the checker selects the ``pool``
+        engine (warm worker processes), the ``parallel`` engine (the obligations of the model are spread over
+        processes) or the ``subprocess`` engine (the generated file is run with ``python3``).
+
+        :param checker: An object that provides logging capabilities.
+        :param path: The file path to the Z3 model to be executed.
+        :type path: str
+        :param only_latest: If True, only the latest processed transition is checked (in-process engine only).
+        :type only_latest: bool
+        :return: True if the Z3 model output contains the well-formed message, False otherwise.
+        :rtype: bool
+        """
+        engine = getattr(checker, "z3_engine", s_z3_engine)
+        if engine == "inprocess" and only_latest:
+            return Z3Runner.execute_latest_in_stream(checker)
+        if engine == "subprocess":
+            return Z3Runner.execute_model_in_subprocess(checker, path)
+        if engine == "pool":
+            return Z3Runner.execute_model_in_pool(checker, only_latest)
+        if engine == "parallel":
+            return Z3Runner.execute_model_in_parallel(checker, only_latest)
+
+        return Z3Runner.execute_model_in_process(checker, only_latest)
+
+    @staticmethod
+    def get_batch(checker, only_latest = False) -> dict:
+        """
+        Collects the batch of the checker's model with its solver time budgets, using the obligation cache unless the checker disables it.
+
+        :param checker: An object holding the processed transitions.
+        :param only_latest: If True, only the latest processed transition is included.
+        :type only_latest: bool
+        :return: The batch of the model, see ``Z3Engine.get_batch``.
+        :rtype: dict
+        """
+        cache = s_z3_cache_path if getattr(checker, "z3_cache", s_z3_cache) else None
+        query_time_out = getattr(checker, "z3_query_time_out", s_z3_query_time_out)
+        model_time_out = getattr(checker, "z3_model_time_out", s_z3_model_time_out)
+        return Z3Engine.get_batch(checker.transition_processor, only_latest, cache, query_time_out, model_time_out)
+
+    @staticmethod
+    def record_verdict(checker, batch):
+        """
+        Marks the obligations of a batch that passed in incremental mode and adds the obligation cache counters,
+        settled obligations and solver time outs of the checker's verdict to its run information.
+
+        :param checker: An object holding the verdict of its last check.
+        :param batch: The checked batch.
+        :type batch: dict
+        """
+        if getattr(checker, "incremental", False):
+            items = {item['snameF']: item for item in batch['obligations']}
+            for result in checker.verdict.obligations:
+                if result.passed and result.name in items:
+                    items[result.name]['passed'] = True
+        if hasattr(checker, "info") and "cache_hits" in checker.info:
+            checker.info["cache_hits"] += checker.verdict.cache_hits
+            checker.info["cache_misses"] += checker.verdict.cache_misses
+            checker.info["settled"] += checker.verdict.settled
+        if hasattr(checker, "info") and len(checker.verdict.timed_out) > 0:
+            checker.info["is_time_out"] = True
+
+    @staticmethod
+    def execute_model_in_process(checker, only_latest = False) -> bool:
+        """
+        Checks the obligations of the checker's transition processor in the calling process.
+
+        The queries are counted on the checker's ``token``, if any, and stop once it is cancelled.
+        The structured verdict is stored in ``checker.verdict``.
+
+        :param checker: An object that provides logging capabilities and a transition processor.
+        :param only_latest: If True, only the latest processed transition is checked.
+        :type only_latest: bool
+        :return: True if the model is well formed, False otherwise.
+        :rtype: bool
+        """
+        checker.logIt("Execution by Z3 (in process)\n")
+        backend = getattr(checker, "z3_backend", s_z3_backend)
+        batch = Z3Runner.get_batch(checker, only_latest)
+        checker.verdict, checker.output = Z3Engine.execute(batch, Fbuilder.get_with_log(checker, only_latest), backend, getattr(checker, "token", None))
+        Z3Runner.record_verdict(checker, batch)
+        checker.logIt(checker.output)
+        return checker.verdict.well_formed
+
+    @staticmethod
+    def execute_latest_in_stream(checker) -> bool:
+        """
+        Checks the latest processed transition with the Z3StreamChecker of the checker, created on first use.
+
+        The stream keeps the namespace of the model between the checks of the stop mode.
+        The structured verdict is stored in ``checker.verdict``.
+
+        :param checker: An object that provides logging capabilities and a transition processor.
+        :return: True if the obligation of the latest transition holds, False otherwise.
+        :rtype: bool
+        """
+        if getattr(checker, "z3_stream", None) is None:
+            backend = getattr(checker, "z3_backend", s_z3_backend)
+            checker.z3_stream = Z3StreamChecker(Z3Runner.get_batch(checker, True), Fbuilder.get_with_log(checker, True), backend, getattr(checker, "token", None))
+        latest = checker.transition_processor.latest
+        checker.verdict, checker.output = checker.z3_stream.check(latest)
+        Z3Runner.record_verdict(checker, {'obligations': [latest]})
+        checker.logIt(checker.output)
+        return checker.verdict.well_formed
+
+    @staticmethod
+    def execute_model_in_pool(checker, only_latest = False) -> bool:
+        """
+        Checks the obligations of the checker's transition processor with the shared Z3WorkerPool of the process.
+
+        The structured verdict is stored in ``checker.verdict``.
+
+        :param checker: An object that provides logging capabilities and a transition processor.
+        :param only_latest: If True, only the latest processed transition is checked.
+        :type only_latest: bool
+        :return: True if the model is well formed, False otherwise.
+        :rtype: bool
+        """
+        checker.logIt("Execution by Z3 (worker pool)\n")
+        backend = getattr(checker, "z3_backend", s_z3_backend)
+        batch = Z3Runner.get_batch(checker, only_latest)
+        checker.verdict, checker.output = Z3WorkerPool.shared().execute(batch, Fbuilder.get_with_log(checker, only_latest), backend)
+        Z3Runner.record_verdict(checker, batch)
+        checker.logIt(checker.output)
+        return checker.verdict.well_formed
+
+    @staticmethod
+    def execute_model_in_parallel(checker, only_latest = False) -> bool:
+        """
+        Checks the obligations of the checker's transition processor in parallel with the Z3ParallelChecker.
+
+        As with the other engines, the check stops at the first failure in the order of the model,
+        the outstanding checks being cancelled.
+        The structured verdict is stored in ``checker.verdict``.
+
+        :param checker: An object that provides logging capabilities and a transition processor.
+        :param only_latest: If True, only the latest processed transition is checked.
+        :type only_latest: bool
+        :return: True if the model is well formed, False otherwise.
+        :rtype: bool
+        """
+        checker.logIt("Execution by Z3 (parallel)\n")
+        backend = getattr(checker, "z3_backend", s_z3_backend)
+        batch = Z3Runner.get_batch(checker, only_latest)
+        checker.verdict, checker.output = Z3ParallelChecker.run(batch, Fbuilder.get_with_log(checker, only_latest), backend)
+        Z3Runner.record_verdict(checker, batch)
+        checker.logIt(checker.output)
+        return checker.verdict.well_formed
+
+    @staticmethod
+    def execute_model_in_subprocess(checker, path) -> bool:
+        """
+        Executes a Z3 model file with a new ``python3`` interpreter and captures its output.
 
         :param checker: An object that provides logging capabilities.
         :param path: The file path to the Z3 model to be executed.
@@ -24,21 +201,27 @@ class Z3Runner:
         general exceptions by logging the errors.
         """
 
+        checker.verdict = None
+        model_time_out = getattr(checker, "z3_model_time_out", s_z3_model_time_out)
         try:
             checker.logIt("Execution by Z3\n")
-            result = subprocess.run(["python3", f'{path}'], capture_output=True, text=True)
+            result = subprocess.run(["python3", f'{path}'], capture_output=True, text=True, timeout=model_time_out / 1000 if model_time_out > 0 else None)
             checker.output = result.stdout
 
+        except subprocess.TimeoutExpired as e:
+            checker.output = (e.stdout.decode() if isinstance(e.stdout, bytes) else e.stdout or "") + "\n" + s_unknown_message
+            if hasattr(checker, "info"):
+                checker.info["is_time_out"] = True
         except FileNotFoundError:
             print(f"Error: The file '{path}' does not exist.")
         except Exception as e:
             print("Error processing the check")
             print(e)
-       
-        checker.logIt(checker.output) 
-        checker.logIt(f"\n(Check the generated file  {path} to find the z3 code generated)\n") 
+
+        checker.logIt(checker.output)
+        checker.logIt(f"\n(Check the generated file  {path} to find the z3 code generated)\n")
         return Z3Runner.analyser(checker.output)
-    
+
     @staticmethod
     def analyser(result) -> bool:
         """
@@ -0,0 +1,64 @@
+import io
+from contextlib import redirect_stdout
+from Extension import formulas
+from Z3Engine import Z3Engine, ModelVerdict
+from Settings import s_z3_backend
+
+class Z3StreamChecker:
+    """
+    Checks the obligations of a model one by one, as ``TransitionProcessor.process`` produces them.
+
+    Used by the stop mode: the namespace of the model is built once and the obligations are appended to
+    the same batch, so checking a transition neither writes a file nor rebuilds the model. The time budget
+    of the model applies to the whole stream.
+
+    :param batch: The batch of the model, see ``Z3Engine.get_batch``, its obligations are replaced by the streamed ones.
+    :type batch: dict
+    :param infos: If True, the outputs detail the failing checks.
+    :type infos: bool
+    :param backend: "ast" or "source", see ``Z3Engine.prepare``.
+    :type backend: str
+    :param token: Budget of the run shared with the graph analyses, None for none.
+    :type token: CancellationToken
+    """
+
+    def __init__(self, batch, infos = True, backend = s_z3_backend, token = None) -> None:
+        self.batch = batch
+        self.batch['obligations'] = []
+        self.infos = infos
+        self.backend = backend
+        self.token = token
+        self.stream_verdict = ModelVerdict()
+        # the generator walks the obligations list by index, so it picks up the obligations appended between two checks
+        self.results = Z3Engine.results(self.batch, self.stream_verdict, infos, backend, token)
+
+    def check(self, item):
+        """
+        Checks the next obligation of the model.
+
+        :param item: The obligation built by ``TransitionProcessor.process``.
+        :type item: dict
+        :return: The verdict of the obligation, with the times and counters spent on it, and its output.
+        :rtype: tuple[ModelVerdict, str]
+        """
+        stream = self.stream_verdict
+        before = [stream.building_time, stream.solving_time, stream.cache_hits, stream.cache_misses, stream.settled]
+        self.batch['formulas'].update(formulas)
+        self.batch['obligations'].append(item)
+
+        verdict = ModelVerdict()
+        buffer = io.StringIO()
+        with redirect_stdout(buffer):
+            try:
+                verdict.obligations.append(next(self.results))
+                print("\n" + verdict.message())
+            except Exception as e:
+                verdict.error = e
+                # the generator is closed by the error, the next checks start a new one
+                self.batch['obligations'] = []
+                self.results = Z3Engine.results(self.batch, self.stream_verdict, self.infos, self.backend, self.token)
+                print(f"Error in Z3 runner, could be state variable non declared, types not matching in assignment....: {e}")
+
+        after = [stream.building_time, stream.solving_time, stream.cache_hits, stream.cache_misses, stream.settled]
+        verdict.building_time, verdict.solving_time, verdict.cache_hits, verdict.cache_misses, verdict.settled = [b - a for a, b in zip(before, after)]
+        return verdict, buffer.getvalue()
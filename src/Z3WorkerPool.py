@@ -0,0 +1,199 @@
+import atexit
+import multiprocessing
+import os
+import queue
+from Z3Engine import Z3Engine, ModelVerdict
+from Settings import s_z3_backend, s_z3_pool_size
+
+def z3_worker(tasks, results, index = 0):
+    """
+    Loop of a pool worker: ``z3`` and ``Extension`` are loaded once with this module, then
+    the worker checks the batches it receives until it gets ``None``.
+
+    :param tasks: Queue of ``(ticket, batch, infos, backend)`` tasks.
+    :type tasks: multiprocessing.Queue
+    :param results: Queue receiving ``(index, ticket, None, None)`` when the worker takes a task, then ``(index, ticket, verdict, output)``.
+    :type results: multiprocessing.Queue
+    :param index: The index of the worker in the pool.
+    :type index: int
+    """
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        ticket, batch, infos, backend = task
+        # the pool knows which ticket is lost if the worker dies while checking it
+        results.put((index, ticket, None, None))
+        verdict, output = Z3Engine.execute(batch, infos, backend)
+        if verdict.error is not None:
+            # z3 errors are not always picklable, only their message is sent back
+            verdict.error = RuntimeError(str(verdict.error))
+        results.put((index, ticket, verdict, output))
+
+
+class Z3WorkerPool:
+    """
+    A pool of long-lived worker processes checking Z3 model batches (see ``Z3Engine.get_batch``).
+
+    The workers import ``z3`` and ``Extension`` once and are reused for every model, which avoids
+    the interpreter start-up and ``z3`` import paid by the ``subprocess`` engine. A worker that dies
+    (a z3 abort, a crash, a kill when out of memory) is replaced, and the model it was checking gets
+    a verdict with an error instead of being waited for.
+
+    :param size: Number of workers, 0 uses the number of CPUs minus 1.
+    :type size: int
+    """
+
+    _shared = None
+    # seconds between two checks of the workers while waiting for a result
+    poll_interval = 1.0
+
+    def __init__(self, size = s_z3_pool_size) -> None:
+        self.size = size if size > 0 else max(1, (os.cpu_count() or 2) - 1)
+        self.tasks = multiprocessing.Queue()
+        self.results = multiprocessing.Queue()
+        self.workers = []
+        self.done = {}
+        # the ticket each worker is checking, by worker index
+        self.taken = {}
+        self.next_ticket = 0
+
+    def start(self):
+        """
+        Starts the workers if they are not running yet.
+
+        :return: The pool.
+        :rtype: Z3WorkerPool
+        """
+        if not self.workers:
+            self.workers = [self.start_worker(index) for index in range(self.size)]
+        return self
+
+    def start_worker(self, index) -> multiprocessing.Process:
+        """
+        Starts a worker.
+
+        :param index: The index of the worker in the pool.
+        :type index: int
+        :return: The worker process.
+        :rtype: multiprocessing.Process
+        """
+        worker = multiprocessing.Process(target=z3_worker, args=(self.tasks, self.results, index), daemon=True)
+        worker.start()
+        return worker
+
+    def replace_dead_workers(self):
+        """
+        Restarts the workers that died, giving the ticket each one was checking a verdict with an error.
+        """
+        for index, worker in enumerate(self.workers):
+            if worker.is_alive():
+                continue
+            ticket = self.taken.pop(index, None)
+            if ticket is not None:
+                error = RuntimeError(f"the Z3 worker stopped with exit code {worker.exitcode}")
+                self.done[ticket] = (ModelVerdict(error=error), f"Error in Z3 runner, could be state variable non declared, types not matching in assignment....: {error}\n")
+            self.workers[index] = self.start_worker(index)
+
+    def submit(self, batch, infos = True, backend = s_z3_backend) -> int:
+        """
+        Sends a batch to the workers without waiting for its result.
+
+        :param batch: The batch of a model.
+        :type batch: dict
+        :param infos: If True, the output details the failing checks.
+        :type infos: bool
+        :param backend: "ast" or "source", see ``Z3Engine.prepare``.
+        :type backend: str
+        :return: The ticket to get the result with.
+        :rtype: int
+        """
+        self.start()
+        ticket = self.next_ticket
+        self.next_ticket += 1
+        self.tasks.put((ticket, batch, infos, backend))
+        return ticket
+
+    def result(self, ticket):
+        """
+        Waits for the result of a submitted batch.
+
+        :param ticket: The ticket returned by ``submit``.
+        :type ticket: int
+        :return: The verdict of the model and its output, an error if the worker checking it died.
+        :rtype: tuple[ModelVerdict, str]
+        """
+        while ticket not in self.done:
+            try:
+                index, received, verdict, output = self.results.get(timeout=self.poll_interval)
+            except queue.Empty:
+                self.replace_dead_workers()
+                continue
+            if verdict is None:
+                self.taken[index] = received
+            else:
+                self.taken.pop(index, None)
+                self.done[received] = (verdict, output)
+        return self.done.pop(ticket)
+
+    def execute(self, batch, infos = True, backend = s_z3_backend):
+        """
+        Checks a batch with a worker and waits for its result.
+
+        :param batch: The batch of a model.
+        :type batch: dict
+        :param infos: If True, the output details the failing checks.
+        :type infos: bool
+        :param backend: "ast" or "source", see ``Z3Engine.prepare``.
+        :type backend: str
+        :return: The verdict of the model and its output.
+        :rtype: tuple[ModelVerdict, str]
+        """
+        return self.result(self.submit(batch, infos, backend))
+
+    def map(self, batches, infos = True, backend = s_z3_backend) -> list:
+        """
+        Checks several batches in parallel.
+
+        :param batches: The batches of the models.
+        :type batches: list[dict]
+        :param infos: If True, the outputs detail the failing checks.
+        :type infos: bool
+        :param backend: "ast" or "source", see ``Z3Engine.prepare``.
+        :type backend: str
+        :return: The verdicts and outputs, in the order of the batches.
+        :rtype: list[tuple[ModelVerdict, str]]
+        """
+        tickets = [self.submit(batch, infos, backend) for batch in batches]
+        return [self.result(ticket) for ticket in tickets]
+
+    def close(self):
+        """
+        Stops the workers.
+        """
+        for _ in self.workers:
+            self.tasks.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.close()
+
+    @staticmethod
+    def shared(size = s_z3_pool_size):
+        """
+        Returns the pool shared by the checks of the current process, starting it on first use.
+
+        :param size: Number of workers of the pool if it has to be created.
+        :type size: int
+        :return: The shared pool.
+        :rtype: Z3WorkerPool
+        """
+        if Z3WorkerPool._shared is None:
+            Z3WorkerPool._shared = Z3WorkerPool(size).start()
+            atexit.register(Z3WorkerPool._shared.close)
+        return Z3WorkerPool._shared